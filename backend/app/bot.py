@@ -2,11 +2,26 @@
 Telegram bot using aiogram.
 
 Provides /start command and Mini App launch button.
+
+Updates arrive one of two ways (settings.BOT_MODE):
+
+- "polling": `python -m app.bot` long-polls in its own process, with its
+  own engine and pools.
+- "webhook": the API serves BOT_WEBHOOK_PATH (app.routers.telegram) and
+  registers it with Telegram at startup. Handlers then run on the API's
+  event loop and share its connection pools and caches (e.g. the
+  leaderboard); no polling process is needed.
 """
 
 import asyncio
+import functools
+import hashlib
+import hmac
 import logging
 from aiogram import Bot, Dispatcher, types
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.exceptions import TelegramAPIError
 from aiogram.filters import Command
 from aiogram.types import (
     InlineKeyboardMarkup, 
@@ -16,13 +31,16 @@ from aiogram.types import (
 
 from app.config import settings
 from app.database import init_db
+from app.game.leaderboard import top_miners
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Initialize bot and dispatcher
-bot = Bot(token=settings.BOT_TOKEN)
+bot = Bot(
+    token=settings.BOT_TOKEN,
+    session=AiohttpSession(api=TelegramAPIServer.from_base(settings.BOT_API_URL))
+    if settings.BOT_API_URL else None,
+)
 dp = Dispatcher()
 
 
@@ -116,29 +134,124 @@ async def callback_help(callback: types.CallbackQuery):
 @dp.callback_query(lambda c: c.data == "leaderboard")
 async def callback_leaderboard(callback: types.CallbackQuery):
     """Handle leaderboard button."""
-    # TODO: Implement actual leaderboard from database
-    leaderboard_text = """
+    top = await top_miners(10)
+    
+    if not top:
+        leaderboard_text = """
 🏆 **Mining Leaderboard**
 
-_Coming soon!_
+_No miners yet!_
 
-Top miners will be displayed here.
-Keep mining to climb the ranks!
+Be the first to climb the ranks!
 """
+    else:
+        medals = ["🥇", "🥈", "🥉"]
+        lines = ["🏆 **Mining Leaderboard**", ""]
+        for rank, row in enumerate(top, start=1):
+            name = row["first_name"] or row["username"] or f"Miner {row['user_id']}"
+            for char in "_*`[":
+                name = name.replace(char, f"\\{char}")
+            badge = medals[rank - 1] if rank <= len(medals) else f"{rank}."
+            lines.append(f"{badge} {name} — Lv.{row['level']} ({row['xp']:,} XP)")
+        leaderboard_text = "\n".join(lines)
     
     await callback.message.answer(leaderboard_text, parse_mode="Markdown")
     await callback.answer()
 
 
+# -- Webhook mode -------------------------------------------------------------
+
+# Updates being handled in the background (kept referenced until done)
+_webhook_tasks: set[asyncio.Task] = set()
+
+
+def webhook_url() -> str:
+    return settings.API_URL.rstrip("/") + settings.BOT_WEBHOOK_PATH
+
+
+@functools.cache
+def webhook_secret() -> str:
+    """
+    The secret Telegram sends with every update: BOT_WEBHOOK_SECRET, or
+    when unset one derived from the bot token, so every worker registers
+    and checks the same value and the webhook is never left open.
+    """
+    if settings.BOT_WEBHOOK_SECRET:
+        return settings.BOT_WEBHOOK_SECRET
+    return hmac.new(settings.BOT_TOKEN.encode(), b"telegram-webhook-secret", hashlib.sha256).hexdigest()
+
+
+def webhook_secret_ok(token: str | None) -> bool:
+    """Constant-time check of X-Telegram-Bot-Api-Secret-Token."""
+    return token is not None and hmac.compare_digest(token.encode(), webhook_secret().encode())
+
+
+async def _handle_update(update: types.Update):
+    try:
+        await dp.feed_update(bot, update)
+    except Exception:
+        logger.exception("Webhook update %s failed", update.update_id)
+
+
+def feed_webhook_update(payload: dict):
+    """
+    Queue one webhook update for handling and return at once.
+
+    Telegram only needs the 200; replies go out through the Bot API, so
+    slow handlers never hold the webhook request (or trigger redelivery).
+    """
+    update = types.Update.model_validate(payload, context={"bot": bot})
+    task = asyncio.create_task(_handle_update(update))
+    _webhook_tasks.add(task)
+    task.add_done_callback(_webhook_tasks.discard)
+
+
+async def start_webhook():
+    """
+    Point Telegram at this API (called from the API lifespan).
+
+    Every worker runs this; a failure (e.g. a sibling worker's call being
+    rate limited) is logged rather than failing startup, since the
+    webhook only needs to be set once.
+    """
+    try:
+        await bot.set_webhook(
+            webhook_url(),
+            secret_token=webhook_secret(),
+            max_connections=settings.BOT_WEBHOOK_MAX_CONNECTIONS,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+    except TelegramAPIError as e:
+        logger.warning("Could not set Telegram webhook to %s: %s", webhook_url(), e)
+        return
+    logger.info("Telegram webhook set to %s", webhook_url())
+
+
+async def stop_webhook():
+    """Finish in-flight updates and close the Bot API session."""
+    if _webhook_tasks:
+        await asyncio.wait(_webhook_tasks, timeout=10)
+    await bot.session.close()
+
+
 async def main():
     """Start the bot."""
+    if settings.BOT_MODE == "webhook":
+        raise SystemExit(
+            f"BOT_MODE=webhook: updates are served by the API at {webhook_url()}; "
+            "there is nothing to poll."
+        )
     logger.info("Starting bot...")
     await init_db()
     logger.info("Database initialized!")
     
+    # A webhook left over from webhook mode would make getUpdates fail
+    await bot.delete_webhook()
+    
     # Start polling
     await dp.start_polling(bot)
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
     asyncio.run(main())
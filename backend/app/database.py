@@ -1,16 +1,64 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import timezone
+from typing import Iterator
+from sqlalchemy import DateTime, TypeDecorator, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from app.config import settings
 
+logger = logging.getLogger(__name__)
+
 
 class Base(DeclarativeBase):
     pass
 
 
+class UTCDateTime(TypeDecorator):
+    """
+    TIMESTAMP WITH TIME ZONE that always round-trips aware UTC datetimes.
+
+    PostgreSQL does this natively; SQLite stores no offset and hands back
+    naive values, which cannot be compared with datetime.now(timezone.utc).
+    """
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if value is not None and value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value
+
+
+def engine_options(url: str) -> dict:
+    """Engine keyword arguments shared by every engine we create."""
+    options = {
+        "echo": False,
+        "pool_pre_ping": True,
+        "query_cache_size": settings.DB_COMPILED_CACHE_SIZE,
+    }
+    if not url.startswith("sqlite"):
+        options["pool_size"] = settings.DB_POOL_SIZE
+        options["max_overflow"] = settings.DB_MAX_OVERFLOW
+    if "+asyncpg" in url:
+        options["connect_args"] = {
+            "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+        }
+    return options
+
+
 engine = create_async_engine(
     settings.DATABASE_URL,
-    echo=False,
-    pool_pre_ping=True,
+    **engine_options(settings.DATABASE_URL),
 )
 
 async_session = async_sessionmaker(
@@ -33,5 +81,84 @@ async def get_db() -> AsyncSession:
 
 
 async def init_db():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    """
+    Check every shard's schema is at the latest migration, upgrading it
+    when DB_AUTO_MIGRATE is set (see app.schema).
+    """
+    # Imported here because it builds on this module
+    from app.schema import ensure_schema
+    
+    return await ensure_schema()
+
+
+# -- Statement budgets --------------------------------------------------------
+#
+# Every engine (all shards) reports each statement to the QueryStats of the
+# current scope: an HTTP request, a websocket action or a mining tick (see
+# track_queries). Outside a scope the hooks only do a ContextVar lookup.
+
+@dataclass
+class QueryStats:
+    label: str
+    statements: int = 0
+    db_time: float = 0.0  # seconds spent in cursor.execute
+
+    @property
+    def db_time_ms(self) -> float:
+        return self.db_time * 1000
+
+
+_query_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    if _query_stats.get() is not None:
+        conn.info["query_started"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _end_statement(conn, cursor, statement, parameters, context, executemany):
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_time += time.perf_counter() - conn.info.pop("query_started", time.perf_counter())
+
+
+def current_query_stats() -> QueryStats | None:
+    return _query_stats.get()
+
+
+@contextmanager
+def track_queries(label: str) -> Iterator[QueryStats]:
+    """
+    Count statements and DB time issued inside the block (any engine).
+    A nested scope's counts are added to the enclosing one when it ends.
+    """
+    parent = _query_stats.get()
+    stats = QueryStats(label)
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+        if parent is not None:
+            parent.statements += stats.statements
+            parent.db_time += stats.db_time
+        logger.debug("%s: %d statements, %.1f ms in db", label, stats.statements, stats.db_time_ms)
+
+
+@contextmanager
+def assert_query_budget(max_statements: int, label: str = "block") -> Iterator[QueryStats]:
+    """
+    Fail if the block issues more than `max_statements` statements.
+
+        with assert_query_budget(2, "get_status"):
+            await mining.get_status(user_id)
+    """
+    with track_queries(label) as stats:
+        yield stats
+    if stats.statements > max_statements:
+        raise AssertionError(
+            f"{label}: {stats.statements} statements, budget is {max_statements}"
+        )
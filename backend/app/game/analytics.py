@@ -0,0 +1,201 @@
+"""
+Hourly XP/ore analytics.
+
+Awards are counted in memory per (user, skill, hour) and periodically
+upserted into `xp_rollups` with batched statements per shard, so
+analytics add no per-event writes to the mining hot path. A statement
+carries at most UPSERT_CHUNK rows (five binds each), well under the
+drivers' limit of 32,767 binds. Counters that fail to flush are kept and
+retried on the next flush; counters still in memory when the process
+dies are lost (analytics only, never game state).
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import XpRollup
+from app.sharding import shards
+
+logger = logging.getLogger(__name__)
+
+# Rows per upsert statement
+UPSERT_CHUNK = 2000
+
+# (user_id, skill_type, hour) -> [xp, actions]
+Counters = dict[tuple[int, str, datetime], list[int]]
+
+
+def hour_bucket(at: datetime) -> datetime:
+    return at.replace(minute=0, second=0, microsecond=0)
+
+
+class RollupAggregator:
+    """Accumulates award counters in memory and flushes them in batches."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._counters: Counters = {}
+        self._task: asyncio.Task | None = None
+
+    def record(self, user_id: int, skill_type: str, xp: int, actions: int = 1, at: datetime | None = None):
+        """Count an award. Cheap: a dict update, no I/O."""
+        hour = hour_bucket(at or datetime.now(timezone.utc))
+        counter = self._counters.get((user_id, skill_type, hour))
+        if counter is None:
+            self._counters[(user_id, skill_type, hour)] = [xp, actions]
+        else:
+            counter[0] += xp
+            counter[1] += actions
+
+    @property
+    def pending(self) -> int:
+        return len(self._counters)
+
+    def drain(self) -> Counters:
+        """Take all pending counters without writing them."""
+        counters, self._counters = self._counters, {}
+        return counters
+
+    async def flush(self) -> int:
+        """Upsert all pending counters. Returns the number of rows written."""
+        if not self._counters:
+            return 0
+        counters = self.drain()
+
+        by_shard: dict[int, list[dict]] = {}
+        for (user_id, skill_type, hour), (xp, actions) in counters.items():
+            by_shard.setdefault(shards.shard_for(user_id), []).append({
+                "user_id": user_id,
+                "skill_type": skill_type,
+                "hour": hour,
+                "xp": xp,
+                "actions": actions,
+            })
+
+        written = 0
+        for index, shard_rows in by_shard.items():
+            for start in range(0, len(shard_rows), UPSERT_CHUNK):
+                rows = shard_rows[start:start + UPSERT_CHUNK]
+                try:
+                    await self._upsert(index, rows)
+                    written += len(rows)
+                except Exception:
+                    logger.exception("Rollup flush failed for shard %d; will retry", index)
+                    for row in rows:
+                        self.record(row["user_id"], row["skill_type"], row["xp"], row["actions"], row["hour"])
+        return written
+
+    async def _upsert(self, shard: int, rows: list[dict]):
+        shard_engine = shards.engines[shard]
+        dialect = postgresql if shard_engine.dialect.name == "postgresql" else sqlite
+        statement = dialect.insert(XpRollup).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=["user_id", "skill_type", "hour"],
+            set_={
+                "xp": XpRollup.xp + statement.excluded.xp,
+                "actions": XpRollup.actions + statement.excluded.actions,
+            },
+        )
+        async with shard_engine.begin() as conn:
+            await conn.execute(statement)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def start(self):
+        """Start periodic flushing (idempotent)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop periodic flushing and flush what is left."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+# Global aggregator, flushed from the app lifespan
+rollups = RollupAggregator(settings.ROLLUP_FLUSH_INTERVAL)
+
+
+def _serialize(row) -> dict:
+    data = dict(row._mapping)
+    data["period"] = data["period"].isoformat() if isinstance(data["period"], datetime) else str(data["period"])
+    return data
+
+
+async def user_history(db: AsyncSession, user_id: int, hours: int, skill_type: str | None = None) -> list[dict]:
+    """Hourly XP and actions for one player over the last `hours` hours."""
+    since = hour_bucket(datetime.now(timezone.utc)) - timedelta(hours=hours - 1)
+    query = (
+        select(
+            XpRollup.hour.label("period"),
+            XpRollup.skill_type,
+            XpRollup.xp,
+            XpRollup.actions,
+        )
+        .where(XpRollup.user_id == user_id, XpRollup.hour >= since)
+        .order_by(XpRollup.hour, XpRollup.skill_type)
+    )
+    if skill_type:
+        query = query.where(XpRollup.skill_type == skill_type)
+    result = await db.execute(query)
+    return [_serialize(row) for row in result]
+
+
+def _period(db: AsyncSession, bucket: str):
+    if bucket == "hour":
+        return XpRollup.hour
+    if db.bind.dialect.name == "postgresql":
+        return func.date_trunc("day", XpRollup.hour)
+    return func.date(XpRollup.hour)
+
+
+async def global_totals(days: int, bucket: str = "hour", skill_type: str | None = None) -> list[dict]:
+    """
+    XP, actions and active players per hour or day across all shards.
+
+    Players live on exactly one shard, so per-shard distinct counts add up.
+    """
+    since = hour_bucket(datetime.now(timezone.utc)) - timedelta(days=days)
+
+    async def shard_totals(db: AsyncSession) -> list[dict]:
+        period = _period(db, bucket).label("period")
+        query = (
+            select(
+                period,
+                func.sum(XpRollup.xp).label("xp"),
+                func.sum(XpRollup.actions).label("actions"),
+                func.count(func.distinct(XpRollup.user_id)).label("active_players"),
+            )
+            .where(XpRollup.hour >= since)
+            .group_by(period)
+        )
+        if skill_type:
+            query = query.where(XpRollup.skill_type == skill_type)
+        result = await db.execute(query)
+        return [_serialize(row) for row in result]
+
+    totals: dict[str, dict] = {}
+    for rows in await shards.scatter(shard_totals):
+        for row in rows:
+            total = totals.setdefault(
+                row["period"],
+                {"period": row["period"], "xp": 0, "actions": 0, "active_players": 0}
+            )
+            for key in ("xp", "actions", "active_players"):
+                total[key] += int(row[key] or 0)
+    return [totals[period] for period in sorted(totals)]
@@ -0,0 +1,35 @@
+"""
+Time source for game logic.
+
+Game code asks an injected clock for "now" instead of calling
+datetime.now() directly, so the simulator (benchmarks/simulator.py) can
+drive the real mining and settlement code on virtual time.
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+Clock = Callable[[], datetime]
+
+
+def utcnow() -> datetime:
+    """The default clock: wall time, UTC."""
+    return datetime.now(timezone.utc)
+
+
+class VirtualClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self, start: datetime | None = None):
+        self.now = start or datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def __call__(self) -> datetime:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += timedelta(seconds=seconds)
+
+    def set(self, at: datetime):
+        if at < self.now:
+            raise ValueError("VirtualClock cannot move backwards")
+        self.now = at
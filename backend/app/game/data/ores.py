@@ -8,13 +8,22 @@ Each ore has:
 - mining_time: Base time to mine in seconds
 - ascii: ASCII representation
 - color: Hex color for UI
+- item_id: Stable integer id of the mined item, used as its slot in the
+  compact inventory. Never renumber or reuse an item_id.
+
+The table is compiled once at import into read-only lookups: ores in
+level order, the ores unlocked at each level threshold (found by bisect,
+shared rather than rebuilt per call) and the serialized definitions the
+API sends.
 """
 
+from bisect import bisect_right
 from dataclasses import dataclass
-from typing import Dict
+from types import MappingProxyType
+from typing import Mapping
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Ore:
     id: str
     name: str
@@ -24,9 +33,10 @@ class Ore:
     ascii: str
     color: str
     description: str
+    item_id: int
 
 
-ORES: Dict[str, Ore] = {
+ORES: Mapping[str, Ore] = MappingProxyType({
     "copper": Ore(
         id="copper",
         name="Copper Ore",
@@ -35,7 +45,8 @@ ORES: Dict[str, Ore] = {
         mining_time=2.0,
         ascii="[Cu]",
         color="#B87333",
-        description="A common ore, perfect for beginners."
+        description="A common ore, perfect for beginners.",
+        item_id=1
     ),
     "iron": Ore(
         id="iron",
@@ -45,7 +56,8 @@ ORES: Dict[str, Ore] = {
         mining_time=3.5,
         ascii="[Fe]",
         color="#A19D94",
-        description="A sturdy ore used in many tools."
+        description="A sturdy ore used in many tools.",
+        item_id=2
     ),
     "silver": Ore(
         id="silver",
@@ -55,7 +67,8 @@ ORES: Dict[str, Ore] = {
         mining_time=5.0,
         ascii="[Ag]",
         color="#C0C0C0",
-        description="A precious metal with a brilliant shine."
+        description="A precious metal with a brilliant shine.",
+        item_id=3
     ),
     "gold": Ore(
         id="gold",
@@ -65,7 +78,8 @@ ORES: Dict[str, Ore] = {
         mining_time=7.0,
         ascii="[Au]",
         color="#FFD700",
-        description="The most sought-after precious metal."
+        description="The most sought-after precious metal.",
+        item_id=4
     ),
     "mithril": Ore(
         id="mithril",
@@ -75,9 +89,31 @@ ORES: Dict[str, Ore] = {
         mining_time=10.0,
         ascii="[Mi]",
         color="#4169E1",
-        description="A legendary ore of immense power."
+        description="A legendary ore of immense power.",
+        item_id=5
     ),
-}
+})
+
+# Level order (item_id breaks ties, so the order never depends on the table's)
+ORES_BY_LEVEL: tuple[Ore, ...] = tuple(sorted(ORES.values(), key=lambda ore: (ore.level_required, ore.item_id)))
+_UNLOCK_LEVELS = [ore.level_required for ore in ORES_BY_LEVEL]
+# _UNLOCKED[n] is the first n ores in level order
+_UNLOCKED = tuple(ORES_BY_LEVEL[:n] for n in range(len(ORES_BY_LEVEL) + 1))
+
+# What GET /game/ores returns, in level order
+ORE_DEFINITIONS: tuple[dict, ...] = tuple(
+    {
+        "id": ore.id,
+        "name": ore.name,
+        "level_required": ore.level_required,
+        "xp": ore.xp,
+        "mining_time": ore.mining_time,
+        "ascii": ore.ascii,
+        "color": ore.color,
+        "description": ore.description
+    }
+    for ore in ORES_BY_LEVEL
+)
 
 
 def get_ore(ore_id: str) -> Ore | None:
@@ -85,11 +121,18 @@ def get_ore(ore_id: str) -> Ore | None:
     return ORES.get(ore_id)
 
 
-def get_available_ores(level: int) -> list[Ore]:
-    """Get all ores available at a given mining level."""
-    return [ore for ore in ORES.values() if ore.level_required <= level]
+def get_available_ores(level: int) -> tuple[Ore, ...]:
+    """Get all ores available at a given mining level, in level order."""
+    return _UNLOCKED[bisect_right(_UNLOCK_LEVELS, level)]
+
+
+def get_ore_by_item_type(item_type: str) -> Ore | None:
+    """Get the ore that produces an inventory item (e.g. "copper_ore")."""
+    if not item_type.endswith("_ore"):
+        return None
+    return ORES.get(item_type[:-len("_ore")])
 
 
-def get_all_ores() -> list[Ore]:
+def get_all_ores() -> tuple[Ore, ...]:
     """Get all ores sorted by level requirement."""
-    return sorted(ORES.values(), key=lambda x: x.level_required)
+    return ORES_BY_LEVEL
@@ -0,0 +1,177 @@
+"""
+Skill and action definitions for the action engine.
+
+A skill is a set of repeatable actions. Each action takes `duration`
+seconds, gives `xp`, and produces one `item_type` per completion. Every
+part of the engine (ActionSkill, the ActionScheduler, settlement, the
+event log and the inventory backends) works from these tables, so a new
+skill is a new SKILLS entry, with its actions declared as data like
+ORES, and adds no code paths, loops or tasks.
+
+Each action has:
+- skill_type / id: the skill row's skill_type and current_action
+- name: Display name
+- level_required: Minimum skill level to perform it
+- xp: XP gained per completion
+- duration: Seconds per completion
+- item_type / item_id: The item produced. item_id is its stable slot in
+  the compact inventory, unique across all skills. Never renumber or
+  reuse an item_id.
+- ascii, color, description: UI
+
+Definitions are immutable. A SkillDef compiles its actions once, when
+built: level order, the actions unlocked at each level threshold (looked
+up by bisect) and their serialized form for statuses, so get_status only
+adds the per-player fields.
+
+Register skills at import time, before app.game.settlement (which builds
+its statements from ALL actions) is imported.
+"""
+
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Dict, Mapping
+
+from app.game.data.ores import ORES
+
+
+@dataclass(frozen=True, slots=True)
+class Action:
+    skill_type: str
+    id: str
+    name: str
+    level_required: int
+    xp: int
+    duration: float  # seconds
+    item_type: str
+    item_id: int
+    ascii: str = ""
+    color: str = ""
+    description: str = ""
+
+
+@dataclass(frozen=True, slots=True)
+class SkillDef:
+    skill_type: str
+    name: str  # "Mining"
+    verb: str  # "mine", for messages
+    verb_ing: str  # "mining"
+    actions: Mapping[str, Action] = field(default_factory=dict)
+    # Compiled from `actions` by __post_init__
+    ordered: tuple[Action, ...] = field(init=False, repr=False)
+    definitions: tuple[dict, ...] = field(init=False, repr=False)
+    _unlock_levels: list[int] = field(init=False, repr=False)
+    _unlocked: tuple[tuple[Action, ...], ...] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        ordered = tuple(sorted(self.actions.values(), key=lambda a: (a.level_required, a.item_id)))
+        assign = object.__setattr__  # frozen: set the compiled fields once
+        assign(self, "actions", MappingProxyType(dict(self.actions)))
+        assign(self, "ordered", ordered)
+        assign(self, "definitions", tuple(
+            {
+                "id": action.id,
+                "name": action.name,
+                "level_required": action.level_required,
+                "xp": action.xp,
+                "duration": action.duration,
+                "ascii": action.ascii,
+                "color": action.color,
+                "description": action.description
+            }
+            for action in ordered
+        ))
+        assign(self, "_unlock_levels", [action.level_required for action in ordered])
+        assign(self, "_unlocked", tuple(ordered[:n] for n in range(len(ordered) + 1)))
+
+    def unlocked(self, level: int) -> tuple[Action, ...]:
+        """The actions unlocked at `level`: a prefix of `ordered`."""
+        return self._unlocked[bisect_right(self._unlock_levels, level)]
+
+
+def _mining_actions() -> Dict[str, Action]:
+    return {
+        ore.id: Action(
+            skill_type="mining",
+            id=ore.id,
+            name=ore.name,
+            level_required=ore.level_required,
+            xp=ore.xp,
+            duration=ore.mining_time,
+            item_type=f"{ore.id}_ore",
+            item_id=ore.item_id,
+            ascii=ore.ascii,
+            color=ore.color,
+            description=ore.description,
+        )
+        for ore in ORES.values()
+    }
+
+
+SKILLS: Dict[str, SkillDef] = {}
+
+# item_type -> the action producing it
+ITEMS: Dict[str, Action] = {}
+
+# item_id - 1 -> item_type (None for unused ids): compact inventory slots
+_ITEM_SLOTS: tuple[str | None, ...] = ()
+
+
+def register_skill(skill: SkillDef):
+    """Add a skill, checking its items against every registered one."""
+    if skill.skill_type in SKILLS:
+        raise ValueError(f"Skill {skill.skill_type!r} is already registered")
+    item_ids = {action.item_id: action for action in ITEMS.values()}
+    for action in skill.actions.values():
+        if action.skill_type != skill.skill_type:
+            raise ValueError(f"Action {action.id!r} belongs to {action.skill_type!r}, not {skill.skill_type!r}")
+        if action.item_id < 1:
+            raise ValueError(f"Action {action.id!r} has item id {action.item_id}; ids start at 1")
+        if action.item_type in ITEMS or action.item_id in item_ids:
+            raise ValueError(f"Action {action.id!r} reuses item {action.item_type!r} / id {action.item_id}")
+        item_ids[action.item_id] = action
+    SKILLS[skill.skill_type] = skill
+    for action in skill.actions.values():
+        ITEMS[action.item_type] = action
+
+    global _ITEM_SLOTS
+    slots = [None] * max(item_ids, default=0)
+    for action in ITEMS.values():
+        slots[action.item_id - 1] = action.item_type
+    _ITEM_SLOTS = tuple(slots)
+
+
+register_skill(SkillDef(
+    skill_type="mining",
+    name="Mining",
+    verb="mine",
+    verb_ing="mining",
+    actions=_mining_actions(),
+))
+
+
+def get_skill(skill_type: str) -> SkillDef | None:
+    """Get a skill by type."""
+    return SKILLS.get(skill_type)
+
+
+def get_action(skill_type: str, action_id: str | None) -> Action | None:
+    """Get one of a skill's actions by ID."""
+    skill = SKILLS.get(skill_type)
+    return skill.actions.get(action_id) if skill and action_id else None
+
+
+def get_action_by_item_type(item_type: str) -> Action | None:
+    """Get the action that produces an inventory item (e.g. "copper_ore")."""
+    return ITEMS.get(item_type)
+
+
+def item_slots() -> tuple[str | None, ...]:
+    """Item type of each compact inventory slot (item_id - 1), None if unused."""
+    return _ITEM_SLOTS
+
+
+def all_actions() -> list[Action]:
+    """Every action of every skill."""
+    return list(ITEMS.values())
@@ -0,0 +1,278 @@
+"""
+Event-sourced skill progress (settings.EVENT_LOG_ENABLED).
+
+Instead of rewriting the hot `skills` / `inventory` rows on every completion, a
+settlement appends one compact `settle` event to `action_events`.
+Start/stop are logged as well. Player state is
+
+    snapshot (skills + inventory rows) + events with id > Skill.event_watermark
+
+and a background compactor folds pending events into the snapshot and
+advances the watermark. Events are never deleted: the log is the audit
+trail and can rebuild a player's totals from scratch.
+
+In this mode the skills row is only written by the compactor: start,
+stop and settle are all events, and readers fold the pending ones over
+the snapshot. The state version stays consistent across compaction:
+readers see `Skill.version + len(pending)` and the compactor adds
+len(pending) to the stored version when it folds them.
+
+Writers of a player's events (start, stop, settle) and the compactor all
+lock the player's users row FOR UPDATE first (lock_player), so a writer
+always folds the events its predecessor committed and never appends a
+second settle for the same completions.
+
+    python -m app.game.events audit <telegram_id>
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import ActionEvent, Skill, User
+from app.game.data.skills import get_action
+from app.game.data.xp_table import get_level_for_xp
+from app.game.inventory import get_inventory_store
+from app.sharding import shards
+
+logger = logging.getLogger(__name__)
+
+PENDING_EVENTS = (
+    select(ActionEvent)
+    .where(
+        ActionEvent.user_id == bindparam("user_id"),
+        ActionEvent.skill_type == bindparam("skill_type"),
+        ActionEvent.id > bindparam("watermark"),
+    )
+    .order_by(ActionEvent.id)
+)
+
+
+@dataclass
+class FoldedState:
+    """A skill snapshot with pending events applied (never written back)."""
+    xp: int
+    level: int
+    version: int
+    current_action: str | None
+    action_started: datetime | None
+    # item_type -> quantity still to be added to the inventory snapshot
+    inventory_delta: dict[str, int] = field(default_factory=dict)
+    last_event_id: int = 0
+
+
+def fold(skill: Skill, events: list[ActionEvent]) -> FoldedState:
+    """Apply pending events to a skill snapshot, in memory."""
+    state = FoldedState(
+        xp=skill.xp,
+        level=skill.level,
+        version=skill.version + len(events),
+        current_action=skill.current_action,
+        action_started=skill.action_started,
+        last_event_id=skill.event_watermark,
+    )
+    for event in events:
+        state.last_event_id = event.id
+        if event.kind == "start":
+            state.current_action = event.action
+            state.action_started = event.settled_until
+        elif event.kind == "stop":
+            state.current_action = None
+            state.action_started = None
+        elif event.kind == "settle":
+            state.xp += event.xp
+            item_type = get_action(skill.skill_type, event.action).item_type
+            state.inventory_delta[item_type] = state.inventory_delta.get(item_type, 0) + event.amount
+            if event.action == state.current_action:
+                state.action_started = event.settled_until
+    if state.xp != skill.xp:
+        state.level = max(state.level, get_level_for_xp(state.xp))
+    return state
+
+
+async def pending_events(db: AsyncSession, skill: Skill) -> list[ActionEvent]:
+    """Events appended after the skill's snapshot watermark."""
+    result = await db.execute(
+        PENDING_EVENTS,
+        {"user_id": skill.user_id, "skill_type": skill.skill_type, "watermark": skill.event_watermark}
+    )
+    return list(result.scalars())
+
+
+PLAYER_LOCK = (
+    select(User.telegram_id)
+    .where(User.telegram_id == bindparam("user_id"))
+    .with_for_update()
+)
+
+
+async def lock_player(db: AsyncSession, user_id: int):
+    """
+    Lock the player's users row until the transaction ends. Call it
+    before reading the state an event is derived from: under READ
+    COMMITTED the following statements then see every event committed by
+    the previous holder.
+    """
+    await db.execute(PLAYER_LOCK, {"user_id": user_id})
+
+
+def append(db: AsyncSession, user_id: int, skill_type: str, kind: str, **fields) -> ActionEvent:
+    """Append an event to the session (written on the next flush)."""
+    event = ActionEvent(user_id=user_id, skill_type=skill_type, kind=kind, **fields)
+    db.add(event)
+    return event
+
+
+async def compact_user(db: AsyncSession, skill: Skill) -> int:
+    """
+    Fold a skill's pending events into its snapshot. The caller must hold
+    the player's users row FOR UPDATE (see compact_shard). Returns events
+    folded.
+    """
+    events = await pending_events(db, skill)
+    if not events:
+        return 0
+
+    state = fold(skill, events)
+    inventory = get_inventory_store(db)
+    for item_type, amount in state.inventory_delta.items():
+        await inventory.add(skill.user_id, item_type, amount)
+
+    skill.xp = state.xp
+    skill.level = state.level
+    skill.version = state.version
+    skill.current_action = state.current_action
+    skill.action_started = state.action_started
+    skill.event_watermark = state.last_event_id
+    await db.flush()
+    return len(events)
+
+
+async def compact_shard(shard: int, batch_size: int) -> int:
+    """
+    Compact one batch of players with pending events on a shard.
+
+    Appending an event takes a KEY SHARE lock on the player's users row
+    (the foreign key check), so locking that row FOR UPDATE waits out any
+    in-flight append and blocks new ones until the fold commits: no event
+    can commit with an id below the new watermark.
+    """
+    async with shards.sessionmakers[shard]() as db:
+        result = await db.execute(
+            select(Skill)
+            .join(User, User.telegram_id == Skill.user_id)
+            .where(
+                select(ActionEvent.id)
+                .where(
+                    ActionEvent.user_id == Skill.user_id,
+                    ActionEvent.skill_type == Skill.skill_type,
+                    ActionEvent.id > Skill.event_watermark,
+                )
+                .exists()
+            )
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        folded = 0
+        for skill in result.scalars():
+            folded += await compact_user(db, skill)
+        await db.commit()
+    return folded
+
+
+class Compactor:
+    """Background task that folds the action log into snapshots."""
+
+    def __init__(self, interval: float, batch_size: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: asyncio.Task | None = None
+
+    async def run_once(self) -> int:
+        folded = 0
+        for shard in range(len(shards)):
+            while True:
+                batch = await compact_shard(shard, self.batch_size)
+                folded += batch
+                if batch == 0:
+                    break
+        return folded
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                folded = await self.run_once()
+                if folded:
+                    logger.info("Compacted %d action events", folded)
+            except Exception:
+                logger.exception("Action log compaction failed")
+
+    def start(self):
+        """Start compacting (idempotent). No-op unless EVENT_LOG_ENABLED."""
+        if not settings.EVENT_LOG_ENABLED:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+compactor = Compactor(settings.EVENT_COMPACT_INTERVAL, settings.EVENT_COMPACT_BATCH)
+
+
+async def replay(db: AsyncSession, user_id: int) -> dict:
+    """Rebuild a player's totals from the full log (ignores snapshots)."""
+    result = await db.execute(
+        select(ActionEvent).where(ActionEvent.user_id == user_id).order_by(ActionEvent.id)
+    )
+    skills: dict[str, dict] = {}
+    for event in result.scalars():
+        state = skills.setdefault(event.skill_type, {"xp": 0, "inventory": {}, "current_action": None, "events": 0})
+        state["events"] += 1
+        if event.kind == "start":
+            state["current_action"] = event.action
+        elif event.kind == "stop":
+            state["current_action"] = None
+        elif event.kind == "settle":
+            state["xp"] += event.xp
+            item_type = get_action(event.skill_type, event.action).item_type
+            state["inventory"][item_type] = state["inventory"].get(item_type, 0) + event.amount
+    for state in skills.values():
+        state["level"] = get_level_for_xp(state["xp"])
+    return skills
+
+
+async def _main(argv: list[str]):
+    if len(argv) != 2 or argv[0] != "audit":
+        print("usage: python -m app.game.events audit <telegram_id>")
+        return
+
+    user_id = int(argv[1])
+    async with shards.session(user_id) as db:
+        logged = await replay(db, user_id)
+        snapshots = (await db.execute(select(Skill).where(Skill.user_id == user_id))).scalars().all()
+        for skill in snapshots:
+            state = fold(skill, await pending_events(db, skill))
+            print(f"{skill.skill_type}: snapshot+pending xp={state.xp} level={state.level} action={state.current_action}")
+        for skill_type, state in logged.items():
+            print(f"{skill_type}: replayed log  xp={state['xp']} level={state['level']} "
+                  f"action={state['current_action']} inventory={state['inventory']} ({state['events']} events)")
+    await shards.dispose()
+
+
+if __name__ == "__main__":
+    import sys
+    asyncio.run(_main(sys.argv[1:]))
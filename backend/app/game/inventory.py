@@ -0,0 +1,203 @@
+"""
+Inventory storage backends.
+
+- RowInventory: the `inventory` table, one row per (user, item_type).
+- CompactInventory: the `inventory_bags` table, one row per user holding
+  an integer array indexed by each item's stable item_id. Increments are
+  single atomic upserts, so there is no read-modify-write. PostgreSQL only.
+
+Select the backend with settings.INVENTORY_STORAGE. Existing row data is
+moved over with:
+
+    python -m app.game.inventory migrate
+"""
+
+import asyncio
+from sqlalchemy import select, text, bindparam, BigInteger, Integer
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncConnection
+
+from app.config import settings
+from app.models import InventoryItem
+from app.game.data.skills import all_actions, get_action_by_item_type, item_slots
+
+
+# Hot-path statements, built once at import (see SKILL_BY_USER in
+# app/game/skills/action.py).
+ITEM_BY_USER = select(InventoryItem).where(
+    InventoryItem.user_id == bindparam("user_id"),
+    InventoryItem.item_type == bindparam("item_type")
+)
+
+COUNTS_BY_USER = select(InventoryItem.item_type, InventoryItem.quantity).where(
+    InventoryItem.user_id == bindparam("user_id")
+)
+
+
+class RowInventory:
+    """One `inventory` row per (user, item_type)."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_item(self, user_id: int, item_type: str) -> InventoryItem:
+        """Get or create inventory item."""
+        result = await self.db.execute(
+            ITEM_BY_USER,
+            {"user_id": user_id, "item_type": item_type}
+        )
+        item = result.scalar_one_or_none()
+
+        if not item:
+            item = InventoryItem(
+                user_id=user_id,
+                item_type=item_type,
+                quantity=0
+            )
+            self.db.add(item)
+            await self.db.flush()
+
+        return item
+
+    async def get_counts(self, user_id: int) -> dict[str, int]:
+        """Get item_type -> quantity for all of a user's items (one query)."""
+        result = await self.db.execute(COUNTS_BY_USER, {"user_id": user_id})
+        return {item_type: quantity for item_type, quantity in result.all()}
+
+    async def add(self, user_id: int, item_type: str, amount: int = 1) -> int:
+        """Add to an item's quantity. Returns the new quantity."""
+        item = await self.get_item(user_id, item_type)
+        item.quantity += amount
+        return item.quantity
+
+
+# Element-wise sum of the stored array and an incoming one; unnest pads the
+# shorter array with NULLs.
+MERGE_COUNTS_SQL = """
+    ARRAY(
+        SELECT coalesce(a, 0) + coalesce(b, 0)
+        FROM unnest(inventory_bags.counts, excluded.counts) WITH ORDINALITY AS t(a, b, n)
+        ORDER BY n
+    )
+"""
+
+_ADD_SQL = text("""
+INSERT INTO inventory_bags (user_id, counts)
+VALUES (:user_id, array_fill(0::bigint, ARRAY[:slot - 1]) || :amount)
+ON CONFLICT (user_id) DO UPDATE
+SET counts[:slot] = coalesce(inventory_bags.counts[:slot], 0) + :amount
+RETURNING counts[:slot]
+""").bindparams(
+    bindparam("user_id", type_=BigInteger),
+    bindparam("slot", type_=Integer),
+    bindparam("amount", type_=BigInteger),
+)
+
+_COUNTS_SQL = text(
+    "SELECT counts FROM inventory_bags WHERE user_id = :user_id"
+).bindparams(bindparam("user_id", type_=BigInteger))
+
+
+class CompactInventory:
+    """One `inventory_bags` row per user; counts indexed by Action.item_id."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @staticmethod
+    def slot_for(item_type: str) -> int:
+        action = get_action_by_item_type(item_type)
+        if action is None:
+            raise ValueError(f"No stable item id for {item_type!r}")
+        return action.item_id
+
+    async def get_counts(self, user_id: int) -> dict[str, int]:
+        """Get item_type -> quantity for all of a user's items (one query)."""
+        result = await self.db.execute(_COUNTS_SQL, {"user_id": user_id})
+        counts = result.scalar_one_or_none() or []
+
+        return {
+            item_type: count
+            for item_type, count in zip(item_slots(), counts)
+            if count and item_type is not None
+        }
+
+    async def add(self, user_id: int, item_type: str, amount: int = 1) -> int:
+        """Atomically add to an item's quantity. Returns the new quantity."""
+        result = await self.db.execute(
+            _ADD_SQL,
+            {"user_id": user_id, "slot": self.slot_for(item_type), "amount": amount}
+        )
+        return result.scalar_one()
+
+
+def get_inventory_store(db: AsyncSession) -> RowInventory | CompactInventory:
+    """Inventory backend selected by settings.INVENTORY_STORAGE."""
+    if settings.INVENTORY_STORAGE == "compact":
+        return CompactInventory(db)
+    return RowInventory(db)
+
+
+def _item_values() -> str:
+    return ", ".join(f"('{action.item_type}', {action.item_id})" for action in all_actions())
+
+
+MIGRATE_ROWS_SQL = text(f"""
+WITH item_defs (item_type, item_id) AS (
+    VALUES {_item_values()}
+),
+per_item AS (
+    SELECT i.user_id, d.item_id, sum(i.quantity)::bigint AS quantity
+    FROM inventory i
+    JOIN item_defs d ON d.item_type = i.item_type
+    GROUP BY i.user_id, d.item_id
+),
+max_slot AS (
+    SELECT max(item_id) AS n FROM item_defs
+)
+INSERT INTO inventory_bags (user_id, counts)
+SELECT u.user_id,
+       ARRAY(
+           SELECT coalesce(p.quantity, 0)
+           FROM generate_series(1, (SELECT n FROM max_slot)) AS g(slot)
+           LEFT JOIN per_item p ON p.user_id = u.user_id AND p.item_id = g.slot
+           ORDER BY g.slot
+       )
+FROM (SELECT DISTINCT user_id FROM per_item) u
+ON CONFLICT (user_id) DO UPDATE
+SET counts = {MERGE_COUNTS_SQL}
+""")
+
+
+async def migrate_rows_to_compact(conn: AsyncConnection, delete_rows: bool = False) -> int:
+    """
+    Fold `inventory` rows into `inventory_bags`, adding to any existing bag.
+
+    Run once while writers are stopped (or before switching
+    INVENTORY_STORAGE); running it twice double-counts unless the rows
+    were deleted. Returns the number of bags written.
+    """
+    result = await conn.execute(MIGRATE_ROWS_SQL)
+    if delete_rows:
+        await conn.execute(text("DELETE FROM inventory"))
+    return result.rowcount
+
+
+async def _main(argv: list[str]):
+    from app.database import init_db
+    from app.sharding import shards
+
+    if not argv or argv[0] != "migrate":
+        print("usage: python -m app.game.inventory migrate [--delete-rows]")
+        return
+
+    await init_db()
+    for index, shard_engine in enumerate(shards.engines):
+        async with shard_engine.begin() as conn:
+            bags = await migrate_rows_to_compact(conn, delete_rows="--delete-rows" in argv)
+        print(f"Shard {index}: migrated inventory for {bags} users to inventory_bags")
+    await shards.dispose()
+
+
+if __name__ == "__main__":
+    import sys
+    asyncio.run(_main(sys.argv[1:]))
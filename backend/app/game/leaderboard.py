@@ -0,0 +1,76 @@
+"""
+Mining leaderboard.
+
+Players are spread across shards, so the top-N is computed per shard and
+merged (scatter-gather).
+
+The result is cached in-process for LEADERBOARD_CACHE_TTL seconds and
+shared by everything in the process: /game/leaderboard and, in webhook
+mode, the bot's leaderboard button. Concurrent misses wait for a single
+refresh instead of each scattering to every shard.
+"""
+
+import asyncio
+import time
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import User, Skill
+from app.sharding import merge_top
+
+SKILL_TYPE = "mining"
+
+# The cache always holds this many rows; smaller limits are slices of it
+CACHED_ROWS = 100
+
+
+async def _query_top(limit: int) -> list[dict]:
+    async def shard_top(db: AsyncSession) -> list[dict]:
+        result = await db.execute(
+            select(
+                Skill.user_id,
+                Skill.level,
+                Skill.xp,
+                User.username,
+                User.first_name,
+            )
+            .outerjoin(User, User.telegram_id == Skill.user_id)
+            .where(Skill.skill_type == SKILL_TYPE)
+            .order_by(Skill.xp.desc())
+            .limit(limit)
+        )
+        return [dict(row._mapping) for row in result]
+    
+    return await merge_top(shard_top, limit, key=lambda row: row["xp"])
+
+
+class LeaderboardCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._rows: list[dict] = []
+        self._expires = 0.0
+        self._lock = asyncio.Lock()
+    
+    def invalidate(self):
+        self._expires = 0.0
+    
+    async def top(self, limit: int) -> list[dict]:
+        if limit > CACHED_ROWS or self.ttl <= 0:
+            return await _query_top(limit)
+        if time.monotonic() >= self._expires:
+            async with self._lock:
+                # Another waiter may have refreshed it while we queued
+                if time.monotonic() >= self._expires:
+                    self._rows = await _query_top(CACHED_ROWS)
+                    self._expires = time.monotonic() + self.ttl
+        return self._rows[:limit]
+
+
+leaderboard_cache = LeaderboardCache(settings.LEADERBOARD_CACHE_TTL)
+
+
+async def top_miners(limit: int = 10) -> list[dict]:
+    """Top players by mining XP across all shards (cached briefly)."""
+    return await leaderboard_cache.top(limit)
@@ -0,0 +1,226 @@
+"""
+Live action scheduling for every connected player and skill.
+
+One task ticks all live actions (every skill of every player connected to
+this process), TICK_RATE seconds apart:
+
+- progress is computed in memory from each action's timer and reported
+  to the listener, with no database work;
+- due actions are settled together with one settle() call per shard,
+  restricted to the due players (the sweeper's code path), and the
+  completions are reported to the listener.
+
+A live player therefore costs a dict entry instead of a task and a query
+per tick, and a new skill adds nothing here. Timers mirror the skills
+rows: they are set when a player connects or starts an action and
+advanced by whole completions, as settlement advances action_started. A
+due action that settlement did not pay (stopped elsewhere, or locked by
+another writer) is reloaded from its row. A settlement that fails
+outright (the database is briefly unavailable) is retried next tick;
+only actions that fail TICK_MAX_FAILURES ticks in a row are dropped and
+reported to the listener.
+
+In event log mode the logged settle statement does not return totals, so
+due actions are settled one player at a time with ActionSkill.process_tick,
+still from this one task.
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Protocol
+
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.config import settings
+from app.database import track_queries
+from app.game.clock import Clock, utcnow
+from app.game.data.skills import Action, get_action
+from app.game.settlement import SettledAction, settle
+from app.game.skills.action import ActionResult, ActionSkill, completed_result
+from app.metrics import live_settle_failures
+from app.sharding import shards
+from app.tracing import start_trace
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class LiveAction:
+    user_id: int
+    skill_type: str
+    action: Action
+    started: datetime
+    generation: int  # the connection it reports to
+    failures: int = 0  # failed settlements in a row
+
+
+class ActionListener(Protocol):
+    async def action_progress(self, live: LiveAction, progress: float) -> None: ...
+    async def action_completed(self, live: LiveAction, result: ActionResult) -> None: ...
+    async def action_failed(self, live: LiveAction, error: Exception) -> None: ...
+
+
+def _result(done: SettledAction) -> ActionResult:
+    return completed_result(
+        done.action, int(done.amount), int(done.total_xp), done.old_level, done.new_level, int(done.quantity or 0)
+    )
+
+
+class ActionScheduler:
+    """Ticks every live action from a single task (see module docstring)."""
+
+    def __init__(self, listener: ActionListener, clock: Clock = utcnow, interval: float | None = None):
+        self.listener = listener
+        self.clock = clock
+        self.interval = interval if interval is not None else settings.TICK_RATE
+        # (user_id, skill_type) -> live action
+        self.live: dict[tuple[int, str], LiveAction] = {}
+        self._task: asyncio.Task | None = None
+
+    def track(self, user_id: int, skill_type: str, action_id: str, started: datetime, generation: int) -> bool:
+        """Tick a player's action from `started`. False if the action is unknown."""
+        action = get_action(skill_type, action_id)
+        if action is None:
+            self.untrack(user_id, skill_type)
+            return False
+        self.live[(user_id, skill_type)] = LiveAction(user_id, skill_type, action, started, generation)
+        return True
+
+    def untrack(self, user_id: int, skill_type: str | None = None):
+        """Stop ticking one of a player's skills, or all of them."""
+        if skill_type is not None:
+            self.live.pop((user_id, skill_type), None)
+            return
+        for key in [key for key in self.live if key[0] == user_id]:
+            del self.live[key]
+
+    def users(self) -> set[int]:
+        """Players with a live action here (the sweeper leaves them to us)."""
+        return {user_id for user_id, _ in self.live}
+
+    async def _resync(self, shard: int, unpaid: list[LiveAction]):
+        """Reload timers of due actions that settlement did not pay."""
+        async with shards.sessionmakers[shard]() as db:
+            for live in unpaid:
+                _, state = await ActionSkill(db, skill_type=live.skill_type).get_state(live.user_id)
+                if self.live.get((live.user_id, live.skill_type)) is not live:
+                    continue  # restarted or stopped meanwhile
+                if state.current_action is None or state.action_started is None:
+                    self.untrack(live.user_id, live.skill_type)
+                else:
+                    self.track(live.user_id, live.skill_type, state.current_action,
+                               state.action_started, live.generation)
+            await db.commit()
+
+    async def _settle_batch(self, shard: int, due: list[LiveAction], now: datetime) -> list[tuple]:
+        settled = await settle(shards.engines[shard], now=now, only={live.user_id for live in due}, notify=False)
+        paid = {(done.user_id, done.skill_type): done for done in settled}
+        completed, unpaid = [], []
+        for live in due:
+            done = paid.get((live.user_id, live.skill_type))
+            if done is None or done.action_id != live.action.id:
+                unpaid.append(live)
+                continue
+            live.started += timedelta(seconds=done.amount * live.action.duration)
+            completed.append((live, _result(done)))
+        if unpaid:
+            await self._resync(shard, unpaid)
+        return completed
+
+    async def _settle_each(self, shard: int, due: list[LiveAction], now: datetime) -> list[tuple]:
+        completed = []
+        async with shards.sessionmakers[shard]() as db:
+            for live in due:
+                try:
+                    result = await ActionSkill(db, clock=lambda: now, skill_type=live.skill_type).process_tick(live.user_id)
+                    await db.commit()
+                except StaleDataError:
+                    continue  # lost every retry to another writer; still due next tick
+                if result is None:
+                    self.untrack(live.user_id, live.skill_type)
+                elif result.completed:
+                    live.started = now
+                    completed.append((live, result))
+        return completed
+
+    async def _settle_shard(self, shard: int, due: list[LiveAction], now: datetime) -> list[tuple]:
+        """Settle one shard's due actions. Returns (live, result) per completion."""
+        try:
+            if settings.EVENT_LOG_ENABLED:
+                return await self._settle_each(shard, due, now)
+            return await self._settle_batch(shard, due, now)
+        except StaleDataError:
+            # Another writer got there first; they are still due next tick
+            return []
+        except Exception as e:
+            live_settle_failures.inc(len(due))
+            dropped = []
+            for live in due:
+                live.failures += 1
+                if live.failures >= settings.TICK_MAX_FAILURES:
+                    self.untrack(live.user_id, live.skill_type)
+                    dropped.append((live, e))
+            if dropped:
+                logger.exception("Settling live actions on shard %d failed; dropped %d", shard, len(dropped))
+            else:
+                logger.warning("Settling %d live actions on shard %d failed, retrying: %s", len(due), shard, e)
+            return dropped
+
+    async def tick(self) -> int:
+        """One pass over every live action. Returns completions reported."""
+        now = self.clock()
+        due: dict[int, list[LiveAction]] = defaultdict(list)
+        reports = []
+        for live in self.live.values():
+            elapsed = (now - live.started).total_seconds()
+            if elapsed >= live.action.duration:
+                due[shards.shard_for(live.user_id)].append(live)
+            else:
+                reports.append(self.listener.action_progress(live, elapsed / live.action.duration))
+
+        completions = 0
+        if due:
+            with start_trace("action tick", **{"actions.due": sum(map(len, due.values()))}), \
+                    track_queries("action tick"):
+                batches = await asyncio.gather(*(
+                    self._settle_shard(shard, shard_due, now) for shard, shard_due in due.items()
+                ))
+            for live, outcome in (pair for batch in batches for pair in batch):
+                if isinstance(outcome, Exception):
+                    reports.append(self.listener.action_failed(live, outcome))
+                else:
+                    live.failures = 0
+                    completions += 1
+                    reports.append(self.listener.action_completed(live, outcome))
+
+        await asyncio.gather(*reports, return_exceptions=True)
+        return completions
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            try:
+                await self.tick()
+            except Exception:
+                logger.exception("Action tick failed")
+            # Keep the cadence: a slow pass shortens the next wait
+            await asyncio.sleep(max(0.0, self.interval - (loop.time() - started)))
+
+    def start(self):
+        """Start ticking (idempotent)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop ticking."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,530 @@
+"""
+Bulk settlement of active skill actions.
+
+Players who close the app keep their `current_action`, so completions
+pile up unsettled until they reconnect. The sweeper settles every active
+skill of every player in one set-based statement: completions are
+computed in SQL from `action_started` and the action's `duration`
+(joined from a VALUES table built from every skill's actions in
+app.game.data.skills), then `skills` and `inventory` are updated in bulk.
+Live players are settled by the same code path, restricted to the due
+players (`only`), from the ActionScheduler (app.game.scheduler).
+
+Inventory is credited to whichever layout settings.INVENTORY_STORAGE
+selects. With settings.EVENT_LOG_ENABLED the sweep appends settle events
+to the action log instead (see app/game/events.py).
+
+The statements use PostgreSQL features (data-modifying CTEs,
+make_interval, SKIP LOCKED). Other databases (SQLite in development and
+in the simulator) get the same arithmetic in Python with batched
+executemany writes; event log mode is PostgreSQL only.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, NamedTuple
+
+from sqlalchemy import BigInteger, Boolean, DateTime, bindparam, insert, select, text, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.config import settings
+from app.models import InventoryItem, Skill
+from app.game.data.skills import Action, all_actions, get_action
+from app.game.inventory import MERGE_COUNTS_SQL
+from app.game.analytics import rollups
+from app.game.data.xp_table import XP_TABLE, get_level_for_xp
+from app import notifications
+
+logger = logging.getLogger(__name__)
+
+
+def _action_values() -> str:
+    rows = [
+        f"('{action.skill_type}', '{action.id}', {float(action.duration)!r}::float8, "
+        f"{int(action.xp)}, {int(action.item_id)}, '{action.item_type}')"
+        for action in all_actions()
+    ]
+    return ",\n        ".join(rows)
+
+
+def _level_values() -> str:
+    return ", ".join(f"({xp})" for xp in XP_TABLE)
+
+
+_ACTION_DEFS_SQL = f"""action_defs (skill_type, action_id, duration, action_xp, item_id, item_type) AS (
+    VALUES
+        {_action_values()}
+)"""
+
+
+# Inventory credit for the settled rows, one CTE chain per storage layout.
+# Rows bump inventory.version as an ORM write would, so a session still
+# holding the old row fails its flush instead of overwriting the credit.
+_ROW_CREDIT_SQL = """
+bumped AS (
+    UPDATE inventory i
+    SET quantity = i.quantity + st.amount, version = i.version + 1
+    FROM settled st
+    WHERE i.user_id = st.user_id
+      AND i.item_type = st.item_type
+    RETURNING i.user_id, i.item_type, i.quantity
+),
+inserted AS (
+    INSERT INTO inventory (user_id, item_type, quantity, version)
+    SELECT st.user_id, st.item_type, st.amount, 1
+    FROM settled st
+    WHERE NOT EXISTS (
+        SELECT 1 FROM bumped b
+        WHERE b.user_id = st.user_id AND b.item_type = st.item_type
+    )
+    RETURNING user_id, item_type, quantity
+),
+credited AS (
+    SELECT user_id, item_type, quantity FROM bumped
+    UNION ALL
+    SELECT user_id, item_type, quantity FROM inserted
+)
+"""
+
+# A player settling several skills gets one bag upsert: ON CONFLICT may
+# touch each row once per statement.
+_COMPACT_CREDIT_SQL = f"""
+bag_adds AS (
+    SELECT u.user_id,
+           array_agg(coalesce(st.amount, 0)::bigint ORDER BY g.slot) AS counts
+    FROM (SELECT user_id, max(item_id) AS n FROM settled GROUP BY user_id) u
+    CROSS JOIN LATERAL generate_series(1, u.n) AS g(slot)
+    LEFT JOIN settled st ON st.user_id = u.user_id AND st.item_id = g.slot
+    GROUP BY u.user_id
+),
+bagged AS (
+    INSERT INTO inventory_bags (user_id, counts)
+    SELECT user_id, counts FROM bag_adds
+    ON CONFLICT (user_id) DO UPDATE
+    SET counts = {MERGE_COUNTS_SQL}
+    RETURNING user_id, counts
+),
+credited AS (
+    SELECT st.user_id, st.item_type, b.counts[st.item_id] AS quantity
+    FROM bagged b
+    JOIN settled st ON st.user_id = b.user_id
+)
+"""
+
+# Players settled: everyone but :exclude, or with :all_users false only
+# the players in :only.
+_PLAYER_FILTER_SQL = "NOT (s.user_id = ANY(:exclude)) AND (:all_users OR s.user_id = ANY(:only))"
+
+
+def _bind(statement):
+    return statement.bindparams(
+        bindparam("now", type_=DateTime(timezone=True)),
+        bindparam("exclude", type_=ARRAY(BigInteger)),
+        bindparam("only", type_=ARRAY(BigInteger)),
+        bindparam("all_users", type_=Boolean),
+    )
+
+
+# Level for a given XP is the number of XP_TABLE thresholds it has reached,
+# which matches get_level_for_xp() since XP_TABLE[0] == 0.
+def _settle_sql(compact: bool):
+    return _bind(text(f"""
+WITH {_ACTION_DEFS_SQL},
+xp_levels (threshold) AS (
+    VALUES {_level_values()}
+),
+due AS (
+    SELECT s.id,
+           s.user_id,
+           a.skill_type,
+           a.action_id,
+           a.duration,
+           a.action_xp,
+           a.item_id,
+           a.item_type,
+           s.level AS old_level,
+           floor(extract(epoch FROM (:now - s.action_started)) / a.duration)::bigint AS amount
+    FROM skills s
+    JOIN action_defs a ON a.skill_type = s.skill_type AND a.action_id = s.current_action
+    WHERE s.current_action IS NOT NULL
+      AND s.action_started <= :now - make_interval(secs => a.duration)
+      AND {_PLAYER_FILTER_SQL}
+    FOR UPDATE OF s SKIP LOCKED
+),
+settled AS (
+    UPDATE skills s
+    SET xp = s.xp + d.amount * d.action_xp,
+        level = GREATEST(
+            s.level,
+            (SELECT count(*) FROM xp_levels l WHERE l.threshold <= s.xp + d.amount * d.action_xp)
+        ),
+        action_started = s.action_started + make_interval(secs => d.amount * d.duration),
+        version = s.version + 1
+    FROM due d
+    WHERE s.id = d.id
+    RETURNING s.user_id, d.skill_type, d.action_id, d.item_id, d.item_type, d.amount, d.action_xp,
+              s.xp AS total_xp, d.old_level, s.level AS new_level
+),
+{_COMPACT_CREDIT_SQL if compact else _ROW_CREDIT_SQL}
+SELECT st.user_id, st.skill_type, st.action_id, st.amount, st.amount * st.action_xp AS xp,
+       st.total_xp, st.old_level, st.new_level, c.quantity
+FROM settled st
+LEFT JOIN credited c ON c.user_id = st.user_id AND c.item_type = st.item_type
+"""))
+
+
+SETTLE_SQL = _settle_sql(compact=False)
+SETTLE_COMPACT_SQL = _settle_sql(compact=True)
+
+
+# Event-log mode (settings.EVENT_LOG_ENABLED): the players to settle are
+# locked first, in a statement of their own (see events.lock_player), so
+# SETTLE_LOGGED_SQL's snapshot includes every event committed by a live
+# writer or another sweep that held the lock. Players locked elsewhere are
+# skipped; they are settled by the lock holder or the next sweep.
+LOCK_LOGGED_SQL = text(f"""
+SELECT u.telegram_id
+FROM users u
+WHERE EXISTS (SELECT 1 FROM skills s WHERE s.user_id = u.telegram_id AND {_PLAYER_FILTER_SQL})
+FOR UPDATE OF u SKIP LOCKED
+""").bindparams(
+    bindparam("exclude", type_=ARRAY(BigInteger)),
+    bindparam("only", type_=ARRAY(BigInteger)),
+    bindparam("all_users", type_=Boolean),
+)
+
+# The live action and its timer origin come from the player's latest
+# pending event for the skill, if any, else from the snapshot. Settlement
+# appends one settle event per skill and writes no skills/inventory rows;
+# the compactor folds them later.
+SETTLE_LOGGED_SQL = _bind(text(f"""
+WITH {_ACTION_DEFS_SQL},
+latest AS (
+    SELECT DISTINCT ON (e.user_id, e.skill_type) e.user_id, e.skill_type, e.action, e.settled_until
+    FROM action_events e
+    JOIN skills s ON s.user_id = e.user_id AND s.skill_type = e.skill_type
+    WHERE e.id > s.event_watermark
+    ORDER BY e.user_id, e.skill_type, e.id DESC
+),
+live AS (
+    SELECT s.user_id,
+           s.skill_type,
+           CASE WHEN l.user_id IS NULL THEN s.current_action ELSE l.action END AS action,
+           CASE WHEN l.user_id IS NULL THEN s.action_started ELSE l.settled_until END AS started
+    FROM skills s
+    LEFT JOIN latest l ON l.user_id = s.user_id AND l.skill_type = s.skill_type
+    WHERE {_PLAYER_FILTER_SQL}
+),
+due AS (
+    SELECT lv.user_id,
+           a.skill_type,
+           a.action_id,
+           a.duration,
+           a.action_xp,
+           lv.started,
+           floor(extract(epoch FROM (:now - lv.started)) / a.duration)::bigint AS amount
+    FROM live lv
+    JOIN action_defs a ON a.skill_type = lv.skill_type AND a.action_id = lv.action
+    WHERE lv.started <= :now - make_interval(secs => a.duration)
+)
+INSERT INTO action_events (user_id, skill_type, kind, action, amount, xp, settled_until)
+SELECT user_id, skill_type, 'settle', action_id, amount, amount * action_xp,
+       started + make_interval(secs => amount * duration)
+FROM due
+RETURNING user_id, skill_type, action AS action_id, amount, xp,
+          NULL::bigint AS total_xp, NULL::int AS old_level, NULL::int AS new_level, NULL::bigint AS quantity
+"""))
+
+
+# -- Portable settlement (non-PostgreSQL) ---------------------------------------
+
+_skills = Skill.__table__
+_items = InventoryItem.__table__
+
+_ACTIVE_SKILLS = select(
+    _skills.c.id,
+    _skills.c.user_id,
+    _skills.c.skill_type,
+    _skills.c.xp,
+    _skills.c.level,
+    _skills.c.version,
+    _skills.c.current_action,
+    _skills.c.action_started,
+).where(
+    _skills.c.current_action.isnot(None),
+)
+
+_SETTLE_SKILL = (
+    update(_skills)
+    .where(_skills.c.id == bindparam("b_id"), _skills.c.version == bindparam("b_version"))
+    .values(
+        xp=bindparam("b_xp"),
+        level=bindparam("b_level"),
+        action_started=bindparam("b_started"),
+        version=bindparam("b_version") + 1,
+    )
+)
+
+_CREDIT_ITEM = (
+    update(_items)
+    .where(_items.c.id == bindparam("b_id"))
+    .values(quantity=_items.c.quantity + bindparam("b_amount"), version=_items.c.version + 1)
+)
+
+_LOOKUP_CHUNK = 500
+
+
+class SettlementUnsupported(RuntimeError):
+    """Bulk settlement cannot run with this database and configuration."""
+
+
+class SettledAction(NamedTuple):
+    """
+    One skill action paid out by a settlement. total_xp, levels and
+    quantity are None in event log mode.
+    """
+    user_id: int
+    skill_type: str
+    action_id: str
+    amount: int  # completions
+    xp: int
+    total_xp: int | None
+    old_level: int | None
+    new_level: int | None
+    quantity: int | None  # item count after the credit
+
+    @property
+    def action(self) -> Action:
+        return get_action(self.skill_type, self.action_id)
+
+
+async def _credit_rows(
+    conn: AsyncConnection,
+    credits: dict[tuple[int, str], int],
+) -> dict[tuple[int, str], int]:
+    """
+    Add items to `inventory` rows in bulk, inserting missing rows.
+    Returns the resulting quantity per (user_id, item_type).
+    """
+    user_ids = list({user_id for user_id, _ in credits})
+    existing: dict[tuple[int, str], int] = {}
+    quantities: dict[tuple[int, str], int] = {}
+    for start in range(0, len(user_ids), _LOOKUP_CHUNK):
+        result = await conn.execute(
+            select(_items.c.id, _items.c.user_id, _items.c.item_type, _items.c.quantity)
+            .where(_items.c.user_id.in_(user_ids[start:start + _LOOKUP_CHUNK]))
+        )
+        for row in result:
+            existing[(row.user_id, row.item_type)] = row.id
+            quantities[(row.user_id, row.item_type)] = row.quantity
+
+    bumps = [
+        {"b_id": existing[key], "b_amount": amount}
+        for key, amount in credits.items() if key in existing
+    ]
+    inserts = [
+        {"user_id": user_id, "item_type": item_type, "quantity": amount, "version": 1}
+        for (user_id, item_type), amount in credits.items() if (user_id, item_type) not in existing
+    ]
+    if bumps:
+        await conn.execute(_CREDIT_ITEM, bumps)
+    if inserts:
+        await conn.execute(insert(_items), inserts)
+    return {key: quantities.get(key, 0) + amount for key, amount in credits.items()}
+
+
+async def _settle_portable(
+    conn: AsyncConnection,
+    exclude: Iterable[int],
+    now: datetime,
+    only: list[int] | None,
+    per_row: bool = False,
+) -> list[SettledAction]:
+    """
+    settle() for databases without the PostgreSQL statement. Skills are
+    written with one executemany, which raises StaleDataError if any of
+    them changed since they were read; with `per_row` they are written one
+    at a time and the changed ones are left for the next settlement.
+    """
+    if settings.EVENT_LOG_ENABLED:
+        raise SettlementUnsupported(
+            f"Event log settlement requires PostgreSQL, got {conn.dialect.name}"
+        )
+
+    excluded = set(exclude)
+    settled: list[SettledAction] = []
+    skill_rows: list[dict] = []
+
+    active = [] if only == [] else await conn.execute(
+        _ACTIVE_SKILLS if only is None else _ACTIVE_SKILLS.where(_skills.c.user_id.in_(only))
+    )
+    for row in active:
+        action = get_action(row.skill_type, row.current_action)
+        if row.user_id in excluded or action is None or row.action_started is None:
+            continue
+        amount = int((now - row.action_started).total_seconds() // action.duration)
+        if amount < 1:
+            continue
+
+        xp = row.xp + amount * action.xp
+        level = max(row.level, get_level_for_xp(xp))
+        skill_rows.append({
+            "b_id": row.id,
+            "b_version": row.version,
+            "b_xp": xp,
+            "b_level": level,
+            "b_started": row.action_started + timedelta(seconds=amount * action.duration),
+        })
+        settled.append(SettledAction(
+            row.user_id, row.skill_type, action.id, amount, amount * action.xp, xp, row.level, level, 0
+        ))
+
+    if skill_rows:
+        if per_row:
+            settled = [
+                done for done, skill_row in zip(settled, skill_rows)
+                if (await conn.execute(_SETTLE_SKILL, skill_row)).rowcount == 1
+            ]
+        else:
+            result = await conn.execute(_SETTLE_SKILL, skill_rows)
+            if result.rowcount != len(skill_rows):
+                # A player changed under us; settle() redoes the batch per row
+                raise StaleDataError(
+                    f"Settled {result.rowcount} of {len(skill_rows)} skills; version changed"
+                )
+        credits = {(done.user_id, done.action.item_type): done.amount for done in settled}
+        quantities = await _credit_rows(conn, credits)
+        settled = [
+            done._replace(quantity=quantities[(done.user_id, done.action.item_type)])
+            for done in settled
+        ]
+
+    return settled
+
+
+async def settle(
+    engine: AsyncEngine,
+    exclude: Iterable[int] = (),
+    now: datetime | None = None,
+    only: Iterable[int] | None = None,
+    notify: bool = True,
+) -> list[SettledAction]:
+    """
+    Settle the due actions of every active skill in a single statement
+    (batched executemany writes on non-PostgreSQL databases).
+
+    Players in `exclude` are skipped; with `only`, just those players are
+    considered. Awards are fed to the analytics rollups, and with `notify`
+    level-ups and filled stacks are queued as player notifications in the
+    same transaction (players watching live are told in the app instead).
+    """
+    if now is None:
+        now = datetime.now(timezone.utc)
+    exclude = list(exclude)
+    only = None if only is None else list(only)
+
+    try:
+        settled = await _settle_once(engine, exclude, now, only, notify)
+    except StaleDataError:
+        # Rolled back; skip just the players that changed instead of
+        # failing the whole batch again next time
+        settled = await _settle_once(engine, exclude, now, only, notify, per_row=True)
+
+    for done in settled:
+        rollups.record(done.user_id, done.skill_type, int(done.xp), int(done.amount), at=now)
+    return settled
+
+
+async def _settle_once(
+    engine: AsyncEngine,
+    exclude: list[int],
+    now: datetime,
+    only: list[int] | None,
+    notify: bool,
+    per_row: bool = False,
+) -> list[SettledAction]:
+    async with engine.begin() as conn:
+        if engine.dialect.name != "postgresql":
+            settled = await _settle_portable(conn, exclude, now, only, per_row)
+        else:
+            params = {"now": now, "exclude": exclude, "only": only or [], "all_users": only is None}
+            if settings.EVENT_LOG_ENABLED:
+                locked = list((await conn.execute(LOCK_LOGGED_SQL, params)).scalars())
+                statement = SETTLE_LOGGED_SQL
+                params.update(only=locked, all_users=False)
+            elif settings.INVENTORY_STORAGE == "compact":
+                statement = SETTLE_COMPACT_SQL
+            else:
+                statement = SETTLE_SQL
+            result = await conn.execute(statement, params)
+            settled = [SettledAction(*row) for row in result]
+        if notify and settings.NOTIFY_ENABLED:
+            await notifications.enqueue(conn, notifications.settlement_notices(settled))
+    return settled
+
+
+async def settle_all(
+    engine: AsyncEngine,
+    exclude: Iterable[int] = (),
+    now: datetime | None = None,
+) -> tuple[int, int]:
+    """
+    Settle every active skill except for players in `exclude` (e.g. those
+    the ActionScheduler settles). Returns (actions settled, completions
+    awarded).
+    """
+    settled = await settle(engine, exclude, now)
+    return len(settled), sum(int(done.amount) for done in settled)
+
+
+class SettlementSweeper:
+    """Background task that periodically runs settle_all()."""
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        interval: float,
+        exclude: Callable[[], Iterable[int]] = lambda: (),
+    ):
+        self.engine = engine
+        self.interval = interval
+        self.exclude = exclude
+        self._task: asyncio.Task | None = None
+
+    @property
+    def supported(self) -> bool:
+        return self.engine.dialect.name == "postgresql" or not settings.EVENT_LOG_ENABLED
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                actions, completions = await settle_all(self.engine, self.exclude())
+                if actions:
+                    logger.info("Settled %d offline actions (%d completions)", actions, completions)
+            except Exception:
+                logger.exception("Settlement sweep failed")
+
+    def start(self):
+        """Start sweeping (idempotent). No-op where settlement is unsupported."""
+        if not self.supported:
+            logger.warning(
+                "Settlement sweeper disabled: event log mode requires PostgreSQL, got %s",
+                self.engine.dialect.name
+            )
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop sweeping."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
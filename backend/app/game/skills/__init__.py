@@ -1,3 +1,4 @@
+from app.game.skills.action import ActionResult, ActionSkill
 from app.game.skills.mining import MiningSkill
 
-__all__ = ["MiningSkill"]
+__all__ = ["ActionResult", "ActionSkill", "MiningSkill"]
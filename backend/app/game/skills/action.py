@@ -0,0 +1,365 @@
+"""
+Generic skill logic.
+
+ActionSkill runs any skill declared in app.game.data.skills: starting
+and stopping actions, settling completed ones (XP, level ups, items) and
+reporting status. Skill classes such as MiningSkill only bind a
+skill_type and their wire names.
+"""
+
+import functools
+from dataclasses import dataclass
+from datetime import datetime
+from sqlalchemy import select, bindparam
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.config import settings
+from app.models import Skill, InventoryItem
+from app.game.data.skills import Action, SkillDef, get_action, get_skill
+from app.game.data.xp_table import get_level_for_xp, get_xp_to_next_level
+from app.game.inventory import RowInventory, get_inventory_store
+from app.game.analytics import rollups
+from app.game import events
+from app.game.clock import Clock, utcnow
+from app.metrics import skill_writes, skill_write_conflicts
+from app.tracing import traced
+
+
+# Hot-path statements, built once at import. Every call reuses the same
+# statement object with fresh bind values, so SQLAlchemy's compiled cache
+# hits without re-walking an ORM construct, and asyncpg reuses the prepared
+# statement for the compiled SQL (see DB_PREPARED_STATEMENT_CACHE_SIZE).
+SKILL_BY_USER = select(Skill).where(
+    Skill.user_id == bindparam("user_id"),
+    Skill.skill_type == bindparam("skill_type")
+)
+
+
+def resettle_on_conflict(method):
+    """
+    Retry an ActionSkill write that lost an optimistic version check.
+
+    Skill and InventoryItem updates are conditional on the version loaded
+    (see their __mapper_args__), so a concurrent writer (another socket,
+    a REST call, the settlement sweeper) surfaces as StaleDataError at
+    flush instead of a silently lost update. The session is rolled back
+    and the operation re-run against fresh state, which re-settles from
+    the winner's action timer. The operation must be the only write in
+    the session's transaction.
+    """
+    @functools.wraps(method)
+    async def wrapper(self: "ActionSkill", *args, **kwargs):
+        for attempt in range(1, settings.SKILL_CONFLICT_RETRIES + 1):
+            try:
+                result = await method(self, *args, **kwargs)
+                await self.db.flush()
+            except StaleDataError:
+                skill_write_conflicts.inc()
+                await self.db.rollback()
+                if attempt == settings.SKILL_CONFLICT_RETRIES:
+                    raise
+                continue
+            skill_writes.inc()
+            return result
+    return wrapper
+
+
+@dataclass
+class ActionResult:
+    success: bool
+    completed: bool = False
+    action_id: str | None = None
+    action_name: str | None = None
+    amount: int = 0  # completions awarded
+    xp_gained: int = 0
+    total_xp: int = 0
+    level: int = 1
+    leveled_up: bool = False
+    new_level: int | None = None
+    quantity: int = 0  # item count after the award
+    progress: float = 0.0  # 0.0 to 1.0
+    xp_in_level: int = 0
+    xp_needed: int = 0
+    action_started: datetime | None = None  # timer origin of a started action
+    message: str = ""
+
+
+def completed_result(
+    action: Action,
+    amount: int,
+    total_xp: int,
+    old_level: int,
+    new_level: int,
+    quantity: int,
+) -> ActionResult:
+    """The result reported for `amount` completions of `action`."""
+    leveled_up = new_level > old_level
+    xp_in_level, xp_needed = get_xp_to_next_level(total_xp, new_level)
+    return ActionResult(
+        success=True,
+        completed=True,
+        action_id=action.id,
+        action_name=action.name,
+        amount=amount,
+        xp_gained=amount * action.xp,
+        total_xp=total_xp,
+        level=new_level,
+        leveled_up=leveled_up,
+        new_level=new_level if leveled_up else None,
+        quantity=quantity,
+        progress=0.0,  # Reset progress
+        xp_in_level=xp_in_level,
+        xp_needed=xp_needed,
+        message=f"+{amount} {action.name}! +{amount * action.xp} XP"
+    )
+
+
+class ActionSkill:
+    """A skill from app.game.data.skills, for one session."""
+
+    SKILL_TYPE: str = ""
+    # get_status key of the per-action list
+    STATUS_ACTIONS_KEY = "actions"
+
+    def __init__(self, db: AsyncSession, clock: Clock = utcnow, skill_type: str | None = None):
+        self.db = db
+        self.clock = clock
+        self.skill: SkillDef = get_skill(skill_type or self.SKILL_TYPE)
+        if self.skill is None:
+            raise ValueError(f"Unknown skill: {skill_type or self.SKILL_TYPE!r}")
+        self.skill_type = self.skill.skill_type
+        self.inventory = get_inventory_store(db)
+
+    @traced
+    async def get_or_create_skill(self, user_id: int) -> Skill:
+        """Get or create the skill row for user."""
+        result = await self.db.execute(
+            SKILL_BY_USER,
+            {"user_id": user_id, "skill_type": self.skill_type}
+        )
+        skill = result.scalar_one_or_none()
+
+        if not skill:
+            skill = Skill(
+                user_id=user_id,
+                skill_type=self.skill_type,
+                xp=0,
+                level=1,
+                version=0,
+                event_watermark=0
+            )
+            self.db.add(skill)
+            await self.db.flush()
+
+        return skill
+
+    @traced
+    async def get_state(self, user_id: int, for_write: bool = False) -> tuple[Skill, events.FoldedState]:
+        """
+        Skill snapshot plus any pending logged events folded over it. With
+        `for_write` in event log mode the player is locked first (see
+        events.lock_player).
+        """
+        if for_write and settings.EVENT_LOG_ENABLED:
+            await events.lock_player(self.db, user_id)
+        skill = await self.get_or_create_skill(user_id)
+        pending = await events.pending_events(self.db, skill) if settings.EVENT_LOG_ENABLED else []
+        return skill, events.fold(skill, pending)
+
+    @traced
+    async def get_inventory_item(self, user_id: int, item_type: str) -> InventoryItem:
+        """Get or create inventory item (row storage only)."""
+        return await RowInventory(self.db).get_item(user_id, item_type)
+
+    @traced
+    @resettle_on_conflict
+    async def start_action(self, user_id: int, action_id: str) -> ActionResult:
+        """Start performing one of the skill's actions."""
+        skill, state = await self.get_state(user_id, for_write=True)
+        action = get_action(self.skill_type, action_id)
+
+        if not action:
+            return ActionResult(
+                success=False,
+                message=f"Unknown {self.skill_type} action: {action_id}"
+            )
+
+        if state.level < action.level_required:
+            return ActionResult(
+                success=False,
+                message=f"You need {self.skill.name} level {action.level_required} to {self.skill.verb} {action.name}."
+            )
+
+        # Set current action
+        now = self.clock()
+        if settings.EVENT_LOG_ENABLED:
+            events.append(self.db, user_id, self.skill_type, "start", action=action_id, settled_until=now)
+        else:
+            skill.current_action = action_id
+            skill.action_started = now
+            skill.version += 1
+        await self.db.flush()
+
+        xp_in_level, xp_needed = get_xp_to_next_level(state.xp, state.level)
+
+        return ActionResult(
+            success=True,
+            action_id=action_id,
+            action_name=action.name,
+            total_xp=state.xp,
+            level=state.level,
+            progress=0.0,
+            xp_in_level=xp_in_level,
+            xp_needed=xp_needed,
+            action_started=now,
+            message=f"Started {self.skill.verb_ing} {action.name}..."
+        )
+
+    @traced
+    @resettle_on_conflict
+    async def stop_action(self, user_id: int) -> ActionResult:
+        """Stop the current action."""
+        skill, state = await self.get_state(user_id, for_write=True)
+
+        if settings.EVENT_LOG_ENABLED:
+            events.append(self.db, user_id, self.skill_type, "stop")
+        else:
+            skill.current_action = None
+            skill.action_started = None
+            skill.version += 1
+        await self.db.flush()
+
+        xp_in_level, xp_needed = get_xp_to_next_level(state.xp, state.level)
+
+        return ActionResult(
+            success=True,
+            total_xp=state.xp,
+            level=state.level,
+            xp_in_level=xp_in_level,
+            xp_needed=xp_needed,
+            message=f"{self.skill.name} stopped."
+        )
+
+    @traced
+    @resettle_on_conflict
+    async def process_tick(self, user_id: int) -> ActionResult | None:
+        """
+        Settle one completion of the current action if it is due.
+        Returns the completion, or the progress while still in progress;
+        None when the skill is idle.
+        """
+        skill, state = await self.get_state(user_id, for_write=True)
+
+        action = get_action(self.skill_type, state.current_action)
+        if not action or not state.action_started:
+            return None
+
+        now = self.clock()
+        elapsed = (now - state.action_started).total_seconds()
+        progress = min(elapsed / action.duration, 1.0)
+
+        # Check if the action is complete
+        if elapsed >= action.duration:
+            if settings.EVENT_LOG_ENABLED:
+                return await self._settle_logged(user_id, state, action, now)
+
+            # Award item
+            quantity = await self.inventory.add(user_id, action.item_type, 1)
+
+            # Award XP
+            old_level = skill.level
+            skill.xp += action.xp
+            skill.level = max(old_level, get_level_for_xp(skill.xp))
+
+            # Reset action timer for the next completion
+            skill.action_started = now
+            skill.version += 1
+            await self.db.flush()
+            # Only once the write won its version check: a retried
+            # conflict must not count the award twice
+            rollups.record(user_id, self.skill_type, action.xp, at=now)
+
+            return completed_result(action, 1, skill.xp, old_level, skill.level, quantity)
+
+        xp_in_level, xp_needed = get_xp_to_next_level(state.xp, state.level)
+
+        # Still in progress - return progress
+        return ActionResult(
+            success=True,
+            completed=False,
+            action_id=action.id,
+            action_name=action.name,
+            total_xp=state.xp,
+            level=state.level,
+            progress=progress,
+            xp_in_level=xp_in_level,
+            xp_needed=xp_needed,
+            message=f"{self.skill.verb_ing.capitalize()} {action.name}..."
+        )
+
+    @traced
+    async def _settle_logged(self, user_id: int, state: events.FoldedState, action: Action, now: datetime) -> ActionResult:
+        """Award one completion by appending a settle event; the skill row is untouched."""
+        events.append(
+            self.db, user_id, self.skill_type, "settle",
+            action=action.id, amount=1, xp=action.xp, settled_until=now
+        )
+        counts = await self.inventory.get_counts(user_id)
+        quantity = counts.get(action.item_type, 0) + state.inventory_delta.get(action.item_type, 0) + 1
+
+        total_xp = state.xp + action.xp
+        new_level = max(state.level, get_level_for_xp(total_xp))
+
+        await self.db.flush()
+        rollups.record(user_id, self.skill_type, action.xp, at=now)
+
+        return completed_result(action, 1, total_xp, state.level, new_level, quantity)
+
+    @traced
+    async def get_state_version(self, user_id: int) -> int:
+        """Get the player's state version (one query, for cheap change checks)."""
+        if settings.EVENT_LOG_ENABLED:
+            _, state = await self.get_state(user_id)
+            return state.version
+        skill = await self.get_or_create_skill(user_id)
+        return skill.version
+
+    def action_definitions(self) -> tuple[dict, ...]:
+        """The serialized actions get_status extends per player, in level order."""
+        return self.skill.definitions
+
+    @traced
+    async def get_status(self, user_id: int, state: events.FoldedState | None = None) -> dict:
+        """Get current skill status (from `state` if already loaded)."""
+        if state is None:
+            _, state = await self.get_state(user_id)
+
+        xp_in_level, xp_needed = get_xp_to_next_level(state.xp, state.level)
+
+        # Get inventory counts for the unlocked actions' items
+        counts = await self.inventory.get_counts(user_id)
+        inventory = {
+            action.id: counts.get(action.item_type, 0) + state.inventory_delta.get(action.item_type, 0)
+            for action in self.skill.unlocked(state.level)
+        }
+
+        return {
+            "version": state.version,
+            "skill_type": self.skill_type,
+            "level": state.level,
+            "xp": state.xp,
+            "xp_in_level": xp_in_level,
+            "xp_needed": xp_needed,
+            "current_action": state.current_action,
+            "action_started": state.action_started.isoformat() if state.action_started else None,
+            self.STATUS_ACTIONS_KEY: [
+                {
+                    **definition,
+                    "quantity": inventory.get(definition["id"], 0),
+                    "unlocked": state.level >= definition["level_required"]
+                }
+                for definition in self.action_definitions()  # Show all actions
+            ],
+            "inventory": inventory
+        }
@@ -0,0 +1,70 @@
+"""
+Versioned player state helpers.
+
+Every player-visible change bumps `Skill.version`. The version doubles as
+the HTTP ETag for the status endpoint and as the base for websocket status
+deltas, so clients that already hold the current state pay almost nothing.
+"""
+
+import hashlib
+from dataclasses import fields
+
+from app.game.data.skills import all_actions
+
+# Fingerprint of the static game data, so a deploy that changes skill or
+# action definitions invalidates cached statuses even if no player state
+# changed.
+DATA_TAG = hashlib.sha1(
+    repr([{f.name: getattr(action, f.name) for f in fields(action)} for action in all_actions()]).encode()
+).hexdigest()[:8]
+
+
+def status_etag(version: int) -> str:
+    """ETag for a player's status at a given state version."""
+    return f'"{version}-{DATA_TAG}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Check an If-None-Match header value against an ETag."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def diff_status(old: dict, new: dict) -> dict:
+    """
+    Compute the changes that turn status `old` into status `new`.
+
+    Plain fields are included when they differ. `inventory` holds only the
+    changed counts and `ores` maps ore id -> changed fields of that entry
+    in `available_ores`. Values are absolute, never increments.
+    """
+    changes = {}
+
+    for key, value in new.items():
+        if key in ("available_ores", "inventory"):
+            continue
+        if old.get(key) != value:
+            changes[key] = value
+
+    old_inventory = old.get("inventory", {})
+    inventory = {
+        item: count
+        for item, count in new.get("inventory", {}).items()
+        if old_inventory.get(item) != count
+    }
+    if inventory:
+        changes["inventory"] = inventory
+
+    old_ores = {ore["id"]: ore for ore in old.get("available_ores", [])}
+    ores = {}
+    for ore in new.get("available_ores", []):
+        previous = old_ores.get(ore["id"], {})
+        changed = {k: v for k, v in ore.items() if previous.get(k) != v}
+        if changed:
+            ores[ore["id"]] = changed
+    if ores:
+        changes["ores"] = ores
+
+    return changes
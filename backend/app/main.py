@@ -4,15 +4,44 @@ Main FastAPI application.
 Combines REST API, WebSocket, and initializes the database.
 """
 
+# First, so the startup report's import phase covers everything below
+from app.startup import startup
+
 import asyncio
+import time
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI, Response, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.config import settings
-from app.database import init_db
-from app.routers import auth_router, game_router
-from app.routers.websocket import websocket_endpoint
+from app.database import init_db, track_queries
+from app.metrics import registry
+from app.sharding import shards
+from app.game.settlement import SettlementSweeper
+from app.game.analytics import rollups
+from app.game.events import compactor
+from app.profiling import ProfileMiddleware
+from app.tracing import TracingMiddleware, exporter
+from app.ratelimit import RateLimitMiddleware
+from app.notifications import BotTransport, NotificationWorker
+from app.routers import admin_router, auth_router, game_router, stats_router
+from app.routers.websocket import websocket_endpoint, manager
+
+
+# Settles offline players on every shard; players with live actions here
+# are settled by the manager's ActionScheduler
+sweepers = [
+    SettlementSweeper(
+        shard_engine,
+        interval=settings.SETTLE_SWEEP_INTERVAL,
+        exclude=lambda: list(manager.scheduler.users()),
+    )
+    for shard_engine in shards.engines
+]
+
+# Sends queued offline-progress notices through the bot
+notifier = NotificationWorker(shards.engines, BotTransport())
 
 
 @asynccontextmanager
@@ -21,12 +50,65 @@ async def lifespan(app: FastAPI):
     # Startup
     print("Starting up...")
     await init_db()
-    print("Database initialized!")
+    startup.mark("schema")
+    manager.start_reaper()
+    manager.scheduler.start()
+    for sweeper in sweepers:
+        sweeper.start()
+    rollups.start()
+    compactor.start()
+    exporter.start()
+    if settings.NOTIFY_ENABLED:
+        notifier.start()
+    if settings.BOT_MODE == "webhook":
+        from app.bot import start_webhook
+        await start_webhook()
+    startup.mark("services")
+    if settings.WARMUP_ENABLED:
+        startup.begin_warm_up()
+    else:
+        startup.set_ready()
     
     yield
     
     # Shutdown
     print("Shutting down...")
+    await startup.stop()
+    await notifier.stop()
+    if settings.BOT_MODE == "webhook":
+        from app.bot import stop_webhook
+        await stop_webhook()
+    for sweeper in sweepers:
+        await sweeper.stop()
+    await compactor.stop()
+    await rollups.stop()
+    await exporter.stop()
+    await manager.scheduler.stop()
+    await manager.stop_reaper()
+    await shards.dispose()
+
+
+async def drain():
+    """
+    Take this worker out of service before the server closes connections
+    (app.server calls it on SIGTERM/SIGINT, ahead of uvicorn's shutdown):
+    /health turns 503, websocket clients are told to reconnect after a
+    random delay and closed, and buffered player state is flushed, all
+    within DRAIN_TIMEOUT. The lifespan shutdown then stops the services.
+    """
+    started = time.perf_counter()
+    startup.begin_drain()
+    
+    async def run() -> int:
+        told = await manager.drain()
+        await rollups.flush()
+        return told
+    
+    try:
+        told = await asyncio.wait_for(run(), settings.DRAIN_TIMEOUT)
+        print(f"Drained {told} websocket clients in {time.perf_counter() - started:.2f}s")
+    except asyncio.TimeoutError:
+        print(f"Drain deadline of {settings.DRAIN_TIMEOUT}s exceeded")
 
 
 app = FastAPI(
@@ -36,6 +118,35 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+class QueryStatsMiddleware:
+    """Tracks statements per HTTP request (see app.database.track_queries)."""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        with track_queries(f"{scope['method']} {scope['path']}") as stats:
+            async def send_with_headers(message):
+                if message["type"] == "http.response.start" and settings.QUERY_DEBUG_HEADERS:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-db-statements", str(stats.statements).encode()),
+                        (b"x-db-time-ms", f"{stats.db_time_ms:.1f}".encode()),
+                    ]
+                await send(message)
+            
+            await self.app(scope, receive, send_with_headers)
+
+
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(ProfileMiddleware)
+app.add_middleware(TracingMiddleware)
+# Outside the instrumentation so rejected requests cost (and record) nothing
+app.add_middleware(RateLimitMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -43,11 +154,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-DB-Statements", "X-DB-Time-Ms", "X-Profile-Id", "X-Trace-Id"],
 )
 
 # Include routers
+app.include_router(admin_router)
 app.include_router(auth_router)
 app.include_router(game_router)
+app.include_router(stats_router)
+
+if settings.BOT_MODE == "webhook":
+    # Imported only here so polling deployments never load the bot
+    from app.routers.telegram import router as telegram_router
+    app.include_router(telegram_router)
 
 
 @app.get("/")
@@ -61,9 +180,21 @@ async def root():
 
 
 @app.get("/health")
-async def health():
-    """Health check for Railway."""
-    return {"status": "healthy"}
+async def health(response: Response):
+    """Readiness check for Railway: 503 until startup and warm-up are done, and while draining."""
+    if startup.draining:
+        response.status_code = 503
+        return {"status": "draining"}
+    if not startup.ready:
+        response.status_code = 503
+        return {"status": "starting", "phase": startup.phase}
+    return {"status": "healthy", "ready_in": round(startup.ready_in, 3)}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Process counters in Prometheus text format."""
+    return registry.render()
 
 
 @app.websocket("/ws/{user_id}")
@@ -72,6 +203,10 @@ async def websocket_route(websocket: WebSocket, user_id: int):
     await websocket_endpoint(websocket, user_id)
 
 
+startup.mark("imports")
+
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
+    # Production settings; run.py is the reloading development runner
+    from app.server import main
+    main()
@@ -0,0 +1,67 @@
+"""
+In-process counters, exposed at /metrics in Prometheus text format.
+
+Counters are plain integers bumped on the event loop thread, so
+incrementing one is a single attribute update. Each worker process
+reports its own values; sum them in the scraper.
+"""
+
+
+class Counter:
+    """Monotonic counter."""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        self.value += amount
+
+
+class Registry:
+    def __init__(self):
+        self._counters: dict[str, Counter] = {}
+
+    def counter(self, name: str, help: str) -> Counter:
+        """Get or create a counter by name."""
+        counter = self._counters.get(name)
+        if counter is None:
+            counter = self._counters[name] = Counter(name, help)
+        return counter
+
+    def snapshot(self) -> dict[str, int]:
+        return {name: counter.value for name, counter in self._counters.items()}
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        lines = []
+        for counter in self._counters.values():
+            lines.append(f"# HELP {counter.name} {counter.help}")
+            lines.append(f"# TYPE {counter.name} counter")
+            lines.append(f"{counter.name} {counter.value}")
+        return "\n".join(lines) + "\n"
+
+
+# Global registry
+registry = Registry()
+
+skill_writes = registry.counter(
+    "skill_writes_total",
+    "MiningSkill write operations committed to the session",
+)
+skill_write_conflicts = registry.counter(
+    "skill_write_conflicts_total",
+    "MiningSkill writes that lost an optimistic version check and were retried",
+)
+
+live_settle_failures = registry.counter(
+    "live_settle_failures_total",
+    "Live action settlements that failed and were left for the next tick",
+)
+
+
+def conflict_rate() -> float:
+    """Fraction of skill write attempts that hit a version conflict."""
+    attempts = skill_writes.value + skill_write_conflicts.value
+    return skill_write_conflicts.value / attempts if attempts else 0.0
@@ -1,5 +1,9 @@
 from app.models.user import User
 from app.models.skill import Skill
 from app.models.inventory import InventoryItem
+from app.models.inventory_bag import InventoryBag
+from app.models.rollup import XpRollup
+from app.models.action_event import ActionEvent
+from app.models.notification import Notification
 
-__all__ = ["User", "Skill", "InventoryItem"]
+__all__ = ["User", "Skill", "InventoryItem", "InventoryBag", "XpRollup", "ActionEvent", "Notification"]
@@ -0,0 +1,40 @@
+from sqlalchemy import BigInteger, String, Integer, ForeignKey, Index, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base, UTCDateTime
+from datetime import datetime
+
+
+class ActionEvent(Base):
+    """
+    Append-only skill action log (see app/game/events.py).
+    
+    kind is "start", "stop" or "settle". Settle events carry the ores
+    awarded (amount) and the XP gained. settled_until is the action's new
+    timer origin: when it started (start) or the time up to which it has
+    been paid out (settle).
+    """
+    __tablename__ = "action_events"
+    
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(
+        BigInteger,
+        ForeignKey("users.telegram_id", ondelete="CASCADE")
+    )
+    skill_type: Mapped[str] = mapped_column(String(50))
+    kind: Mapped[str] = mapped_column(String(10))
+    action: Mapped[str | None] = mapped_column(String(50), nullable=True)  # e.g. "copper"
+    amount: Mapped[int] = mapped_column(Integer, default=0)
+    xp: Mapped[int] = mapped_column(BigInteger, default=0)
+    settled_until: Mapped[datetime | None] = mapped_column(UTCDateTime(), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        UTCDateTime(),
+        server_default=func.now()
+    )
+    
+    __table_args__ = (
+        # Pending-event lookups: WHERE user_id = ? AND id > watermark
+        Index("ix_action_events_user_id_id", "user_id", "id"),
+    )
+    
+    def __repr__(self) -> str:
+        return f"<ActionEvent #{self.id} {self.user_id} {self.kind} {self.action} x{self.amount}>"
@@ -19,8 +19,13 @@ class InventoryItem(Base):
     item_type: Mapped[str] = mapped_column(String(50), index=True)  # e.g., "copper_ore"
     quantity: Mapped[int] = mapped_column(Integer, default=0)
     
+    # Optimistic lock; incremented by the ORM on every update
+    version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    
     # Relationship
     user: Mapped["User"] = relationship("User", back_populates="inventory")
     
+    __mapper_args__ = {"version_id_col": version}
+    
     def __repr__(self) -> str:
         return f"<InventoryItem {self.item_type} x{self.quantity}>"
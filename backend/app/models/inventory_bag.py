@@ -0,0 +1,28 @@
+from sqlalchemy import BigInteger, ForeignKey, JSON
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+
+class InventoryBag(Base):
+    """
+    Compact inventory: one row per user.
+    
+    `counts[item_id]` holds the quantity of the item with that stable
+    item_id (see Ore.item_id). PostgreSQL arrays are 1-based and grow on
+    assignment, so unset slots read as NULL and mean zero.
+    """
+    __tablename__ = "inventory_bags"
+    
+    user_id: Mapped[int] = mapped_column(
+        BigInteger,
+        ForeignKey("users.telegram_id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    counts: Mapped[list[int | None]] = mapped_column(
+        ARRAY(BigInteger).with_variant(JSON(), "sqlite"),
+        default=list
+    )
+    
+    def __repr__(self) -> str:
+        return f"<InventoryBag {self.user_id} {self.counts}>"
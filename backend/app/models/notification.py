@@ -0,0 +1,41 @@
+from sqlalchemy import BigInteger, String, Integer, ForeignKey, Index, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base, UTCDateTime
+from datetime import datetime
+
+
+class Notification(Base):
+    """
+    Outbound Telegram notice waiting to be sent (see app/notifications.py).
+    
+    kind is "level_up" (subject = skill type, value = level reached) or
+    "stack" (subject = item type, value = stack size reached). Rows are
+    deleted once sent. available_at is when the row may next be claimed:
+    a sender leases rows by pushing it forward, and rate-limited or failed
+    rows are pushed back the same way.
+    """
+    __tablename__ = "notifications"
+    
+    id: Mapped[int] = mapped_column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    user_id: Mapped[int] = mapped_column(
+        BigInteger,
+        ForeignKey("users.telegram_id", ondelete="CASCADE")
+    )
+    kind: Mapped[str] = mapped_column(String(20))
+    subject: Mapped[str] = mapped_column(String(50))
+    value: Mapped[int] = mapped_column(BigInteger)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    available_at: Mapped[datetime] = mapped_column(UTCDateTime(), server_default=func.now())
+    created_at: Mapped[datetime] = mapped_column(
+        UTCDateTime(),
+        server_default=func.now()
+    )
+    
+    __table_args__ = (
+        # Claim scans: oldest available rows first
+        Index("ix_notifications_available_at", "available_at"),
+        Index("ix_notifications_user_id", "user_id"),
+    )
+    
+    def __repr__(self) -> str:
+        return f"<Notification #{self.id} {self.user_id} {self.kind} {self.subject}={self.value}>"
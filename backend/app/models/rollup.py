@@ -0,0 +1,22 @@
+from sqlalchemy import BigInteger, String, Integer, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base, UTCDateTime
+from datetime import datetime
+
+
+class XpRollup(Base):
+    """Per-user, per-skill, per-hour activity counters (analytics)."""
+    __tablename__ = "xp_rollups"
+    
+    user_id: Mapped[int] = mapped_column(
+        BigInteger,
+        ForeignKey("users.telegram_id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    skill_type: Mapped[str] = mapped_column(String(50), primary_key=True)
+    hour: Mapped[datetime] = mapped_column(UTCDateTime(), primary_key=True, index=True)
+    xp: Mapped[int] = mapped_column(BigInteger, default=0)
+    actions: Mapped[int] = mapped_column(Integer, default=0)  # e.g. ores mined
+    
+    def __repr__(self) -> str:
+        return f"<XpRollup {self.user_id} {self.skill_type} {self.hour:%Y-%m-%d %H}h +{self.xp} XP>"
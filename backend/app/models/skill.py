@@ -1,6 +1,6 @@
-from sqlalchemy import BigInteger, String, Integer, DateTime, ForeignKey, func
+from sqlalchemy import BigInteger, String, Integer, ForeignKey, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from app.database import Base
+from app.database import Base, UTCDateTime
 from datetime import datetime
 from typing import TYPE_CHECKING
 
@@ -21,15 +21,42 @@ class Skill(Base):
     xp: Mapped[int] = mapped_column(BigInteger, default=0)
     level: Mapped[int] = mapped_column(Integer, default=1)
     
+    # Bumped on every player-visible state change (status ETag / deltas).
+    # Also the optimistic lock: ORM updates check it (see __mapper_args__).
+    version: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
+    
+    # Id of the last action_events row folded into this snapshot
+    event_watermark: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
+    
     # Current action tracking
     current_action: Mapped[str | None] = mapped_column(String(50), nullable=True)  # e.g., "copper"
     action_started: Mapped[datetime | None] = mapped_column(
-        DateTime(timezone=True), 
+        UTCDateTime(), 
         nullable=True
     )
     
     # Relationship
     user: Mapped["User"] = relationship("User", back_populates="skills")
     
+    __table_args__ = (
+        # Partial index so the settlement sweeper only scans active miners
+        Index(
+            "ix_skills_active_action",
+            "current_action",
+            postgresql_where=current_action.isnot(None),
+            sqlite_where=current_action.isnot(None),
+        ),
+        # Per-shard leaderboard scans (top N by XP)
+        Index("ix_skills_type_xp", "skill_type", "xp"),
+    )
+    
+    # UPDATE ... WHERE version = <loaded>; a concurrent writer makes it match
+    # no row and raises StaleDataError. The application bumps the version
+    # itself because it doubles as the status version.
+    __mapper_args__ = {
+        "version_id_col": version,
+        "version_id_generator": False,
+    }
+    
     def __repr__(self) -> str:
         return f"<Skill {self.skill_type} Lv.{self.level} ({self.xp} XP)>"
@@ -1,6 +1,6 @@
-from sqlalchemy import BigInteger, String, DateTime, func
+from sqlalchemy import BigInteger, String, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from app.database import Base
+from app.database import Base, UTCDateTime
 from datetime import datetime
 from typing import List, TYPE_CHECKING
 
@@ -16,11 +16,11 @@ class User(Base):
     username: Mapped[str | None] = mapped_column(String(255), nullable=True)
     first_name: Mapped[str | None] = mapped_column(String(255), nullable=True)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), 
+        UTCDateTime(), 
         server_default=func.now()
     )
     last_active: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True),
+        UTCDateTime(),
         server_default=func.now(),
         onupdate=func.now()
     )
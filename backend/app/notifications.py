@@ -0,0 +1,338 @@
+"""
+Outbound player notifications through the Telegram bot.
+
+Offline settlement (app.game.settlement) queues a `notifications` row for
+each level-up and each filled stack (an item count crossing a multiple
+of NOTIFY_STACK_SIZE), in the same transaction as the award. The queue
+lives on the player's shard, so it survives restarts and moves with the
+player on rebalance.
+
+NotificationWorker drains every shard:
+
+1. Claim a batch of available rows by leasing them (pushing available_at
+   forward; SKIP LOCKED on PostgreSQL), so several processes can run
+   workers without sending anything twice.
+2. Coalesce each player's rows into a single message.
+3. Send under two token buckets: one per chat and one global. These stay
+   inside Telegram's flood limits (about 1 message/s per chat and 30/s
+   overall). A chat without tokens has its rows deferred until it has
+   some, and any new events are folded into that later message. A
+   RetryAfter from Telegram pauses the global bucket.
+4. Delete sent rows. Failed rows back off and are dropped after
+   NOTIFY_MAX_ATTEMPTS. Rows for chats that blocked the bot are dropped
+   at once.
+
+Delivery goes through a Transport: BotTransport uses the `bot` from
+app.bot, and MemoryTransport is a local stand-in for tests and
+benchmarks.
+"""
+
+import asyncio
+import logging
+import sys
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Iterable, Protocol
+
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+from app.game.clock import Clock, utcnow
+from app.game.data.skills import get_action_by_item_type, get_skill
+from app.metrics import registry
+from app.models import Notification
+from app.ratelimit import KeyedBuckets, TokenBucket
+
+logger = logging.getLogger(__name__)
+
+notifications_enqueued = registry.counter("notifications_enqueued_total", "Notification events queued")
+notifications_sent = registry.counter("notifications_sent_total", "Notification messages delivered")
+notifications_coalesced = registry.counter(
+    "notifications_coalesced_total",
+    "Queued events folded into another event's message",
+)
+notifications_deferred = registry.counter(
+    "notifications_deferred_total",
+    "Notification messages postponed by a rate limit or retry-after",
+)
+notifications_dropped = registry.counter(
+    "notifications_dropped_total",
+    "Notification events given up on (undeliverable or out of attempts)",
+)
+
+_table = Notification.__table__
+
+
+# -- Producing ----------------------------------------------------------------
+
+def settlement_notices(settled: Iterable) -> list[dict]:
+    """Notification rows for a settlement's SettledAction results."""
+    rows = []
+    stack = settings.NOTIFY_STACK_SIZE
+    for done in settled:
+        if done.new_level is not None and done.old_level is not None and done.new_level > done.old_level:
+            rows.append({
+                "user_id": done.user_id, "kind": "level_up", "subject": done.skill_type, "value": done.new_level,
+            })
+        if done.quantity is not None and stack > 0:
+            filled = done.quantity // stack
+            if filled > (done.quantity - done.amount) // stack:
+                rows.append({
+                    "user_id": done.user_id, "kind": "stack",
+                    "subject": done.action.item_type, "value": filled * stack,
+                })
+    return rows
+
+
+async def enqueue(conn, rows: list[dict]):
+    """Queue notification rows on `conn` (a connection or session), in its transaction."""
+    if rows:
+        await conn.execute(insert(_table), rows)
+        notifications_enqueued.inc(len(rows))
+
+
+# -- Transports ---------------------------------------------------------------
+
+class TransportError(Exception):
+    """A send failed; it is retried with backoff."""
+
+
+class RetryAfter(TransportError):
+    """Flood control: nothing may be sent for `seconds`."""
+
+    def __init__(self, seconds: float):
+        super().__init__(f"retry after {seconds}s")
+        self.seconds = seconds
+
+
+class Undeliverable(TransportError):
+    """The chat cannot receive messages (blocked bot, deleted account)."""
+
+
+class Transport(Protocol):
+    async def send(self, chat_id: int, text: str) -> None: ...
+
+
+class BotTransport:
+    """Sends through app.bot's aiogram Bot."""
+
+    async def send(self, chat_id: int, text: str) -> None:
+        from aiogram.exceptions import (
+            TelegramAPIError,
+            TelegramBadRequest,
+            TelegramForbiddenError,
+            TelegramRetryAfter,
+        )
+        from app.bot import bot
+
+        try:
+            await bot.send_message(chat_id, text)
+        except TelegramRetryAfter as e:
+            raise RetryAfter(e.retry_after) from e
+        except (TelegramForbiddenError, TelegramBadRequest) as e:
+            raise Undeliverable(str(e)) from e
+        except TelegramAPIError as e:
+            raise TransportError(str(e)) from e
+
+    async def close(self):
+        """Close the bot's HTTP session, if this process opened it."""
+        bot_module = sys.modules.get("app.bot")
+        if bot_module is not None:
+            await bot_module.bot.session.close()
+
+
+@dataclass
+class MemoryTransport:
+    """
+    Local stand-in: records messages instead of sending them.
+
+    Exceptions put in `failures` are raised by the next sends, one each,
+    to exercise retry-after and error handling.
+    """
+    sent: list[tuple[int, str]] = field(default_factory=list)
+    failures: list[Exception] = field(default_factory=list)
+    latency: float = 0.0
+
+    async def send(self, chat_id: int, text: str) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failures:
+            raise self.failures.pop(0)
+        self.sent.append((chat_id, text))
+
+
+# -- Sending ------------------------------------------------------------------
+
+def render(rows: list) -> str:
+    """One message for all of a player's queued events (coalesced)."""
+    levels: dict[str, int] = {}
+    stacks: dict[str, int] = {}
+    for row in rows:
+        target = levels if row.kind == "level_up" else stacks
+        target[row.subject] = max(target.get(row.subject, 0), row.value)
+
+    lines = ["⛏️ While you were away:"]
+    for skill_type, level in sorted(levels.items()):
+        skill = get_skill(skill_type)
+        lines.append(f"• {skill.name if skill else skill_type.capitalize()} reached level {level}!")
+    for item_type, amount in sorted(stacks.items()):
+        action = get_action_by_item_type(item_type)
+        name = action.name if action else item_type.replace("_", " ").title()
+        lines.append(f"• Your {name} stack reached {amount:,}")
+    return "\n".join(lines)
+
+
+def _claim_statement(batch: int):
+    available = (
+        select(_table.c.id)
+        .where(_table.c.available_at <= bindparam("now"))
+        .order_by(_table.c.available_at, _table.c.id)
+        .limit(batch)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    return (
+        update(_table)
+        .where(_table.c.id.in_(available))
+        .values(available_at=bindparam("lease_until"))
+        .returning(_table.c.id, _table.c.user_id, _table.c.kind, _table.c.subject,
+                   _table.c.value, _table.c.attempts)
+    )
+
+
+_RESCHEDULE = (
+    update(_table)
+    .where(_table.c.id == bindparam("b_id"))
+    .values(available_at=bindparam("b_at"), attempts=bindparam("b_attempts"))
+)
+
+
+@dataclass
+class _Outcome:
+    done: list[int] = field(default_factory=list)  # delete: sent or dropped
+    later: list[dict] = field(default_factory=list)  # _RESCHEDULE rows
+
+
+class NotificationWorker:
+    """Drains the notification queues of every shard (see module docstring)."""
+
+    def __init__(
+        self,
+        engines: list[AsyncEngine],
+        transport: Transport,
+        interval: float | None = None,
+        clock: Clock = utcnow,
+    ):
+        self.engines = engines
+        self.transport = transport
+        self.interval = interval if interval is not None else settings.NOTIFY_INTERVAL
+        self.clock = clock
+        self.global_bucket = TokenBucket(settings.NOTIFY_GLOBAL_RATE, settings.NOTIFY_GLOBAL_BURST)
+        self.chat_buckets: KeyedBuckets[int] = KeyedBuckets(settings.NOTIFY_CHAT_RATE, settings.NOTIFY_CHAT_BURST)
+        self._claim = _claim_statement(settings.NOTIFY_BATCH)
+        self._task: asyncio.Task | None = None
+
+    async def _send(self, user_id: int, rows: list, outcome: _Outcome, now):
+        ids = [row.id for row in rows]
+        chat_delay = self.chat_buckets.delay(user_id)
+        if chat_delay > 0:
+            notifications_deferred.inc()
+            outcome.later += [
+                {"b_id": row.id, "b_at": now + timedelta(seconds=chat_delay), "b_attempts": row.attempts}
+                for row in rows
+            ]
+            return
+
+        await self.global_bucket.acquire()
+        self.chat_buckets.try_acquire(user_id)
+        try:
+            await self.transport.send(user_id, render(rows))
+        except RetryAfter as e:
+            self.global_bucket.pause(e.seconds)
+            notifications_deferred.inc()
+            outcome.later += [
+                {"b_id": row.id, "b_at": now + timedelta(seconds=e.seconds), "b_attempts": row.attempts}
+                for row in rows
+            ]
+            return
+        except Undeliverable:
+            notifications_dropped.inc(len(rows))
+            outcome.done += ids
+            return
+        except Exception as e:
+            for row in rows:
+                attempts = row.attempts + 1
+                if attempts >= settings.NOTIFY_MAX_ATTEMPTS:
+                    notifications_dropped.inc()
+                    outcome.done.append(row.id)
+                else:
+                    backoff = min(3600.0, settings.NOTIFY_INTERVAL * 2 ** attempts)
+                    outcome.later.append(
+                        {"b_id": row.id, "b_at": now + timedelta(seconds=backoff), "b_attempts": attempts}
+                    )
+            logger.warning("Notification to %s failed: %r", user_id, e)
+            return
+
+        notifications_sent.inc()
+        notifications_coalesced.inc(len(rows) - 1)
+        outcome.done += ids
+
+    async def drain_shard(self, engine: AsyncEngine) -> int:
+        """Claim, send and settle one batch from a shard. Returns messages attempted."""
+        now = self.clock()
+        lease_until = now + timedelta(seconds=settings.NOTIFY_LEASE)
+        async with engine.begin() as conn:
+            claimed = (await conn.execute(self._claim, {"now": now, "lease_until": lease_until})).all()
+        if not claimed:
+            return 0
+
+        by_user: dict[int, list] = defaultdict(list)
+        for row in claimed:
+            by_user[row.user_id].append(row)
+
+        outcome = _Outcome()
+        await asyncio.gather(*(self._send(user_id, rows, outcome, now) for user_id, rows in by_user.items()))
+
+        async with engine.begin() as conn:
+            if outcome.done:
+                await conn.execute(delete(_table).where(_table.c.id.in_(outcome.done)))
+            if outcome.later:
+                await conn.execute(_RESCHEDULE, outcome.later)
+        return len(by_user)
+
+    async def drain(self) -> int:
+        """One pass over every shard."""
+        return sum([await self.drain_shard(engine) for engine in self.engines])
+
+    async def _run(self):
+        while True:
+            try:
+                sent = await self.drain()
+            except Exception:
+                logger.exception("Notification drain failed")
+                sent = 0
+            if not sent:
+                await asyncio.sleep(self.interval)
+            else:
+                # More may be waiting; yield without the idle sleep
+                await asyncio.sleep(0)
+
+    def start(self):
+        """Start draining (idempotent)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop draining. Claimed but unsent rows are retried after their lease."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        close = getattr(self.transport, "close", None)
+        if close is not None:
+            await close()
@@ -0,0 +1,202 @@
+"""
+On-demand sampling profiler for the live server.
+
+A sampler thread reads the event loop thread's Python stack every few
+milliseconds (sys._current_frames) and counts identical stacks. Output is
+the "collapsed stacks" format (`frame;frame;frame count` per line) read
+by flamegraph.pl, speedscope and inferno.
+
+Nothing runs until a profile is requested, so an idle server pays no
+cost:
+
+- GET /admin/profile?seconds=N samples the whole loop for N seconds.
+- With an `X-Profile: 1` header (plus the admin token) on a /game request
+  or a websocket handshake, that request or each of that socket's actions
+  is profiled. Only samples taken while the request's own coroutine is on
+  the stack are kept, so concurrent traffic does not pollute it. Results
+  go to a small in-memory ring (GET /admin/profiles/{id}).
+"""
+
+import asyncio
+import hmac
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from types import FrameType
+from typing import ContextManager, Iterator, Mapping
+
+from app.config import settings
+
+MAX_STACK_DEPTH = 128
+
+
+def is_admin(token: str | None) -> bool:
+    """Constant-time check against settings.ADMIN_TOKEN (unset = no admin)."""
+    if not settings.ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode(), settings.ADMIN_TOKEN.encode())
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Samples one thread's stack on a background thread.
+
+    If `anchor` is given, only samples whose stack contains that frame are
+    kept (e.g. a request's coroutine frame while it is running).
+    """
+
+    def __init__(
+        self,
+        interval: float | None = None,
+        thread_id: int | None = None,
+        anchor: FrameType | None = None,
+    ):
+        self.interval = interval or settings.PROFILE_SAMPLE_INTERVAL
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.anchor = anchor
+        self.samples: Counter[str] = Counter()
+        self.taken = 0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._started = 0.0
+
+    def _sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        self.taken += 1
+        stack = []
+        anchored = self.anchor is None
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            if frame is self.anchor:
+                anchored = True
+            stack.append(_frame_name(frame))
+            frame = frame.f_back
+        if anchored and stack:
+            self.samples[";".join(reversed(stack))] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.duration = time.perf_counter() - self._started
+        return self
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+async def profile_loop(seconds: float, interval: float | None = None) -> SamplingProfiler:
+    """Sample the running event loop for `seconds` (call from the loop)."""
+    profiler = SamplingProfiler(interval)
+    profiler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.stop()
+    return profiler
+
+
+# -- Per-request profiles -----------------------------------------------------
+
+@dataclass
+class Profile:
+    id: int
+    label: str
+    samples: Counter = field(default_factory=Counter)
+    duration: float = 0.0
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "label": self.label,
+            "samples": sum(self.samples.values()),
+            "duration_ms": round(self.duration * 1000, 1),
+        }
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+_profile_ids = itertools.count(1)
+recent_profiles: deque[Profile] = deque(maxlen=64)
+
+
+def get_profile(profile_id: int) -> Profile | None:
+    return next((p for p in recent_profiles if p.id == profile_id), None)
+
+
+@contextmanager
+def profile_block(label: str, anchor: FrameType) -> Iterator[Profile]:
+    """Profile the block, keeping samples taken inside `anchor`'s frame."""
+    profile = Profile(next(_profile_ids), label)
+    profiler = SamplingProfiler(anchor=anchor)
+    profiler.start()
+    try:
+        yield profile
+    finally:
+        profiler.stop()
+        profile.samples = profiler.samples
+        profile.duration = profiler.duration
+        recent_profiles.append(profile)
+
+
+def maybe_profile(label: str, anchor: FrameType | None) -> ContextManager[Profile | None]:
+    """profile_block() if an anchor is given, else a no-op yielding None."""
+    return profile_block(label, anchor) if anchor is not None else nullcontext()
+
+
+def wants_profile(headers: Mapping[str, str]) -> bool:
+    """X-Profile requested by an admin (header names lower-case)."""
+    return headers.get("x-profile", "") not in ("", "0") and is_admin(headers.get("x-admin-token"))
+
+
+class ProfileMiddleware:
+    """Profiles /game requests that carry X-Profile and a valid admin token."""
+
+    def __init__(self, app, prefix: str = "/game"):
+        self.app = app
+        self.prefix = prefix
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not settings.ADMIN_TOKEN
+            or not scope["path"].startswith(self.prefix)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        if not wants_profile(headers):
+            await self.app(scope, receive, send)
+            return
+
+        with profile_block(f"{scope['method']} {scope['path']}", sys._getframe()) as profile:
+            async def send_with_id(message):
+                if message["type"] == "http.response.start":
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-profile-id", str(profile.id).encode()),
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, send_with_id)
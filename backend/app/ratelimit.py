@@ -0,0 +1,283 @@
+"""
+Token buckets.
+
+A bucket holds up to `capacity` tokens and refills at `rate` tokens per
+second; an action takes one token or is refused (or waits). Buckets are
+refilled lazily from the clock when consulted, so an idle bucket costs
+nothing and checking one is a few float operations.
+
+KeyedBuckets keeps one bucket per key (chat, user, IP, ...) and forgets
+buckets that have refilled completely, so memory tracks only recently
+active keys.
+
+The request limits below use them to protect the database from single
+clients: RateLimitMiddleware answers /game and /auth requests over the
+per-IP or per-user limit with a bare 429 (and refuses /ws handshakes)
+before any routing, session or query, and the websocket receive loop
+checks each action against `limits.ws`. user_id is whatever the client
+claims, as everywhere else in the API, so the per-IP bucket is the one
+a client cannot sidestep.
+"""
+
+import asyncio
+import math
+import re
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, TypeVar
+
+from app.config import settings
+from app.metrics import registry
+
+K = TypeVar("K", bound=Hashable)
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated", "clock")
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take `tokens` if available now."""
+        self._refill(self.clock())
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def delay(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` could be taken (0 if available now)."""
+        self._refill(self.clock())
+        missing = tokens - self.tokens
+        return max(0.0, missing / self.rate) if self.rate > 0 else float("inf")
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """
+        Take `tokens` now, going into debt if they are not there. Returns
+        the seconds until the debt is repaid, i.e. how long the caller
+        should wait before acting; callers are served in reservation order.
+        """
+        self._refill(self.clock())
+        self.tokens -= tokens
+        return max(0.0, -self.tokens / self.rate) if self.rate > 0 else float("inf")
+
+    def pause(self, seconds: float):
+        """Empty the bucket for `seconds` (e.g. a server's retry-after)."""
+        self._refill(self.clock())
+        self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+    def full(self) -> bool:
+        self._refill(self.clock())
+        return self.tokens >= self.capacity
+
+    async def acquire(self, tokens: float = 1.0):
+        """Wait until `tokens` are available, then take them."""
+        while not self.try_acquire(tokens):
+            await asyncio.sleep(self.delay(tokens))
+
+
+class KeyedBuckets(Generic[K]):
+    """One TokenBucket per key, created on first use."""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        max_keys: int = 100_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: OrderedDict[K, TokenBucket] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def get(self, key: K) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self.prune()
+                # Still mostly busy keys: forget the least recently used
+                # tenth, so the next new keys don't each rescan the lot
+                while len(self._buckets) > self.max_keys * 0.9:
+                    self._buckets.popitem(last=False)
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.capacity, self.clock)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def try_acquire(self, key: K, tokens: float = 1.0) -> bool:
+        return self.get(key).try_acquire(tokens)
+
+    def delay(self, key: K, tokens: float = 1.0) -> float:
+        return self.get(key).delay(tokens)
+
+    def take(self, key: K) -> float:
+        """Take a token for `key`: 0 if taken, else seconds until one is free."""
+        bucket = self.get(key)
+        return 0.0 if bucket.try_acquire() else bucket.delay()
+
+    def prune(self) -> int:
+        """Drop buckets that have refilled (they behave exactly like new ones)."""
+        idle = [key for key, bucket in self._buckets.items() if bucket.full()]
+        for key in idle:
+            del self._buckets[key]
+        return len(idle)
+
+
+# -- Request limits -----------------------------------------------------------
+
+rate_limited_ip = registry.counter(
+    "rate_limited_ip_total",
+    "Requests and websocket handshakes refused by the per-IP limit",
+)
+rate_limited_user = registry.counter(
+    "rate_limited_user_total",
+    "Requests and websocket handshakes refused by the per-user limit",
+)
+rate_limited_ws_actions = registry.counter(
+    "rate_limited_ws_actions_total",
+    "Websocket actions answered with rate_limited",
+)
+
+
+class RequestLimits:
+    """The per-IP, per-user and websocket buckets configured in Settings."""
+
+    def __init__(self):
+        self.ip: KeyedBuckets[str] = KeyedBuckets(
+            settings.RATE_LIMIT_IP_RATE, settings.RATE_LIMIT_IP_BURST, settings.RATE_LIMIT_MAX_KEYS
+        )
+        self.user: KeyedBuckets[int] = KeyedBuckets(
+            settings.RATE_LIMIT_USER_RATE, settings.RATE_LIMIT_USER_BURST, settings.RATE_LIMIT_MAX_KEYS
+        )
+        self.ws: KeyedBuckets[int] = KeyedBuckets(
+            settings.RATE_LIMIT_WS_RATE, settings.RATE_LIMIT_WS_BURST, settings.RATE_LIMIT_MAX_KEYS
+        )
+
+
+# Global limits
+limits = RequestLimits()
+
+_USER_ID_QUERY = re.compile(rb"(?:^|&)user_id=(\d+)")
+_USER_ID_JSON = re.compile(rb'"user_id"\s*:\s*(\d+)')
+_USER_ID_PATH = re.compile(r"^/ws/(\d+)")
+# Larger bodies are not scanned for a user_id (they are limited per IP only)
+MAX_SCANNED_BODY = 16 * 1024
+
+_REJECTION_BODY = b'{"detail":"Too many requests"}'
+
+
+def _header(scope, name: bytes) -> bytes | None:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return None
+
+
+async def _user_id(scope, receive) -> tuple[int | None, Callable]:
+    """
+    The user_id an HTTP request acts for, from its query string or a small
+    JSON body. Returns it with a receive callable that replays the body.
+    """
+    match = _USER_ID_QUERY.search(scope["query_string"])
+    if match:
+        return int(match.group(1)), receive
+
+    length = _header(scope, b"content-length")
+    if (
+        scope["method"] != "POST"
+        or length is None
+        or not length.isdigit()
+        or int(length) > MAX_SCANNED_BODY
+        or not (_header(scope, b"content-type") or b"").startswith(b"application/json")
+    ):
+        return None, receive
+
+    messages = []
+    body = b""
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            break
+        body += message.get("body", b"")
+        if not message.get("more_body", False):
+            break
+
+    async def replay():
+        return messages.pop(0) if messages else await receive()
+
+    match = _USER_ID_JSON.search(body)
+    return (int(match.group(1)) if match else None), replay
+
+
+async def _reject(scope, send, retry_after: float):
+    if scope["type"] == "websocket":
+        # Closing before accept turns the handshake into a 403
+        await send({"type": "websocket.close", "code": 1008})
+        return
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(_REJECTION_BODY)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": _REJECTION_BODY})
+
+
+class RateLimitMiddleware:
+    """
+    Rejects /game and /auth requests and /ws handshakes over the per-IP
+    limit, then /game requests over their user's limit and handshakes over
+    the user's websocket limit.
+    """
+
+    def __init__(self, app, prefixes: tuple[str, ...] = ("/game", "/auth", "/ws")):
+        self.app = app
+        self.prefixes = prefixes
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] not in ("http", "websocket")
+            or not settings.RATE_LIMIT_ENABLED
+            or not scope["path"].startswith(self.prefixes)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        wait = limits.ip.take(client[0] if client else "")
+        if wait:
+            rate_limited_ip.inc()
+            await _reject(scope, send, wait)
+            return
+
+        if scope["type"] == "websocket":
+            match = _USER_ID_PATH.match(scope["path"])
+            wait = limits.ws.take(int(match.group(1))) if match else 0.0
+        elif scope["path"].startswith("/game"):
+            user_id, receive = await _user_id(scope, receive)
+            wait = limits.user.take(user_id) if user_id is not None else 0.0
+        if wait:
+            rate_limited_user.inc()
+            await _reject(scope, send, wait)
+            return
+
+        await self.app(scope, receive, send)
@@ -1,4 +1,6 @@
+from app.routers.admin import router as admin_router
 from app.routers.auth import router as auth_router
 from app.routers.game import router as game_router
+from app.routers.stats import router as stats_router
 
-__all__ = ["auth_router", "game_router"]
+__all__ = ["admin_router", "auth_router", "game_router", "stats_router"]
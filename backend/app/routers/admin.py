@@ -0,0 +1,50 @@
+"""
+Admin router.
+
+Operational endpoints, enabled only when settings.ADMIN_TOKEN is set and
+called with a matching X-Admin-Token header.
+"""
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app.profiling import get_profile, is_admin, profile_loop, recent_profiles
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+async def require_admin(x_admin_token: str | None = Header(None)):
+    if not is_admin(x_admin_token):
+        # Indistinguishable from a missing route
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@router.get("/profile", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def profile(
+    seconds: float = Query(10.0, gt=0, le=120),
+    interval: float | None = Query(None, ge=0.001, le=1.0),
+):
+    """Sample the event loop for `seconds`; returns collapsed stacks."""
+    profiler = await profile_loop(seconds, interval)
+    return PlainTextResponse(
+        profiler.collapsed(),
+        headers={
+            "X-Profile-Samples": str(profiler.taken),
+            "X-Profile-Duration-Ms": f"{profiler.duration * 1000:.0f}",
+        },
+    )
+
+
+@router.get("/profiles", dependencies=[Depends(require_admin)])
+async def list_profiles():
+    """Recent per-request profiles (X-Profile header), newest first."""
+    return [p.summary() for p in reversed(recent_profiles)]
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def get_request_profile(profile_id: int):
+    """Collapsed stacks for one per-request profile."""
+    recorded = get_profile(profile_id)
+    if recorded is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return recorded.collapsed()
@@ -10,12 +10,12 @@ import json
 from urllib.parse import parse_qs, unquote
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
-from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.config import settings
-from app.database import get_db
+from app.sharding import ShardedSession, get_sharded_db
 from app.models import User
+from app.tracing import span
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -85,14 +85,15 @@ def validate_telegram_data(init_data: str) -> dict | None:
 @router.post("/telegram", response_model=UserResponse)
 async def authenticate_telegram(
     auth_data: TelegramAuthData,
-    db: AsyncSession = Depends(get_db)
+    dbs: ShardedSession = Depends(get_sharded_db)
 ):
     """
     Authenticate user via Telegram WebApp initData.
     Creates user if not exists.
     """
     # For development, allow bypassing validation
-    user_data = validate_telegram_data(auth_data.init_data)
+    with span("auth.validate_init_data"):
+        user_data = validate_telegram_data(auth_data.init_data)
     
     # If validation fails, try parsing as JSON (for dev)
     if not user_data:
@@ -106,6 +107,7 @@ async def authenticate_telegram(
         raise HTTPException(status_code=401, detail="Invalid user data")
     
     # Get or create user
+    db = dbs.for_user(telegram_id)
     result = await db.execute(
         select(User).where(User.telegram_id == telegram_id)
     )
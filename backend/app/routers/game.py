@@ -4,16 +4,22 @@ Game API router.
 Handles game state endpoints (REST fallback for non-WebSocket clients).
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy.ext.asyncio import AsyncSession
+import json
+
+from fastapi import APIRouter, HTTPException, Depends, Query, Header, Response
 from pydantic import BaseModel
 
-from app.database import get_db
+from app.sharding import ShardedSession, get_sharded_db
 from app.game.skills.mining import MiningSkill
-from app.game.data.ores import get_all_ores
+from app.game.leaderboard import top_miners
+from app.game.data.ores import ORE_DEFINITIONS
+from app.game.state import status_etag, etag_matches
 
 router = APIRouter(prefix="/game", tags=["game"])
 
+# Static for the life of the process: serialized once
+_ORES_BODY = json.dumps(ORE_DEFINITIONS).encode()
+
 
 class MiningActionRequest(BaseModel):
     user_id: int
@@ -21,6 +27,7 @@ class MiningActionRequest(BaseModel):
 
 
 class MiningStatusResponse(BaseModel):
+    version: int
     skill_type: str
     level: int
     xp: int
@@ -34,22 +41,36 @@ class MiningStatusResponse(BaseModel):
 
 @router.get("/mining/status")
 async def get_mining_status(
+    response: Response,
     user_id: int = Query(...),
-    db: AsyncSession = Depends(get_db)
+    if_none_match: str | None = Header(None),
+    dbs: ShardedSession = Depends(get_sharded_db)
 ):
-    """Get current mining skill status."""
-    mining = MiningSkill(db)
+    """
+    Get current mining skill status.
+    
+    Supports conditional GET: returns 304 when the client's If-None-Match
+    still matches the player's state version.
+    """
+    mining = MiningSkill(dbs.for_user(user_id))
+    etag = status_etag(await mining.get_state_version(user_id))
+    
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    
     status = await mining.get_status(user_id)
+    response.headers["ETag"] = status_etag(status["version"])
+    response.headers["Cache-Control"] = "no-cache"
     return status
 
 
 @router.post("/mining/start")
 async def start_mining(
     request: MiningActionRequest,
-    db: AsyncSession = Depends(get_db)
+    dbs: ShardedSession = Depends(get_sharded_db)
 ):
     """Start mining an ore."""
-    mining = MiningSkill(db)
+    mining = MiningSkill(dbs.for_user(request.user_id))
     result = await mining.start_mining(request.user_id, request.ore_id)
     
     if not result.success:
@@ -58,8 +79,8 @@ async def start_mining(
     return {
         "success": True,
         "message": result.message,
-        "ore_id": result.ore_id,
-        "ore_name": result.ore_name,
+        "ore_id": result.action_id,
+        "ore_name": result.action_name,
         "level": result.level,
         "xp": result.total_xp
     }
@@ -68,10 +89,10 @@ async def start_mining(
 @router.post("/mining/stop")
 async def stop_mining(
     request: MiningActionRequest,
-    db: AsyncSession = Depends(get_db)
+    dbs: ShardedSession = Depends(get_sharded_db)
 ):
     """Stop mining."""
-    mining = MiningSkill(db)
+    mining = MiningSkill(dbs.for_user(request.user_id))
     result = await mining.stop_mining(request.user_id)
     
     return {
@@ -85,17 +106,10 @@ async def stop_mining(
 @router.get("/ores")
 async def get_ores():
     """Get all ore definitions."""
-    ores = get_all_ores()
-    return [
-        {
-            "id": ore.id,
-            "name": ore.name,
-            "level_required": ore.level_required,
-            "xp": ore.xp,
-            "mining_time": ore.mining_time,
-            "ascii": ore.ascii,
-            "color": ore.color,
-            "description": ore.description
-        }
-        for ore in ores
-    ]
+    return Response(content=_ORES_BODY, media_type="application/json")
+
+
+@router.get("/leaderboard")
+async def get_leaderboard(limit: int = Query(10, ge=1, le=100)):
+    """Top miners by XP (gathered from every shard)."""
+    return await top_miners(limit)
@@ -0,0 +1,34 @@
+"""
+Analytics router.
+
+Read-only views over the hourly XP/ore rollups.
+"""
+
+from typing import Literal
+from fastapi import APIRouter, Depends, Query
+
+from app.sharding import ShardedSession, get_sharded_db
+from app.game.analytics import user_history, global_totals
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+
+@router.get("/users/{user_id}/history")
+async def get_user_history(
+    user_id: int,
+    hours: int = Query(24, ge=1, le=24 * 90),
+    skill: str | None = Query(None),
+    dbs: ShardedSession = Depends(get_sharded_db)
+):
+    """Hourly XP and actions for one player."""
+    return await user_history(dbs.for_user(user_id), user_id, hours, skill)
+
+
+@router.get("/global")
+async def get_global_totals(
+    days: int = Query(1, ge=1, le=365),
+    bucket: Literal["hour", "day"] = Query("hour"),
+    skill: str | None = Query(None)
+):
+    """XP, actions (ores mined) and active players per hour or day."""
+    return await global_totals(days, bucket, skill)
@@ -0,0 +1,31 @@
+"""
+Telegram webhook router (settings.BOT_MODE == "webhook").
+
+Telegram POSTs each update here; the aiogram dispatcher from app.bot
+handles it on this process's event loop. Included by app.main only in
+webhook mode, so polling deployments never import the bot.
+"""
+
+from fastapi import APIRouter, Header, Request, Response
+from pydantic import ValidationError
+
+from app.bot import feed_webhook_update, webhook_secret_ok
+from app.config import settings
+
+router = APIRouter(tags=["telegram"])
+
+
+@router.post(settings.BOT_WEBHOOK_PATH, include_in_schema=False)
+async def telegram_webhook(
+    request: Request,
+    x_telegram_bot_api_secret_token: str | None = Header(None),
+):
+    """Accept one Telegram update; it is handled in the background."""
+    if not webhook_secret_ok(x_telegram_bot_api_secret_token):
+        return Response(status_code=401)
+    try:
+        feed_webhook_update(await request.json())
+    except (ValueError, ValidationError):
+        # Malformed; acknowledged anyway, as Telegram would only redeliver it
+        pass
+    return Response(status_code=200)
@@ -1,17 +1,120 @@
 """
 WebSocket handler for real-time game updates.
 
-Manages mining progress ticks and broadcasts updates to connected clients.
+Relays live action progress and completions to connected clients. The
+actions themselves are ticked by the ConnectionManager's ActionScheduler
+(one task for every player and skill), not per connection.
+
+Every accepted socket gets a generation number. Teardown is keyed by
+(user_id, generation) so a stale handler from a replaced connection can
+never remove the fresh connection or cancel its mining loop.
+
+Sessions are resumable. Each connection is handed a resume token in a
+"session" frame; when it closes, the status snapshots it was getting
+deltas against are parked for WS_RESUME_TTL. A client reconnecting with
+?resume=<token>&version=<its status version> picks them back up and gets
+"status_unchanged" or a "status_delta" instead of a full status. Without
+a parked session (another worker, or after a restart) a token from the
+same game data still lets an unchanged client off with one query. Full
+status loads after a reconnect go through a per-worker token bucket, so
+a reconnect storm is paced rather than stampeding the database; clients
+that would wait longer than WS_RESYNC_MAX_WAIT get "server_busy" with a
+reconnect delay and are closed (1013, try again later).
+
+Frames are JSON unless the client negotiated the binary subprotocol,
+which encodes ticks and completions with the fixed schemas in app.wire.
+
+On shutdown the manager drains: each client gets a "server_draining"
+frame with a randomized reconnect delay before its socket is closed
+(1012, service restart), and new sockets get the same frame instead of
+a session.
 """
 
 import asyncio
+import itertools
 import json
+import logging
+import random
+import secrets
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
 from typing import Dict, Set
 from fastapi import WebSocket, WebSocketDisconnect
+from starlette.websockets import WebSocketState
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import async_session
+from app.config import settings
+from app.database import track_queries
+from app.metrics import registry
+from app.profiling import maybe_profile, wants_profile
+from app.ratelimit import TokenBucket, limits, rate_limited_ws_actions
+from app.sharding import shards
+from app.tracing import acquire_connection, span, start_trace
+from app import wire
+from app.game.scheduler import ActionScheduler, LiveAction
+from app.game.skills.action import ActionResult
 from app.game.skills.mining import MiningSkill
+from app.game.state import DATA_TAG, diff_status
+
+logger = logging.getLogger(__name__)
+
+# Status snapshots kept per connection as delta bases
+MAX_STATUS_SNAPSHOTS = 4
+
+ws_resumed = registry.counter(
+    "ws_resumed_total",
+    "Reconnects that picked up a parked session",
+)
+ws_resumed_unchanged = registry.counter(
+    "ws_resumed_unchanged_total",
+    "Reconnects answered with status_unchanged after one state query",
+)
+ws_full_resyncs = registry.counter(
+    "ws_full_resyncs_total",
+    "Connections that needed a full status load",
+)
+ws_resyncs_deferred = registry.counter(
+    "ws_resyncs_deferred_total",
+    "Connections told server_busy because the resync queue was too long",
+)
+
+
+@dataclass
+class ParkedSession:
+    """Delta state of a closed connection, kept for its reconnect."""
+    token: str
+    snapshots: Dict[int, dict]
+    acked_version: int | None
+    expires: float
+
+
+def new_resume_token() -> str:
+    # Prefixed with the game data tag, so any worker can tell whether a
+    # client's status was built from the same definitions
+    return f"{DATA_TAG}.{secrets.token_urlsafe(16)}"
+
+
+async def accept(websocket: WebSocket):
+    """Accept a socket in the encoding negotiated from its subprotocol offer."""
+    protocol = wire.negotiate(websocket.scope.get("subprotocols", []))
+    websocket.state.binary = protocol == wire.BINARY_PROTOCOL
+    await websocket.accept(subprotocol=protocol)
+
+
+async def send_json(websocket: WebSocket, message: dict):
+    """
+    Send a message in the socket's encoding (a binary frame where it has
+    a schema, JSON otherwise), inside a ws.send span (when tracing).
+    """
+    with span("ws.send", **{"message.type": message.get("type")}):
+        frame = wire.encode(message) if getattr(websocket.state, "binary", False) else None
+        if frame is not None:
+            await websocket.send_bytes(frame)
+        else:
+            await websocket.send_json(message)
 
 
 class ConnectionManager:
@@ -20,185 +123,572 @@ class ConnectionManager:
     def __init__(self):
         # user_id -> WebSocket
         self.active_connections: Dict[int, WebSocket] = {}
-        # user_id -> asyncio.Task (mining loop)
-        self.mining_tasks: Dict[int, asyncio.Task] = {}
+        # user_id -> generation of the registered connection
+        self.generations: Dict[int, int] = {}
+        # Ticks the live actions of every connected player
+        self.scheduler = ActionScheduler(self)
+        # user_id -> {state version -> status sent at that version}
+        self.status_snapshots: Dict[int, Dict[int, dict]] = {}
+        # user_id -> last state version the client acknowledged
+        self.acked_versions: Dict[int, int] = {}
+        # user_id -> resume token of the registered connection
+        self.resume_tokens: Dict[int, str] = {}
+        # user_id -> delta state of a recently closed connection, oldest first
+        self.parked: OrderedDict[int, ParkedSession] = OrderedDict()
+        # Paces full status loads after (re)connects
+        self.resyncs = TokenBucket(settings.WS_RESYNC_RATE, settings.WS_RESYNC_BURST)
+        self._generation_counter = itertools.count(1)
+        self._reaper_task: asyncio.Task | None = None
+        # Set for good once the worker starts draining
+        self.draining = False
     
-    async def connect(self, websocket: WebSocket, user_id: int):
-        """Accept and register a new connection."""
-        await websocket.accept()
+    async def connect(self, websocket: WebSocket, user_id: int, resume_token: str | None = None) -> tuple[int, bool]:
+        """
+        Accept and register a new connection. Returns its generation and
+        whether `resume_token` brought back the previous session's state.
+        """
+        await accept(websocket)
+        
+        generation = next(self._generation_counter)
+        old_websocket = self.active_connections.get(user_id)
+        
+        # Register the new connection before closing the old one, so the
+        # old handler's teardown sees a generation mismatch and is a no-op.
+        self.active_connections[user_id] = websocket
+        self.generations[user_id] = generation
+        self.scheduler.untrack(user_id)
+        resumed = self._resume(user_id, resume_token)
+        self.resume_tokens[user_id] = new_resume_token()
         
-        # Disconnect existing connection if any
-        if user_id in self.active_connections:
+        if old_websocket is not None:
             try:
-                await self.active_connections[user_id].close()
-            except:
+                await old_websocket.close(code=4000, reason="replaced")
+            except Exception:
                 pass
         
-        self.active_connections[user_id] = websocket
+        return generation, resumed
+    
+    def _resume(self, user_id: int, token: str | None) -> bool:
+        """Keep or restore the delta state `token` refers to; drop any other."""
+        parked = self.parked.pop(user_id, None)
+        if token is not None and token == self.resume_tokens.get(user_id):
+            # Replacing a connection the server still thinks is live
+            return True
+        self.status_snapshots.pop(user_id, None)
+        self.acked_versions.pop(user_id, None)
+        if parked is None or token != parked.token or parked.expires < time.monotonic():
+            return False
+        self.status_snapshots[user_id] = parked.snapshots
+        if parked.acked_version is not None:
+            self.acked_versions[user_id] = parked.acked_version
+        return True
+    
+    def _park(self, user_id: int):
+        """Keep a closing connection's delta state for WS_RESUME_TTL."""
+        token = self.resume_tokens.pop(user_id, None)
+        snapshots = self.status_snapshots.pop(user_id, None)
+        acked_version = self.acked_versions.pop(user_id, None)
+        if token is None or not snapshots or settings.WS_RESUME_TTL <= 0:
+            return
+        self.parked[user_id] = ParkedSession(
+            token, snapshots, acked_version, time.monotonic() + settings.WS_RESUME_TTL
+        )
+        while len(self.parked) > settings.WS_RESUME_MAX_SESSIONS:
+            self.parked.popitem(last=False)
+    
+    def expire_parked(self) -> int:
+        """Drop parked sessions past their TTL. Returns how many."""
+        now, expired = time.monotonic(), 0
+        # Parked in expiry order (the TTL is fixed), so stop at the first live one
+        while self.parked:
+            user_id, parked = next(iter(self.parked.items()))
+            if parked.expires >= now:
+                break
+            del self.parked[user_id]
+            expired += 1
+        return expired
+    
+    async def admit_resync(self) -> float:
+        """
+        Wait for a full status load slot. Returns 0 once admitted, or the
+        reconnect delay to hand the client when the queue is too long.
+        """
+        wait = self.resyncs.delay()
+        if wait > settings.WS_RESYNC_MAX_WAIT:
+            ws_resyncs_deferred.inc()
+            # Spread the retries over the backlog instead of bunching them
+            return round(wait + random.uniform(0, wait), 3)
+        await asyncio.sleep(self.resyncs.reserve())
+        return 0.0
+    
+    def is_current(self, user_id: int, generation: int) -> bool:
+        """Check whether a generation is still the user's live connection."""
+        return self.generations.get(user_id) == generation
     
-    def disconnect(self, user_id: int):
-        """Remove a connection."""
-        if user_id in self.active_connections:
-            del self.active_connections[user_id]
+    def disconnect(self, user_id: int, generation: int) -> bool:
+        """
+        Remove a connection if it is still the current one.
+        Returns False when a newer connection has replaced it.
+        """
+        if not self.is_current(user_id, generation):
+            return False
         
-        # Cancel mining task if running
-        if user_id in self.mining_tasks:
-            self.mining_tasks[user_id].cancel()
-            del self.mining_tasks[user_id]
+        del self.active_connections[user_id]
+        del self.generations[user_id]
+        self._park(user_id)
+        
+        self.scheduler.untrack(user_id)
+        return True
     
-    async def send_message(self, user_id: int, message: dict):
-        """Send a message to a specific user."""
-        if user_id in self.active_connections:
+    async def send_message(self, user_id: int, message: dict, generation: int | None = None) -> bool:
+        """
+        Send a message to a specific user.
+        
+        When a generation is given, the message is only delivered to that
+        connection. A failed send closes and unregisters that connection.
+        """
+        websocket = self.active_connections.get(user_id)
+        if websocket is None:
+            return False
+        
+        current = self.generations[user_id]
+        if generation is not None and generation != current:
+            return False
+        
+        try:
+            await send_json(websocket, message)
+            return True
+        except Exception as e:
+            logger.warning("Dropping connection for user %s (gen %s): send failed: %r", user_id, current, e)
+            self.disconnect(user_id, current)
             try:
-                await self.active_connections[user_id].send_json(message)
-            except:
-                self.disconnect(user_id)
-    
-    async def start_mining_loop(self, user_id: int, ore_id: str):
-        """Start the mining loop for a user."""
-        # Cancel existing task if any
-        if user_id in self.mining_tasks:
-            self.mining_tasks[user_id].cancel()
-        
-        # Create new mining task
-        task = asyncio.create_task(self._mining_loop(user_id, ore_id))
-        self.mining_tasks[user_id] = task
-    
-    def stop_mining_loop(self, user_id: int):
-        """Stop the mining loop for a user."""
-        if user_id in self.mining_tasks:
-            self.mining_tasks[user_id].cancel()
-            del self.mining_tasks[user_id]
-    
-    async def _mining_loop(self, user_id: int, ore_id: str):
-        """Internal mining loop that sends progress updates."""
+                await websocket.close(code=1011)
+            except Exception:
+                pass
+            return False
+    
+    def ack(self, user_id: int, version: int):
+        """Record the state version the client has applied."""
+        snapshots = self.status_snapshots.get(user_id, {})
+        if version not in snapshots:
+            return
+        self.acked_versions[user_id] = version
+        # Older snapshots can never be a delta base again
+        for old_version in [v for v in snapshots if v < version]:
+            del snapshots[old_version]
+    
+    def status_message(self, user_id: int, status: dict) -> dict:
+        """
+        Build the cheapest status frame for what the client already has.
+        
+        Sends "status_unchanged" if the client acked the current version,
+        "status_delta" against the acked version when we still hold its
+        snapshot, and a full "status" otherwise.
+        """
+        version = status["version"]
+        snapshots = self.status_snapshots.setdefault(user_id, {})
+        base_version = self.acked_versions.get(user_id)
+        base = snapshots.get(base_version) if base_version is not None else None
+        
+        snapshots[version] = status
+        while len(snapshots) > MAX_STATUS_SNAPSHOTS:
+            oldest = min(v for v in snapshots if v != base_version)
+            del snapshots[oldest]
+        
+        if base is None:
+            return {"type": "status", "version": version, "data": status}
+        if base_version == version:
+            return {"type": "status_unchanged", "version": version}
+        return {
+            "type": "status_delta",
+            "base_version": base_version,
+            "version": version,
+            "changes": diff_status(base, status)
+        }
+    
+    def track_action(self, user_id: int, skill_type: str, action_id: str, started: datetime, generation: int):
+        """Tick a player's action for their current connection."""
+        if self.is_current(user_id, generation):
+            self.scheduler.track(user_id, skill_type, action_id, started, generation)
+    
+    async def action_progress(self, live: LiveAction, progress: float):
+        if live.skill_type == "mining":
+            message = {
+                "type": "mining_tick",
+                "progress": progress,
+                "ore_id": live.action.id,
+                "ore_name": live.action.name
+            }
+        else:
+            message = {
+                "type": "action_tick",
+                "skill": live.skill_type,
+                "progress": progress,
+                "action_id": live.action.id,
+                "action_name": live.action.name
+            }
+        await self.send_message(live.user_id, message, live.generation)
+    
+    async def action_completed(self, live: LiveAction, result: ActionResult):
+        if live.skill_type == "mining":
+            message = {
+                "type": "ore_mined",
+                "ore_id": result.action_id,
+                "ore_name": result.action_name,
+                "ore_quantity": result.quantity
+            }
+        else:
+            message = {
+                "type": "action_completed",
+                "skill": live.skill_type,
+                "action_id": result.action_id,
+                "action_name": result.action_name,
+                "amount": result.amount,
+                "quantity": result.quantity
+            }
+        message.update({
+            "xp_gained": result.xp_gained,
+            "total_xp": result.total_xp,
+            "level": result.level,
+            "xp_in_level": result.xp_in_level,
+            "xp_needed": result.xp_needed,
+            "message": result.message
+        })
+        await self.send_message(live.user_id, message, live.generation)
+        
+        if result.leveled_up:
+            await self.send_message(live.user_id, {
+                "type": "level_up",
+                "skill": live.skill_type,
+                "new_level": result.new_level
+            }, live.generation)
+    
+    async def action_failed(self, live: LiveAction, error: Exception):
+        await self.send_message(live.user_id, {
+            "type": "error",
+            "message": str(error)
+        }, live.generation)
+    
+    def draining_message(self) -> dict:
+        """A server_draining frame; the delay spreads reconnects over a window."""
+        return {
+            "type": "server_draining",
+            "reconnect_in": round(random.uniform(settings.DRAIN_RECONNECT_MIN, settings.DRAIN_RECONNECT_MAX), 3),
+            "message": "Server restarting"
+        }
+    
+    async def _drain_connection(self, user_id: int, generation: int, websocket: WebSocket):
         try:
-            while True:
-                async with async_session() as db:
-                    mining = MiningSkill(db)
-                    result = await mining.process_mining_tick(user_id)
-                    await db.commit()
-                    
-                    if result is None:
-                        # No longer mining
-                        break
-                    
-                    if result.ore_mined:
-                        # Ore was mined
-                        message = {
-                            "type": "ore_mined",
-                            "ore_id": result.ore_id,
-                            "ore_name": result.ore_name,
-                            "xp_gained": result.xp_gained,
-                            "total_xp": result.total_xp,
-                            "level": result.level,
-                            "ore_quantity": result.ore_quantity,
-                            "xp_in_level": result.xp_in_level,
-                            "xp_needed": result.xp_needed,
-                            "message": result.message
-                        }
-                        await self.send_message(user_id, message)
-                        
-                        if result.leveled_up:
-                            await self.send_message(user_id, {
-                                "type": "level_up",
-                                "skill": "mining",
-                                "new_level": result.new_level
-                            })
-                    else:
-                        # Progress update
-                        await self.send_message(user_id, {
-                            "type": "mining_tick",
-                            "progress": result.progress,
-                            "ore_id": result.ore_id,
-                            "ore_name": result.ore_name
-                        })
-                
-                # Tick rate: 100ms for smooth progress bar
-                await asyncio.sleep(0.1)
-                
-        except asyncio.CancelledError:
+            await send_json(websocket, self.draining_message())
+            await websocket.close(code=1012, reason="server draining")
+        except Exception:
             pass
-        except Exception as e:
-            await self.send_message(user_id, {
-                "type": "error",
-                "message": str(e)
-            })
+        self.disconnect(user_id, generation)
+    
+    async def drain(self) -> int:
+        """
+        Close every connection with a reconnect hint. Returns the number
+        of clients told.
+        
+        Live actions get one last scheduler pass first, so completions
+        already due are paid and reported on the socket they belong to
+        rather than left to the sweeper.
+        """
+        self.draining = True
+        await self.scheduler.stop()
+        try:
+            await self.scheduler.tick()
+        except Exception:
+            logger.exception("Final action tick failed")
+        
+        connections = [
+            (user_id, self.generations[user_id], websocket)
+            for user_id, websocket in self.active_connections.items()
+        ]
+        await asyncio.gather(*(self._drain_connection(*connection) for connection in connections))
+        return len(connections)
+    
+    def reap(self) -> int:
+        """
+        Stop ticking actions that no longer belong to a live socket.
+        Returns the number of players reaped.
+        """
+        reaped = 0
+        for user_id in self.scheduler.users():
+            websocket = self.active_connections.get(user_id)
+            if websocket is None or websocket.client_state != WebSocketState.CONNECTED:
+                self.scheduler.untrack(user_id)
+                reaped += 1
+        
+        # Sockets the client already closed but whose handler never noticed
+        for user_id, websocket in list(self.active_connections.items()):
+            if websocket.client_state == WebSocketState.DISCONNECTED:
+                self.disconnect(user_id, self.generations[user_id])
+                reaped += 1
+        
+        self.expire_parked()
+        return reaped
+    
+    async def _reaper_loop(self):
+        """Periodically reap orphaned actions and sockets."""
+        while True:
+            await asyncio.sleep(settings.WS_REAP_INTERVAL)
+            try:
+                reaped = self.reap()
+                if reaped:
+                    logger.info("Reaped %d orphaned websocket players", reaped)
+            except Exception:
+                logger.exception("Websocket reaper failed")
+    
+    def start_reaper(self):
+        """Start the background reaper (idempotent)."""
+        if self._reaper_task is None or self._reaper_task.done():
+            self._reaper_task = asyncio.create_task(self._reaper_loop())
+    
+    async def stop_reaper(self):
+        """Stop the background reaper."""
+        if self._reaper_task is not None:
+            self._reaper_task.cancel()
+            try:
+                await self._reaper_task
+            except asyncio.CancelledError:
+                pass
+            self._reaper_task = None
 
 
 # Global connection manager
 manager = ConnectionManager()
 
 
+async def receive_action(websocket: WebSocket) -> dict | None:
+    """
+    Wait for the next client message, pinging the client while it is quiet.
+    
+    Returns None once the client has been silent for WS_IDLE_TIMEOUT.
+    "pong" replies only reset the idle timer and are not returned.
+    """
+    idle = 0.0
+    while True:
+        try:
+            data = await asyncio.wait_for(
+                websocket.receive_json(),
+                timeout=settings.WS_PING_INTERVAL
+            )
+        except asyncio.TimeoutError:
+            idle += settings.WS_PING_INTERVAL
+            if idle >= settings.WS_IDLE_TIMEOUT:
+                return None
+            if websocket.application_state != WebSocketState.CONNECTED:
+                # We already closed this socket (e.g. it was replaced)
+                raise WebSocketDisconnect(code=1000)
+            await websocket.send_json({"type": "ping"})
+            continue
+        
+        if data.get("action") == "pong":
+            idle = 0.0
+            continue
+        return data
+
+
+def _query_int(websocket: WebSocket, name: str) -> int | None:
+    try:
+        return int(websocket.query_params[name])
+    except (KeyError, ValueError):
+        return None
+
+
+async def send_initial_status(
+    websocket: WebSocket, user_id: int, generation: int, resume_token: str | None, client_version: int | None
+) -> bool:
+    """
+    Bring a (re)connecting client up to date as cheaply as possible and
+    resume ticking its action. Returns False if the client was told to
+    come back later instead.
+    
+    In order of preference: "status_unchanged" when the version the client
+    holds is still current (one query), a delta against a snapshot we
+    still hold, or a full status once admit_resync lets it through.
+    """
+    if client_version is not None:
+        manager.ack(user_id, client_version)
+    # The client's version can be taken at its word if we sent it, or if
+    # it was built from the same game data (tagged in the token)
+    trusted = client_version is not None and (
+        manager.acked_versions.get(user_id) == client_version
+        or (resume_token or "").split(".", 1)[0] == DATA_TAG
+    )
+    
+    def resume_action(action_id: str | None, started: datetime | None):
+        if action_id and started is not None:
+            manager.track_action(user_id, MiningSkill.SKILL_TYPE, action_id, started, generation)
+    
+    async def send_status(db: AsyncSession, state=None):
+        status = await MiningSkill(db).get_status(user_id, state)
+        await send_json(websocket, manager.status_message(user_id, status))
+        started = status["action_started"]
+        resume_action(status["current_action"], datetime.fromisoformat(started) if started else None)
+    
+    async with shards.session(user_id) as db:
+        await acquire_connection(db)
+        state = None
+        if trusted:
+            _, state = await MiningSkill(db).get_state(user_id)
+            if state.version == client_version:
+                ws_resumed_unchanged.inc()
+                await send_json(websocket, {"type": "status_unchanged", "version": state.version})
+                resume_action(state.current_action, state.action_started)
+                return True
+        if user_id in manager.acked_versions:
+            await send_status(db, state)
+            return True
+    
+    # Full status: paced, and without holding a connection while queued
+    wait = await manager.admit_resync()
+    if wait:
+        await send_json(websocket, {
+            "type": "server_busy",
+            "reconnect_in": wait,
+            "message": "Server busy, reconnecting shortly"
+        })
+        await websocket.close(code=1013, reason="try again later")
+        return False
+    ws_full_resyncs.inc()
+    async with shards.session(user_id) as db:
+        await acquire_connection(db)
+        await send_status(db)
+    return True
+
+
 async def websocket_endpoint(websocket: WebSocket, user_id: int):
     """Main WebSocket endpoint handler."""
-    await manager.connect(websocket, user_id)
+    if manager.draining:
+        # Accepted only to hand over the reconnect hint
+        await accept(websocket)
+        await send_json(websocket, manager.draining_message())
+        await websocket.close(code=1012, reason="server draining")
+        return
+    
+    resume_token = websocket.query_params.get("resume")
+    generation, resumed = await manager.connect(websocket, user_id, resume_token)
+    if resumed:
+        ws_resumed.inc()
+    # Admin clients can profile every action on this socket (X-Profile)
+    profile_anchor = sys._getframe() if wants_profile(websocket.headers) else None
+    # Actions join the handshake's trace unless a message carries its own
+    handshake_traceparent = websocket.headers.get("traceparent")
+    # Actions rejected in a row by the rate limit
+    strikes = 0
     
     try:
-        # Send initial status
-        async with async_session() as db:
-            mining = MiningSkill(db)
-            status = await mining.get_status(user_id)
-            await websocket.send_json({
-                "type": "status",
-                "data": status
-            })
-            
-            # Resume mining if was mining
-            if status["current_action"]:
-                await manager.start_mining_loop(user_id, status["current_action"])
+        await send_json(websocket, {
+            "type": "session",
+            "resume_token": manager.resume_tokens.get(user_id),
+            "resumed": resumed,
+            "resume_ttl": settings.WS_RESUME_TTL,
+            # What binary frames refer to by item id
+            **({"items": wire.item_table()} if websocket.state.binary else {})
+        })
+        with start_trace("ws connect", handshake_traceparent, **{"enduser.id": user_id}):
+            if not await send_initial_status(
+                websocket, user_id, generation, resume_token, _query_int(websocket, "version")
+            ):
+                return
         
         # Handle incoming messages
-        while True:
-            data = await websocket.receive_json()
+        while manager.is_current(user_id, generation):
+            data = await receive_action(websocket)
+            if data is None:
+                logger.info("Closing idle websocket for user %s (gen %s)", user_id, generation)
+                await websocket.close(code=1001, reason="idle timeout")
+                break
             action = data.get("action")
             
-            if action == "start_mining":
-                ore_id = data.get("ore")
-                if ore_id:
-                    async with async_session() as db:
+            # Acks only update in-memory state; everything else may query
+            if action != "ack" and settings.RATE_LIMIT_ENABLED:
+                wait = limits.ws.take(user_id)
+                if wait:
+                    rate_limited_ws_actions.inc()
+                    strikes += 1
+                    if strikes >= settings.RATE_LIMIT_WS_MAX_STRIKES:
+                        logger.info("Closing flooding websocket for user %s (gen %s)", user_id, generation)
+                        await websocket.close(code=1008, reason="rate limited")
+                        break
+                    await send_json(websocket, {
+                        "type": "rate_limited",
+                        "action": action,
+                        "retry_after": round(wait, 3)
+                    })
+                    continue
+                strikes = 0
+            
+            traceparent = data.get("traceparent") if isinstance(data.get("traceparent"), str) else None
+            with start_trace(f"ws {action}", traceparent or handshake_traceparent, **{"enduser.id": user_id}), \
+                    track_queries(f"ws {action}"), \
+                    maybe_profile(f"ws {action}", profile_anchor) as profile:
+                if action == "start_mining":
+                    ore_id = data.get("ore")
+                    if ore_id:
+                        async with shards.session(user_id) as db:
+                            await acquire_connection(db)
+                            mining = MiningSkill(db)
+                            result = await mining.start_mining(user_id, ore_id)
+                            await db.commit()
+                            
+                            if result.success:
+                                manager.track_action(
+                                    user_id, MiningSkill.SKILL_TYPE, ore_id, result.action_started, generation
+                                )
+                                await send_json(websocket, {
+                                    "type": "mining_started",
+                                    "ore_id": ore_id,
+                                    "ore_name": result.action_name,
+                                    "message": result.message
+                                })
+                            else:
+                                await send_json(websocket, {
+                                    "type": "error",
+                                    "message": result.message
+                                })
+                
+                elif action == "stop_mining":
+                    manager.scheduler.untrack(user_id, MiningSkill.SKILL_TYPE)
+                    async with shards.session(user_id) as db:
+                        await acquire_connection(db)
                         mining = MiningSkill(db)
-                        result = await mining.start_mining(user_id, ore_id)
+                        result = await mining.stop_mining(user_id)
                         await db.commit()
                         
-                        if result.success:
-                            await manager.start_mining_loop(user_id, ore_id)
-                            await websocket.send_json({
-                                "type": "mining_started",
-                                "ore_id": ore_id,
-                                "ore_name": result.ore_name,
-                                "message": result.message
-                            })
-                        else:
-                            await websocket.send_json({
-                                "type": "error",
-                                "message": result.message
-                            })
-            
-            elif action == "stop_mining":
-                manager.stop_mining_loop(user_id)
-                async with async_session() as db:
-                    mining = MiningSkill(db)
-                    result = await mining.stop_mining(user_id)
-                    await db.commit()
-                    
-                    await websocket.send_json({
-                        "type": "mining_stopped",
-                        "message": result.message,
-                        "level": result.level,
-                        "xp": result.total_xp
-                    })
+                        await send_json(websocket, {
+                            "type": "mining_stopped",
+                            "message": result.message,
+                            "level": result.level,
+                            "xp": result.total_xp
+                        })
+                
+                elif action == "ack":
+                    if isinstance(data.get("version"), int):
+                        manager.ack(user_id, data["version"])
+                
+                elif action == "get_status":
+                    # The client may piggyback its ack on the request;
+                    # an explicit null version asks for a full status.
+                    if isinstance(data.get("version"), int):
+                        manager.ack(user_id, data["version"])
+                    elif "version" in data:
+                        manager.acked_versions.pop(user_id, None)
+                    async with shards.session(user_id) as db:
+                        await acquire_connection(db)
+                        mining = MiningSkill(db)
+                        status = await mining.get_status(user_id)
+                        await send_json(websocket, manager.status_message(user_id, status))
             
-            elif action == "get_status":
-                async with async_session() as db:
-                    mining = MiningSkill(db)
-                    status = await mining.get_status(user_id)
-                    await websocket.send_json({
-                        "type": "status",
-                        "data": status
-                    })
+            if profile is not None:
+                logger.info("Profiled ws %s for user %s: profile %d", action, user_id, profile.id)
     
     except WebSocketDisconnect:
-        manager.disconnect(user_id)
-    except Exception as e:
-        manager.disconnect(user_id)
+        pass
+    except Exception:
+        logger.exception("Websocket handler failed for user %s (gen %s)", user_id, generation)
+    finally:
+        # No-op if a newer connection has already replaced this one
+        manager.disconnect(user_id, generation)
@@ -0,0 +1,183 @@
+"""
+Schema versioning.
+
+Tables are created and changed by the Alembic migrations in
+backend/migrations, never by create_all at boot:
+
+    alembic upgrade head                       # every shard
+    alembic revision --autogenerate -m "..."   # after changing a model
+
+Booting only checks versions: one catalog lookup and one SELECT of
+alembic_version per shard, compared with the head revision read straight
+from the migration files, so processes that are up to date never import
+Alembic. A shard behind head is upgraded when DB_AUTO_MIGRATE is set (the
+production launcher does it once, before starting workers); otherwise
+startup fails with the command to run.
+
+Databases created by the old create_all boot have the tables but no
+alembic_version. They are adopted: the baseline revision (the schema the
+original create_all boot built) is stamped and every later migration
+applies as usual. A create_all boot of a later version may already have
+some of the objects those migrations add, so the migrations of that era
+skip what exists (adopted_has).
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+ALEMBIC_INI = MIGRATIONS_DIR.parent / "alembic.ini"
+BASELINE = "0001"  # the schema create_all used to build
+
+# Serializes concurrent upgrades of one PostgreSQL database
+MIGRATION_LOCK_ID = 0x1D1E_5C4E
+
+_REVISION = re.compile(r"^revision(?:: str)? = ['\"](\w+)['\"]", re.M)
+_DOWN_REVISION = re.compile(r"^down_revision(?:: [^=]+)? = (.+)$", re.M)
+
+
+class SchemaError(RuntimeError):
+    pass
+
+
+@dataclass
+class ShardSchema:
+    shard: int
+    revision: str | None  # found at boot; None when unversioned
+    migrated: bool = False
+
+
+def head_revision() -> str:
+    """The latest migration, parsed from the version files."""
+    revisions, parents = set(), set()
+    for path in (MIGRATIONS_DIR / "versions").glob("*.py"):
+        source = path.read_text(encoding="utf-8")
+        revision = _REVISION.search(source)
+        if revision is None:
+            continue
+        revisions.add(revision.group(1))
+        down = _DOWN_REVISION.search(source)
+        if down is not None:
+            parents.update(re.findall(r"['\"](\w+)['\"]", down.group(1)))
+    heads = revisions - parents
+    if len(heads) != 1:
+        raise SchemaError(
+            f"Expected one migration head in {MIGRATIONS_DIR}, found {sorted(heads) or 'none'}"
+        )
+    return heads.pop()
+
+
+def _current_revision(conn: Connection) -> tuple[str | None, bool]:
+    """(alembic_version, whether any app table exists) for a connection."""
+    inspector = inspect(conn)
+    if inspector.has_table("alembic_version"):
+        return conn.execute(text("SELECT version_num FROM alembic_version")).scalar(), True
+    return None, inspector.has_table("users")
+
+
+def _upgrade(conn: Connection, head: str) -> str | None:
+    """Bring one database to head. Returns the revision it was at."""
+    # Imported here: only processes that actually migrate pay for Alembic
+    from alembic import command
+    from alembic.config import Config
+
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+    # Re-read under the lock: another process may have just migrated
+    revision, has_tables = _current_revision(conn)
+    if revision == head:
+        return revision
+
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    config.attributes["connection"] = conn
+    if revision is None and has_tables:
+        command.stamp(config, BASELINE)
+        logger.info("Adopted unversioned schema at %s", BASELINE)
+    command.upgrade(config, "head")
+    return revision
+
+
+def adopted_has(table: str, column: str | None = None, index: str | None = None) -> bool:
+    """
+    For migrations of changes made while boot still ran create_all:
+    whether the database being upgraded already has the table (or its
+    column or index), because a create_all boot made it before adoption.
+    """
+    from alembic import context, op
+
+    if context.is_offline_mode():
+        return False
+    inspector = inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return False
+    if column is not None:
+        return column in {found["name"] for found in inspector.get_columns(table)}
+    if index is not None:
+        return index in {found["name"] for found in inspector.get_indexes(table)}
+    return True
+
+
+async def shard_revisions() -> list[ShardSchema]:
+    """Each shard's current revision (cheap: no Alembic import)."""
+    from app.sharding import shards
+
+    found = []
+    for shard, engine in enumerate(shards.engines):
+        async with engine.connect() as conn:
+            revision, _ = await conn.run_sync(_current_revision)
+        found.append(ShardSchema(shard, revision))
+    return found
+
+
+async def migrate_shard(engine: AsyncEngine) -> str | None:
+    """Upgrade one shard to head. Returns the revision it was at."""
+    head = head_revision()
+    async with engine.begin() as conn:
+        return await conn.run_sync(_upgrade, head)
+
+
+async def ensure_schema(migrate: bool | None = None) -> list[ShardSchema]:
+    """
+    Check every shard is at the head migration, upgrading the ones that
+    are behind when `migrate` (default DB_AUTO_MIGRATE). Raises
+    SchemaError for a shard left behind.
+    """
+    from app.sharding import shards
+
+    if migrate is None:
+        migrate = settings.DB_AUTO_MIGRATE
+    head = head_revision()
+    found = await shard_revisions()
+    for schema in found:
+        if schema.revision == head:
+            continue
+        if not migrate:
+            raise SchemaError(
+                f"Shard {schema.shard} schema is at {schema.revision or 'no revision'}, expected {head}: "
+                "run `alembic upgrade head` from backend/ (or set DB_AUTO_MIGRATE=true)"
+            )
+        schema.revision = await migrate_shard(shards.engines[schema.shard])
+        schema.migrated = True
+        logger.info("Shard %d migrated from %s to %s", schema.shard, schema.revision or "no revision", head)
+    return found
+
+
+def describe(found: list[ShardSchema]) -> str:
+    """One-line summary of an ensure_schema() result."""
+    head = head_revision()
+    migrated = [
+        f"shard {schema.shard} from {schema.revision or 'no revision'}"
+        for schema in found if schema.migrated
+    ]
+    return f"at {head}" + (f" (migrated {', '.join(migrated)})" if migrated else "")
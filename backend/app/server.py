@@ -0,0 +1,223 @@
+"""
+Production launcher.
+
+    python -m app.server
+
+Runs the API under uvicorn with explicit production settings instead of
+the development runner's file-watching reloader:
+
+- WEB_CONCURRENCY worker processes (each has its own event loop, DB pools,
+  websocket connections, rollup buffer and metrics);
+- uvloop and httptools, requested explicitly rather than left to "auto",
+  so a missing extra is reported instead of silently falling back;
+- a keep-alive timeout above the load balancer's idle timeout, so the
+  proxy never reuses a connection we are closing, and a tuned backlog;
+- access logging off (it is a large share of per-request CPU);
+- the Telegram bot, when RUN_BOT is set, in its own process so polling
+  never competes with request handling for a worker's loop (in webhook
+  mode the workers handle updates themselves and nothing is spawned);
+- schema migrations (DB_AUTO_MIGRATE) run once here, before the workers
+  start, so each worker only checks the schema version;
+- on SIGTERM/SIGINT each worker drains (app.main.drain) before uvicorn's
+  own shutdown, which would otherwise drop every websocket at once.
+
+A startup report with the effective concurrency settings is printed
+before the workers start; each worker prints its time to ready.
+"""
+
+import importlib.util
+import multiprocessing
+import os
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+from app.config import settings
+
+SOMAXCONN_PATH = "/proc/sys/net/core/somaxconn"
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def _somaxconn() -> int | None:
+    try:
+        with open(SOMAXCONN_PATH) as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def server_options() -> dict:
+    """uvicorn.Config keyword arguments for production."""
+    return {
+        "host": settings.HOST,
+        "port": settings.PORT,
+        "workers": max(1, settings.WEB_CONCURRENCY),
+        "loop": "uvloop" if _available("uvloop") else "asyncio",
+        "http": "httptools" if _available("httptools") else "h11",
+        "ws": "websockets",
+        "ws_per_message_deflate": settings.WS_PER_MESSAGE_DEFLATE,
+        "reload": False,
+        "timeout_keep_alive": settings.KEEPALIVE_TIMEOUT,
+        "backlog": settings.BACKLOG,
+        "access_log": settings.ACCESS_LOG,
+        "proxy_headers": True,
+        "forwarded_allow_ips": settings.FORWARDED_ALLOW_IPS,
+        "server_header": False,
+        # After the drain, for requests still in flight
+        "timeout_graceful_shutdown": int(settings.DRAIN_TIMEOUT),
+    }
+
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn server that drains the app before closing its connections."""
+
+    async def shutdown(self, sockets=None):
+        if not self.force_exit:
+            from app.main import drain
+            await drain()
+        await super().shutdown(sockets)
+
+
+def serve(options: dict):
+    """uvicorn.run() with DrainingServer."""
+    config = uvicorn.Config("app.main:app", **options)
+    server = DrainingServer(config)
+    if config.workers > 1:
+        Multiprocess(config, target=server.run, sockets=[config.bind_socket()]).run()
+    else:
+        server.run()
+        if not server.started:
+            raise SystemExit(3)  # uvicorn's startup failure code
+
+
+def _bot_mode() -> str:
+    if settings.BOT_MODE == "webhook":
+        return f"webhook at {settings.BOT_WEBHOOK_PATH}, handled in the API workers"
+    if settings.RUN_BOT:
+        return "polling, separate process"
+    return "not started (run python -m app.bot)"
+
+
+def _rate_limits() -> str:
+    if not settings.RATE_LIMIT_ENABLED:
+        return "off"
+    return (
+        f"{settings.RATE_LIMIT_IP_RATE:g}/s per IP, {settings.RATE_LIMIT_USER_RATE:g}/s per user, "
+        f"{settings.RATE_LIMIT_WS_RATE:g}/s websocket actions per user (per worker)"
+    )
+
+
+def _warm_up() -> str:
+    if not settings.WARMUP_ENABLED:
+        return "off"
+    return f"{settings.WARMUP_PLAYERS} active players per shard, then /health reports ready"
+
+
+def prepare_schema() -> str:
+    """Bring every shard to the latest migration before forking workers."""
+    import asyncio
+    from app.database import init_db
+    from app.schema import SchemaError, describe
+    from app.sharding import shards
+
+    async def run() -> str:
+        try:
+            return describe(await init_db())
+        finally:
+            # The workers' loops open their own connections
+            await shards.dispose()
+
+    try:
+        return asyncio.run(run())
+    except SchemaError as e:
+        raise SystemExit(str(e))
+
+
+def startup_report(options: dict, schema: str) -> str:
+    """Human-readable summary of the effective concurrency settings."""
+    from app.database import engine_options
+    from app.sharding import shards
+
+    workers = options["workers"]
+    somaxconn = _somaxconn()
+    backlog = options["backlog"]
+    if somaxconn is not None and somaxconn < backlog:
+        backlog_note = f"{backlog} requested, capped to {somaxconn} by net.core.somaxconn"
+    else:
+        backlog_note = str(backlog)
+
+    pool = engine_options(settings.DATABASE_URL)
+    if "pool_size" in pool:
+        per_worker = pool["pool_size"] + pool["max_overflow"]
+        pool_note = (
+            f"{pool['pool_size']} + {pool['max_overflow']} overflow per worker per shard "
+            f"(up to {workers * per_worker} connections per shard)"
+        )
+    else:
+        pool_note = "driver default (SQLite)"
+
+    lines = [
+        "Production server",
+        f"  listen       {options['host']}:{options['port']} (backlog {backlog_note})",
+        f"  workers      {workers} ({_cpus()} CPUs available)",
+        f"  event loop   {options['loop']}" + ("" if options["loop"] == "uvloop" else "  (uvloop not installed)"),
+        f"  http parser  {options['http']}" + ("" if options["http"] == "httptools" else "  (httptools not installed)"),
+        f"  keep-alive   {options['timeout_keep_alive']}s",
+        f"  drain        {settings.DRAIN_TIMEOUT:g}s, clients reconnect after "
+        f"{settings.DRAIN_RECONNECT_MIN:g}-{settings.DRAIN_RECONNECT_MAX:g}s",
+        f"  reload       {'on' if options['reload'] else 'off'}",
+        f"  access log   {'on' if options['access_log'] else 'off'}",
+        f"  proxy hdrs   trusted from {options['forwarded_allow_ips']}",
+        f"  rate limits  {_rate_limits()}",
+        f"  db pool      {pool_note}",
+        f"  shards       {len(shards.engines)}",
+        f"  schema       {schema}",
+        f"  warm-up      {_warm_up()}",
+        f"  tick rate    {settings.TICK_RATE}s per live miner",
+        f"  ws frames    JSON{' or binary (idle.bin.1)' if settings.WS_BINARY_ENABLED else ''}, "
+        f"permessage-deflate {'on offer' if options['ws_per_message_deflate'] else 'off'}",
+        f"  bot          {_bot_mode()}",
+    ]
+    return "\n".join(lines)
+
+
+def run_bot():
+    """Bot process entry point."""
+    import asyncio
+    import logging
+    from app.bot import main
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
+
+
+def main():
+    options = server_options()
+    print(startup_report(options, prepare_schema()), flush=True)
+
+    bot_process = None
+    if settings.RUN_BOT and settings.BOT_MODE != "webhook":
+        # spawn, not fork: the child must not inherit this process's engine
+        bot_process = multiprocessing.get_context("spawn").Process(target=run_bot, name="bot", daemon=True)
+        bot_process.start()
+        print(f"Bot started (pid {bot_process.pid})", flush=True)
+
+    try:
+        serve(options)
+    finally:
+        if bot_process is not None:
+            bot_process.terminate()
+            bot_process.join()
+
+
+if __name__ == "__main__":
+    main()
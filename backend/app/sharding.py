@@ -0,0 +1,352 @@
+"""
+Horizontal sharding by telegram_id.
+
+Every player row (users, skills, inventory, ...) is keyed by telegram_id,
+so a player's whole state lives on one shard. Players are mapped to
+shards with a consistent hash ring: adding a shard moves only ~1/N of the
+players, and the rebalance tool copies exactly those.
+
+Shards are configured with DATABASE_SHARD_URLS (comma separated, order
+matters: a shard's position is its identity on the ring). When it is
+empty there is a single shard backed by the default engine in
+app.database, so unsharded deployments behave exactly as before.
+
+    python -m app.sharding status      # players per shard, misplaced count
+    python -m app.sharding rebalance --writers-stopped
+                                       # move misplaced players to their shard
+
+Workers route by the ring of their own DATABASE_SHARD_URLS, so a worker
+with the old list looks for moved players on the old shard and one with
+the new list looks for unmoved ones on the new shard. Rebalance with the
+API and bots stopped, then start them with the new list.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import heapq
+import logging
+from typing import Awaitable, Callable, TypeVar
+
+from sqlalchemy import bindparam, delete, func, insert, select, text, Select, Table
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from app.config import settings
+from app.database import Base, engine, async_session, engine_options
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Virtual nodes per shard; more nodes give a more even spread
+VNODES_PER_SHARD = 128
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+class ShardRouter:
+    """Maps telegram_id to a shard engine/session via a consistent hash ring."""
+
+    def __init__(self, engines: list[AsyncEngine], vnodes: int = VNODES_PER_SHARD):
+        if not engines:
+            raise ValueError("At least one shard is required")
+        self.engines = engines
+        self.sessionmakers = [
+            async_sessionmaker(shard_engine, class_=AsyncSession, expire_on_commit=False)
+            for shard_engine in engines
+        ]
+
+        ring = sorted(
+            (_hash(f"shard-{index}-vnode-{vnode}"), index)
+            for index in range(len(engines))
+            for vnode in range(vnodes)
+        )
+        self._ring_points = [point for point, _ in ring]
+        self._ring_shards = [index for _, index in ring]
+
+    @classmethod
+    def from_urls(cls, urls: list[str]) -> "ShardRouter":
+        return cls([create_async_engine(url, **engine_options(url)) for url in urls])
+
+    def __len__(self) -> int:
+        return len(self.engines)
+
+    def shard_for(self, telegram_id: int) -> int:
+        """Index of the shard that owns a player."""
+        if len(self.engines) == 1:
+            return 0
+        position = bisect.bisect(self._ring_points, _hash(str(telegram_id)))
+        return self._ring_shards[position % len(self._ring_shards)]
+
+    def engine_for(self, telegram_id: int) -> AsyncEngine:
+        return self.engines[self.shard_for(telegram_id)]
+
+    def session(self, telegram_id: int) -> AsyncSession:
+        """New session on the player's shard (use as `async with`)."""
+        return self.sessionmakers[self.shard_for(telegram_id)]()
+
+    async def scatter(self, fn: Callable[[AsyncSession], Awaitable[T]]) -> list[T]:
+        """Run `fn` on every shard concurrently; results in shard order."""
+        async def run(sessionmaker) -> T:
+            async with sessionmaker() as db:
+                return await fn(db)
+
+        return list(await asyncio.gather(*(run(sm) for sm in self.sessionmakers)))
+
+    async def dispose(self):
+        for shard_engine in self.engines:
+            await shard_engine.dispose()
+
+
+def _build_router() -> ShardRouter:
+    urls = [url.strip() for url in settings.DATABASE_SHARD_URLS.split(",") if url.strip()]
+    if not urls:
+        # Unsharded: reuse the default engine and its pool
+        router = ShardRouter([engine])
+        router.sessionmakers = [async_session]
+        return router
+    return ShardRouter.from_urls(urls)
+
+
+# Global shard router
+shards = _build_router()
+
+
+class ShardedSession:
+    """
+    Per-request set of shard sessions, opened lazily.
+
+    Routers get one via Depends(get_sharded_db) and pick the session for
+    the player they are handling with `for_user(telegram_id)`.
+    """
+
+    def __init__(self, router: ShardRouter):
+        self.router = router
+        self._sessions: dict[int, AsyncSession] = {}
+
+    def for_user(self, telegram_id: int) -> AsyncSession:
+        index = self.router.shard_for(telegram_id)
+        if index not in self._sessions:
+            self._sessions[index] = self.router.sessionmakers[index]()
+        return self._sessions[index]
+
+    async def commit(self):
+        for session in self._sessions.values():
+            await session.commit()
+
+    async def rollback(self):
+        for session in self._sessions.values():
+            await session.rollback()
+
+    async def close(self):
+        for session in self._sessions.values():
+            await session.close()
+
+
+async def get_sharded_db() -> ShardedSession:
+    sessions = ShardedSession(shards)
+    try:
+        yield sessions
+        await sessions.commit()
+    except Exception:
+        await sessions.rollback()
+        raise
+    finally:
+        await sessions.close()
+
+
+async def merge_top(
+    fn: Callable[[AsyncSession], Awaitable[list[T]]],
+    limit: int,
+    key: Callable[[T], object],
+) -> list[T]:
+    """Scatter a per-shard top-N query and merge the results (descending key)."""
+    per_shard = await shards.scatter(fn)
+    return heapq.nlargest(limit, (row for rows in per_shard for row in rows), key=key)
+
+
+# -- Rebalancing --------------------------------------------------------------
+
+def player_tables() -> list[tuple[Table, str]]:
+    """Tables holding player rows and their telegram_id column, parents first."""
+    import app.models  # noqa: F401  (registers every table on Base.metadata)
+
+    tables = []
+    for table in Base.metadata.sorted_tables:
+        if table.name == "users":
+            tables.append((table, "telegram_id"))
+        elif "user_id" in table.c:
+            tables.append((table, "user_id"))
+    return tables
+
+
+def copy_columns(table: Table) -> list[str]:
+    """Columns to copy; surrogate autoincrement ids are reassigned on the target."""
+    return [
+        column.name for column in table.columns
+        if not (column.primary_key and column.autoincrement is True)
+    ]
+
+
+def copy_query(table: Table) -> Select:
+    """
+    SELECT of a table's copy_columns, for copying players to another
+    database.
+
+    Event ids are reassigned on the target, so skills.event_watermark (an
+    action_events id) cannot be copied as is. It is read as the number of
+    the skill's events it covers instead, and events are read in id order
+    so the target numbers them in the same order; rebase_watermarks()
+    turns the counts back into target ids once both are loaded.
+    """
+    columns = [table.c[name] for name in copy_columns(table)]
+    if table.name == "skills":
+        events = Base.metadata.tables["action_events"]
+        folded = (
+            select(func.count())
+            .where(
+                events.c.user_id == table.c.user_id,
+                events.c.skill_type == table.c.skill_type,
+                events.c.id <= table.c.event_watermark,
+            )
+            .scalar_subquery()
+            .label("event_watermark")
+        )
+        columns = [folded if column.name == "event_watermark" else column for column in columns]
+    query = select(*columns)
+    if table.name == "action_events":
+        query = query.order_by(table.c.id)
+    return query
+
+
+# Folded-event counts (copy_query) back to the id of the last folded event
+REBASE_WATERMARKS = text("""
+UPDATE skills SET event_watermark = coalesce((
+    SELECT max(r.id) FROM (
+        SELECT e.id, row_number() OVER (ORDER BY e.id) AS n
+        FROM action_events e
+        WHERE e.user_id = skills.user_id AND e.skill_type = skills.skill_type
+    ) r
+    WHERE r.n <= skills.event_watermark
+), 0)
+WHERE user_id IN :user_ids
+""").bindparams(bindparam("user_ids", expanding=True))
+
+
+async def rebase_watermarks(conn, user_ids: list[int]):
+    """Fix up the watermarks of skills loaded from copy_query, after their events."""
+    if user_ids:
+        await conn.execute(REBASE_WATERMARKS, {"user_ids": user_ids})
+
+
+async def move_players(source: int, target: int, telegram_ids: list[int]):
+    """
+    Copy players from one shard to another, then delete them at the source.
+
+    The target's rows for these players are replaced first, so re-running
+    after a failure between copy and delete does not duplicate anything.
+
+    The source rows are read FOR UPDATE and stay locked until they are
+    deleted, so a write that slips in anyway waits and then fails (the
+    rows are gone, and new child rows violate the users foreign key)
+    instead of landing after the copy and being lost.
+    """
+    tables = player_tables()
+    async with shards.engines[source].begin() as src:
+        copied: list[tuple[Table, list[dict]]] = []
+        for table, key in tables:
+            result = await src.execute(
+                copy_query(table)
+                .where(table.c[key].in_(telegram_ids))
+                .with_for_update(of=table)
+            )
+            copied.append((table, [dict(row._mapping) for row in result]))
+
+        async with shards.engines[target].begin() as dst:
+            for table, key in reversed(tables):
+                await dst.execute(delete(table).where(table.c[key].in_(telegram_ids)))
+            for table, rows in copied:
+                if rows:
+                    await dst.execute(insert(table), rows)
+            await rebase_watermarks(dst, telegram_ids)
+
+        for table, key in reversed(tables):
+            await src.execute(delete(table).where(table.c[key].in_(telegram_ids)))
+
+
+async def rebalance(batch_size: int = 500, dry_run: bool = False) -> dict[tuple[int, int], int]:
+    """
+    Move every player that lives on the wrong shard to the shard the ring
+    assigns it. Returns {(source, target): players moved}.
+    """
+    from app.models import User
+
+    moved: dict[tuple[int, int], int] = {}
+    for source in range(len(shards)):
+        last_id = None
+        while True:
+            query = select(User.telegram_id).order_by(User.telegram_id).limit(batch_size)
+            if last_id is not None:
+                query = query.where(User.telegram_id > last_id)
+            async with shards.engines[source].connect() as conn:
+                ids = list((await conn.execute(query)).scalars())
+            if not ids:
+                break
+            last_id = ids[-1]
+
+            by_target: dict[int, list[int]] = {}
+            for telegram_id in ids:
+                target = shards.shard_for(telegram_id)
+                if target != source:
+                    by_target.setdefault(target, []).append(telegram_id)
+
+            for target, batch in by_target.items():
+                if not dry_run:
+                    await move_players(source, target, batch)
+                moved[(source, target)] = moved.get((source, target), 0) + len(batch)
+    return moved
+
+
+async def _main(argv: list[str]):
+    from app.database import init_db
+    from app.models import User
+
+    command = argv[0] if argv else "status"
+    await init_db()
+
+    if command == "status":
+        async def count(db: AsyncSession) -> int:
+            return (await db.execute(select(func.count()).select_from(User))).scalar_one()
+
+        counts = await shards.scatter(count)
+        misplaced = await rebalance(dry_run=True)
+        for index, players in enumerate(counts):
+            print(f"shard {index}: {players:,} players")
+        print(f"misplaced: {sum(misplaced.values()):,}")
+    elif command == "rebalance":
+        if "--writers-stopped" not in argv:
+            print("Stop the API and bot workers first, then run:")
+            print("    python -m app.sharding rebalance --writers-stopped")
+            await shards.dispose()
+            return
+        moved = await rebalance()
+        for (source, target), players in sorted(moved.items()):
+            print(f"shard {source} -> shard {target}: {players:,} players")
+        print(f"moved: {sum(moved.values()):,}")
+    else:
+        print("usage: python -m app.sharding [status|rebalance --writers-stopped]")
+
+    await shards.dispose()
+
+
+if __name__ == "__main__":
+    import sys
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(sys.argv[1:]))
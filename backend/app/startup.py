@@ -0,0 +1,159 @@
+"""
+Worker startup phases and readiness.
+
+/health is ready from the end of startup until the worker starts
+draining for shutdown (app.main.drain).
+
+Each worker records how long it took to import, check the schema, start
+its services and warm up, measured from process start, and reports
+ready on /health only once all of them are done. The load balancer
+therefore never routes a player to a worker that is still opening
+connections or loading state.
+
+The optional warm-up (WARMUP_ENABLED) runs after the lifespan startup,
+in the background, and:
+- opens each shard's pool connections (handshake and auth off the
+  request path);
+- loads the status of the most recently active players on each shard,
+  which compiles the hot statements and pulls their rows into the
+  database cache before they reconnect;
+- fills the leaderboard cache.
+
+It is best effort: a failure or WARMUP_TIMEOUT is logged and the worker
+reports ready anyway.
+
+This module must stay cheap to import; app.main imports it first.
+"""
+
+import asyncio
+import logging
+import os
+import time
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _process_start() -> float:
+    """When this process started (time.time() clock), or now if unknown."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Fields after the parenthesised command; starttime is field 22
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - uptime + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return time.time()
+
+
+class Startup:
+    """Phase marks for one worker; ready once warm-up is done."""
+
+    def __init__(self):
+        self.started = _process_start()
+        self.phases: list[tuple[str, float]] = []
+        self.ready = False
+        self.draining = False
+        self._task: asyncio.Task | None = None
+
+    def mark(self, phase: str):
+        """Record the end of a phase."""
+        self.phases.append((phase, time.time()))
+
+    @property
+    def phase(self) -> str:
+        """The last phase completed."""
+        return self.phases[-1][0] if self.phases else "starting"
+
+    @property
+    def ready_in(self) -> float | None:
+        """Seconds from process start to ready."""
+        return self.phases[-1][1] - self.started if self.ready else None
+
+    def durations(self) -> dict[str, float]:
+        """Seconds spent in each phase, in order."""
+        durations, previous = {}, self.started
+        for phase, at in self.phases:
+            durations[phase] = at - previous
+            previous = at
+        return durations
+
+    def report(self) -> str:
+        phases = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in self.durations().items())
+        return f"Ready in {self.ready_in:.2f}s (pid {os.getpid()}: {phases})"
+
+    def set_ready(self):
+        self.ready = True
+        print(self.report(), flush=True)
+
+    def begin_drain(self):
+        """Report not-ready from now on."""
+        self.draining = True
+        self.ready = False
+
+    def begin_warm_up(self):
+        """Warm up in the background, then report ready."""
+        self._task = asyncio.create_task(self._warm_up())
+
+    async def _warm_up(self):
+        try:
+            await asyncio.wait_for(warm_up(), settings.WARMUP_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("Warm-up did not finish within %ss", settings.WARMUP_TIMEOUT)
+        except Exception:
+            logger.exception("Warm-up failed")
+        self.mark("warm-up")
+        if not self.draining:
+            self.set_ready()
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+startup = Startup()
+
+
+async def _warm_shard(shard: int):
+    from sqlalchemy import select, text
+    from app.game.data.skills import get_skill
+    from app.game.skills.action import ActionSkill
+    from app.models import Skill
+    from app.sharding import shards
+
+    engine = shards.engines[shard]
+
+    async def connect():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    # Concurrently, so each one checks out (and opens) its own connection
+    await asyncio.gather(*(connect() for _ in range(settings.DB_POOL_SIZE)))
+
+    async with shards.sessionmakers[shard]() as db:
+        active = await db.execute(
+            select(Skill.user_id, Skill.skill_type)
+            .where(Skill.current_action.isnot(None))
+            .order_by(Skill.action_started.desc())
+            .limit(settings.WARMUP_PLAYERS)
+        )
+        for user_id, skill_type in active.all():
+            if get_skill(skill_type) is not None:
+                await ActionSkill(db, skill_type=skill_type).get_status(user_id)
+
+
+async def warm_up():
+    """Open pools, preload active players and the leaderboard."""
+    from app.game.leaderboard import top_miners
+    from app.sharding import shards
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_warm_shard(shard) for shard in range(len(shards.engines))))
+    await top_miners()
+    logger.info("Warm-up done in %.2fs", time.perf_counter() - started)
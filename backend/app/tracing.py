@@ -0,0 +1,433 @@
+"""
+Lightweight request tracing.
+
+Spans are opened around websocket actions, /game and /auth requests, the
+mining tick, every MiningSkill method, and each database statement, flush
+and commit. Finished spans are exported in batches as OTLP/JSON: appended
+one ExportTraceServiceRequest per line to TRACE_EXPORT_PATH (readable by
+the OpenTelemetry collector's otlpjsonfile receiver) and/or POSTed to an
+OTLP/HTTP endpoint (TRACE_OTLP_ENDPOINT, e.g. http://collector:4318/v1/traces).
+
+Sampling is decided once per trace, at the root: TRACE_SAMPLE_RATE of
+roots are recorded. An incoming W3C `traceparent` (HTTP header, websocket
+handshake header or a "traceparent" field on a websocket message) only
+supplies the trace and parent ids, so a recorded root joins the caller's
+trace. Its sampled flag is ignored: every one of these sources is a
+client, and honouring the flag would let any client force recording.
+
+In an unsampled trace no span objects exist: every span() and @traced
+call is one ContextVar lookup, so the cost of tracing in production is
+roughly TRACE_SAMPLE_RATE times the cost of recording everything. With
+the rate at 0 or no sink configured, tracing is off.
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+traces_sampled = registry.counter("traces_sampled_total", "Root spans recorded")
+spans_exported = registry.counter("spans_exported_total", "Spans written to the trace sinks")
+spans_dropped = registry.counter(
+    "spans_dropped_total",
+    "Spans lost to a full export buffer or a failed export",
+)
+
+MAX_STATEMENT_LENGTH = 1000
+
+
+class SpanKind(IntEnum):
+    """OTLP span kinds."""
+    INTERNAL = 1
+    SERVER = 2
+    CLIENT = 3
+
+
+@dataclass(slots=True)
+class Span:
+    name: str
+    trace_id: str  # 32 hex digits
+    span_id: str  # 16 hex digits
+    parent_id: str | None
+    kind: SpanKind = SpanKind.INTERNAL
+    attributes: dict = field(default_factory=dict)
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int = 0
+    error: str | None = None
+    _started: int = field(default_factory=time.perf_counter_ns)
+
+    def child(self, name: str, kind: SpanKind = SpanKind.INTERNAL, **attributes) -> "Span":
+        return Span(name, self.trace_id, _new_span_id(), self.span_id, kind, attributes)
+
+    def set(self, key: str, value):
+        self.attributes[key] = value
+
+    def finish(self):
+        self.end_ns = self.start_ns + time.perf_counter_ns() - self._started
+        exporter.add(self)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def to_otlp(self) -> dict:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": int(self.kind),
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def _new_trace_id() -> str:
+    return f"{random.getrandbits(128) or 1:032x}"
+
+
+def _new_span_id() -> str:
+    return f"{random.getrandbits(64) or 1:016x}"
+
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Span | None:
+    """The recording span of this context (None when not sampled)."""
+    return _current_span.get()
+
+
+def enabled() -> bool:
+    return settings.TRACE_SAMPLE_RATE > 0 and bool(
+        settings.TRACE_EXPORT_PATH or settings.TRACE_OTLP_ENDPOINT
+    )
+
+
+def parse_traceparent(value: str | None) -> tuple[str, str, bool] | None:
+    """(trace_id, parent span_id, sampled) from a W3C traceparent, if valid."""
+    if not value:
+        return None
+    parts = value.strip().lower().split("-")
+    if len(parts) < 4 or parts[0] == "ff" or len(parts[0]) != 2:
+        return None
+    version, trace_id, span_id, flags = parts[:4]
+    if (version == "00" and len(parts) != 4) or len(trace_id) != 32 or len(span_id) != 16 or len(flags) != 2:
+        return None
+    try:
+        sampled = int(flags, 16) & 1 == 1
+        if int(trace_id, 16) == 0 or int(span_id, 16) == 0:
+            return None
+    except ValueError:
+        return None
+    return trace_id, span_id, sampled
+
+
+@contextmanager
+def _activate(span: Span) -> Iterator[Span]:
+    token = _current_span.set(span)
+    try:
+        yield span
+    except Exception as exc:
+        span.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        _current_span.reset(token)
+        span.finish()
+
+
+@contextmanager
+def start_trace(
+    name: str,
+    traceparent: str | None = None,
+    kind: SpanKind = SpanKind.SERVER,
+    **attributes,
+) -> Iterator[Span | None]:
+    """
+    Root span for one unit of work (a request, an action, a tick).
+
+    Yields None when the trace is not sampled; nested spans are then
+    no-ops. Inside an already recording span this is an ordinary child.
+    """
+    parent = _current_span.get()
+    if parent is not None:
+        with _activate(parent.child(name, kind, **attributes)) as span:
+            yield span
+        return
+    if not enabled():
+        yield None
+        return
+
+    if random.random() >= settings.TRACE_SAMPLE_RATE:
+        yield None
+        return
+    # Client supplied: correlation ids only, never the sampling decision
+    upstream = parse_traceparent(traceparent)
+    trace_id, parent_id = upstream[:2] if upstream is not None else (None, None)
+
+    traces_sampled.inc()
+    root = Span(name, trace_id or _new_trace_id(), _new_span_id(), parent_id, kind, attributes)
+    with _activate(root) as span:
+        yield span
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span | None]:
+    """Child of the current span; a no-op (yielding None) outside a sampled trace."""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    with _activate(parent.child(name, **attributes)) as child:
+        yield child
+
+
+def traced(method):
+    """Run an async method inside a span named `Class.method`."""
+    name = method.__qualname__
+
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        parent = _current_span.get()
+        if parent is None:
+            return await method(*args, **kwargs)
+        with _activate(parent.child(name)):
+            return await method(*args, **kwargs)
+    return wrapper
+
+
+# -- Database spans -----------------------------------------------------------
+#
+# Statements on any engine, and session flushes and commits, become child
+# spans of the current span. SQLAlchemy runs these hooks synchronously
+# inside the awaiting task's context, so the ContextVar is visible; they
+# record timing only and never change the current span.
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement_span(conn, cursor, statement, parameters, context, executemany):
+    parent = _current_span.get()
+    if parent is not None:
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+        conn.info["trace_span"] = parent.child(
+            operation,
+            SpanKind.CLIENT,
+            **{
+                "db.system": conn.dialect.name,
+                "db.statement": statement[:MAX_STATEMENT_LENGTH],
+                "db.executemany": executemany,
+            },
+        )
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _end_statement_span(conn, cursor, statement, parameters, context, executemany):
+    statement_span = conn.info.pop("trace_span", None)
+    if statement_span is not None:
+        statement_span.finish()
+
+
+@event.listens_for(Engine, "handle_error")
+def _fail_statement_span(context):
+    statement_span = context.connection.info.pop("trace_span", None) if context.connection else None
+    if statement_span is not None:
+        statement_span.error = repr(context.original_exception)
+        statement_span.finish()
+
+
+def _session_span_hooks(name: str, start_event: str, end_event: str):
+    key = f"trace_{name}"
+
+    @event.listens_for(Session, start_event)
+    def _start(session, *args):
+        parent = _current_span.get()
+        if parent is not None:
+            session.info[key] = parent.child(name)
+
+    @event.listens_for(Session, end_event)
+    def _end(session, *args):
+        session_span = session.info.pop(key, None)
+        if session_span is not None:
+            session_span.finish()
+
+
+_session_span_hooks("db.flush", "before_flush", "after_flush_postexec")
+_session_span_hooks("db.commit", "before_commit", "after_commit")
+
+
+async def acquire_connection(db) -> None:
+    """
+    Check out the session's connection up front, inside a db.connect span,
+    when tracing (otherwise the first statement does it, untimed).
+    """
+    if _current_span.get() is not None:
+        with span("db.connect"):
+            await db.connection()
+
+
+# -- Export -------------------------------------------------------------------
+
+def otlp_payload(spans: list[Span]) -> dict:
+    """An OTLP ExportTraceServiceRequest in its JSON encoding."""
+    return {
+        "resourceSpans": [{
+            "resource": {
+                "attributes": [_otlp_attribute("service.name", settings.TRACE_SERVICE_NAME)],
+            },
+            "scopeSpans": [{
+                "scope": {"name": __name__},
+                "spans": [s.to_otlp() for s in spans],
+            }],
+        }],
+    }
+
+
+class SpanExporter:
+    """Buffers finished spans and writes them to the sinks periodically."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.buffer: list[Span] = []
+        self._task: asyncio.Task | None = None
+
+    def add(self, finished: Span):
+        if len(self.buffer) >= settings.TRACE_BUFFER_SIZE:
+            spans_dropped.inc()
+            return
+        self.buffer.append(finished)
+
+    def drain(self) -> list[Span]:
+        spans, self.buffer = self.buffer, []
+        return spans
+
+    @staticmethod
+    def _write(spans: list[Span]):
+        body = json.dumps(otlp_payload(spans), separators=(",", ":"))
+        if settings.TRACE_EXPORT_PATH:
+            with open(settings.TRACE_EXPORT_PATH, "a", encoding="utf-8") as sink:
+                sink.write(body + "\n")
+        if settings.TRACE_OTLP_ENDPOINT:
+            # Imported here: only processes exporting over HTTP need it
+            import urllib.request
+            request = urllib.request.Request(
+                settings.TRACE_OTLP_ENDPOINT,
+                data=body.encode(),
+                headers={"Content-Type": "application/json"},
+                method="POST",
+            )
+            with urllib.request.urlopen(request, timeout=10):
+                pass
+
+    async def flush(self) -> int:
+        """Export buffered spans (serialized off the loop). Returns the count."""
+        spans = self.drain()
+        if not spans:
+            return 0
+        try:
+            await asyncio.to_thread(self._write, spans)
+        except Exception:
+            spans_dropped.inc(len(spans))
+            logger.exception("Exporting %d spans failed", len(spans))
+            return 0
+        spans_exported.inc(len(spans))
+        return len(spans)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def start(self):
+        """Start periodic export (idempotent; a no-op while tracing is off)."""
+        if not enabled():
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop periodic export and export what is left."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+# Global exporter, started from the app lifespan
+exporter = SpanExporter(settings.TRACE_EXPORT_INTERVAL)
+
+
+class TracingMiddleware:
+    """
+    Root span per HTTP request under the given path prefixes. Sampled
+    responses carry the trace ID as X-Trace-Id.
+    """
+
+    def __init__(self, app, prefixes: tuple[str, ...] = ("/game", "/auth")):
+        self.app = app
+        self.prefixes = prefixes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not enabled() or not scope["path"].startswith(self.prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = next(
+            (value.decode("latin-1") for key, value in scope["headers"] if key == b"traceparent"),
+            None,
+        )
+        with start_trace(
+            f"{scope['method']} {scope['path']}",
+            traceparent,
+            **{"http.request.method": scope["method"], "url.path": scope["path"]},
+        ) as root:
+            if root is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_with_trace(message):
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    root.set("http.response.status_code", status)
+                    if status >= 500:
+                        root.error = f"HTTP {status}"
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-trace-id", root.trace_id.encode()),
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace)
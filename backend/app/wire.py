@@ -0,0 +1,128 @@
+"""
+Websocket frame encodings.
+
+Clients choose an encoding through the websocket subprotocol:
+
+    idle.json   every frame is a JSON text frame (also what clients that
+                offer no subprotocol get)
+    idle.bin.1  the frequent, fixed-shape frames (mining_tick,
+                action_tick, ore_mined, action_completed) are binary;
+                every other frame stays JSON text
+
+A binary frame is a fixed schema keyed by its first byte, big-endian:
+
+    u8   tag        which Schema (below)
+    u16  item_id    the action's stable item id: names the skill, the
+                    action and its display name through the item table
+    ...             the schema's numeric fields, in order
+    u16 + utf-8     the message text, for schemas that carry one
+
+Progress is sent as a float32. The item table, [item_id, skill_type,
+action_id, name] for every action, is sent once per connection in the
+"session" frame, so field names, ids and display names never repeat in
+the hot frames. A message that does not fit its schema (a missing field,
+a value out of range) is sent as JSON instead.
+
+Compression (permessage-deflate) is negotiated separately, by the
+websocket extension offer that browsers always make; see
+WS_PER_MESSAGE_DEFLATE.
+"""
+
+import functools
+import struct
+from dataclasses import dataclass, field
+
+from app.config import settings
+from app.game.data.skills import all_actions, get_action
+
+JSON_PROTOCOL = "idle.json"
+BINARY_PROTOCOL = "idle.bin.1"
+
+_LENGTH = struct.Struct(">H")
+
+
+@dataclass(frozen=True, slots=True)
+class Schema:
+    tag: int
+    type: str
+    layout: str  # struct codes of `fields`
+    fields: tuple[str, ...]
+    id_field: str  # "ore_id" / "action_id"
+    name_field: str  # "ore_name" / "action_name"
+    has_skill: bool  # carries "skill" (otherwise it is mining)
+    has_message: bool
+    # Tag, item id and the numeric fields
+    packer: struct.Struct = field(init=False, repr=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "packer", struct.Struct(">BH" + self.layout))
+
+
+_XP_FIELDS = ("xp_gained", "total_xp", "level", "xp_in_level", "xp_needed")
+
+SCHEMAS = {
+    schema.type: schema
+    for schema in (
+        Schema(1, "mining_tick", "f", ("progress",), "ore_id", "ore_name", False, False),
+        Schema(2, "action_tick", "f", ("progress",), "action_id", "action_name", True, False),
+        Schema(3, "ore_mined", "IIIHII", ("ore_quantity", *_XP_FIELDS), "ore_id", "ore_name", False, True),
+        Schema(
+            4, "action_completed", "HIIIHII", ("amount", "quantity", *_XP_FIELDS),
+            "action_id", "action_name", True, True,
+        ),
+    )
+}
+SCHEMAS_BY_TAG = {schema.tag: schema for schema in SCHEMAS.values()}
+
+
+def negotiate(offered: list[str]) -> str | None:
+    """The subprotocol to accept from a client's offer, in its preference order."""
+    supported = (BINARY_PROTOCOL, JSON_PROTOCOL) if settings.WS_BINARY_ENABLED else (JSON_PROTOCOL,)
+    return next((protocol for protocol in offered if protocol in supported), None)
+
+
+@functools.cache
+def item_table() -> list[list]:
+    """[item_id, skill_type, action_id, name] for every action."""
+    return [[action.item_id, action.skill_type, action.id, action.name] for action in all_actions()]
+
+
+def encode(message: dict) -> bytes | None:
+    """The binary frame for `message`, or None to send it as JSON."""
+    schema = SCHEMAS.get(message.get("type"))
+    if schema is None:
+        return None
+    action = get_action(message.get("skill") if schema.has_skill else "mining", message.get(schema.id_field))
+    if action is None:
+        return None
+    try:
+        frame = schema.packer.pack(schema.tag, action.item_id, *(message[name] for name in schema.fields))
+        if schema.has_message:
+            text = message["message"].encode()
+            frame += _LENGTH.pack(len(text)) + text
+    except (KeyError, TypeError, AttributeError, struct.error):
+        return None
+    return frame
+
+
+def decode(frame: bytes, items: dict[int, list]) -> dict:
+    """
+    Rebuild the message of a binary frame, given the item table keyed by
+    item_id. The reference for client decoders (frontend/src/wire.ts).
+    """
+    schema = SCHEMAS_BY_TAG[frame[0]]
+    _, item_id, *values = schema.packer.unpack_from(frame)
+    _, skill_type, action_id, name = items[item_id]
+    message = {"type": schema.type}
+    if schema.has_skill:
+        message["skill"] = skill_type
+    message[schema.id_field] = action_id
+    message[schema.name_field] = name
+    message.update(zip(schema.fields, values))
+    if "progress" in message:
+        message["progress"] = round(message["progress"], 4)
+    if schema.has_message:
+        (length,) = _LENGTH.unpack_from(frame, schema.packer.size)
+        start = schema.packer.size + _LENGTH.size
+        message["message"] = frame[start:start + length].decode()
+    return message
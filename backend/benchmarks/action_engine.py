@@ -0,0 +1,178 @@
+"""
+Live action engine: one batched scheduler pass against per-player ticks.
+
+Registers a benchmark-only second skill next to mining, seeds --players
+players with both skills active (timers staggered), then drives
+--passes passes of TICK_RATE virtual seconds two ways against the
+configured DATABASE_URL:
+
+    scheduler   ActionScheduler.tick(): progress from memory, one
+                settle() per shard for the due actions
+    per-player  what one task per live action did: a session and an
+                ActionSkill.process_tick per action, every pass
+
+Reports wall time and statements per pass, completions and the number
+of asyncio tasks alive during the run (the scheduler adds none per
+player or per skill).
+
+Usage (from backend/):
+    DATABASE_URL=sqlite+aiosqlite:////tmp/engine.db python -m benchmarks.action_engine --players 500
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import timedelta
+
+from app.game.data.skills import Action, SkillDef, register_skill
+
+# Benchmark-only content; registered before the settlement statements are built
+BENCH_SKILL = "woodcutting"
+register_skill(SkillDef(
+    skill_type=BENCH_SKILL,
+    name="Woodcutting",
+    verb="chop",
+    verb_ing="chopping",
+    actions={
+        tree_id: Action(
+            skill_type=BENCH_SKILL, id=tree_id, name=f"{tree_id.title()} Logs", level_required=1,
+            xp=xp, duration=duration, item_type=f"{tree_id}_logs", item_id=item_id,
+        )
+        for tree_id, xp, duration, item_id in (("oak", 15, 2.5, 6), ("willow", 30, 4.0, 7))
+    },
+))
+
+from sqlalchemy import delete, insert  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.database import init_db, track_queries  # noqa: E402
+from app.game.clock import VirtualClock  # noqa: E402
+from app.game.scheduler import ActionScheduler, LiveAction  # noqa: E402
+from app.game.skills.action import ActionResult, ActionSkill  # noqa: E402
+from app.models import InventoryItem, Skill, User  # noqa: E402
+from app.sharding import shards  # noqa: E402
+
+BASE_ID = 9_400_000_000_000
+ACTIONS = {"mining": "copper", BENCH_SKILL: "oak"}
+
+
+class CountingListener:
+    def __init__(self):
+        self.progress = 0
+        self.completed = 0
+        self.failed = 0
+
+    async def action_progress(self, live: LiveAction, progress: float):
+        self.progress += 1
+
+    async def action_completed(self, live: LiveAction, result: ActionResult):
+        self.completed += 1
+
+    async def action_failed(self, live: LiveAction, error: Exception):
+        self.failed += 1
+
+
+async def seed(players: int, clock: VirtualClock, rng: random.Random) -> list[tuple[int, str, str, object]]:
+    """Players with every ACTIONS skill active. Returns (user, skill, action, started)."""
+    live = []
+    rows = []
+    for index in range(players):
+        user_id = BASE_ID + index
+        for skill_type, action_id in ACTIONS.items():
+            started = clock() - timedelta(seconds=rng.uniform(0, 2.0))
+            live.append((user_id, skill_type, action_id, started))
+            rows.append({
+                "user_id": user_id, "skill_type": skill_type, "xp": 0, "level": 1, "version": 0,
+                "event_watermark": 0, "current_action": action_id, "action_started": started,
+            })
+    for shard, engine in enumerate(shards.engines):
+        owned = [row for row in rows if shards.shard_for(row["user_id"]) == shard]
+        async with engine.begin() as conn:
+            await cleanup(conn)
+            if owned:
+                await conn.execute(insert(User), [{"telegram_id": uid} for uid in {row["user_id"] for row in owned}])
+                await conn.execute(insert(Skill), owned)
+    return live
+
+
+async def cleanup(conn):
+    for model, column in ((InventoryItem, InventoryItem.user_id), (Skill, Skill.user_id), (User, User.telegram_id)):
+        await conn.execute(delete(model).where(column >= BASE_ID))
+
+
+async def run_scheduler(live, passes: int, clock: VirtualClock) -> dict:
+    listener = CountingListener()
+    scheduler = ActionScheduler(listener, clock=clock)
+    for user_id, skill_type, action_id, started in live:
+        scheduler.track(user_id, skill_type, action_id, started, generation=1)
+
+    statements = 0
+    tasks = 0
+    started = time.perf_counter()
+    for _ in range(passes):
+        clock.advance(settings.TICK_RATE)
+        with track_queries("bench pass") as stats:
+            await scheduler.tick()
+        statements += stats.statements
+        tasks = max(tasks, len(asyncio.all_tasks()))
+    wall = time.perf_counter() - started
+    return {"wall": wall, "statements": statements, "completed": listener.completed, "tasks": tasks}
+
+
+async def run_per_player(live, passes: int, clock: VirtualClock) -> dict:
+    completed = 0
+    statements = 0
+    tasks = 0
+
+    async def tick(user_id: int, skill_type: str) -> bool:
+        async with shards.session(user_id) as db:
+            result = await ActionSkill(db, clock=clock, skill_type=skill_type).process_tick(user_id)
+            await db.commit()
+        return result is not None and result.completed
+
+    started = time.perf_counter()
+    for _ in range(passes):
+        clock.advance(settings.TICK_RATE)
+        with track_queries("bench pass") as stats:
+            pending = [asyncio.create_task(tick(user_id, skill_type)) for user_id, skill_type, _, _ in live]
+            tasks = max(tasks, len(asyncio.all_tasks()))
+            completed += sum(await asyncio.gather(*pending))
+        statements += stats.statements
+    wall = time.perf_counter() - started
+    return {"wall": wall, "statements": statements, "completed": completed, "tasks": tasks}
+
+
+async def main(args):
+    await init_db()
+    rows = []
+    try:
+        for mode, runner in (("scheduler", run_scheduler), ("per-player", run_per_player)):
+            clock = VirtualClock()
+            live = await seed(args.players, clock, random.Random(args.seed))
+            rows.append((mode, await runner(live, args.passes, clock)))
+    finally:
+        for engine in shards.engines:
+            async with engine.begin() as conn:
+                await cleanup(conn)
+        await shards.dispose()
+
+    actions = args.players * len(ACTIONS)
+    print(f"{args.players} players x {len(ACTIONS)} skills = {actions} live actions, "
+          f"{args.passes} passes of {settings.TICK_RATE}s ({shards.engines[0].dialect.name})")
+    print(f"{'mode':<11} {'ms/pass':>9} {'stmts/pass':>11} {'completions':>12} {'tasks':>6}")
+    for mode, result in rows:
+        print(f"{mode:<11} {result['wall'] * 1000 / args.passes:>9.2f} "
+              f"{result['statements'] / args.passes:>11.1f} {result['completed']:>12} {result['tasks']:>6}")
+    scheduler, per_player = rows[0][1], rows[1][1]
+    if scheduler["wall"]:
+        print(f"scheduler vs per-player: {per_player['wall'] / scheduler['wall']:.1f}x faster, "
+              f"{per_player['statements'] / max(scheduler['statements'], 1):.0f}x fewer statements")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--players", type=int, default=500)
+    parser.add_argument("--passes", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,186 @@
+"""
+Webhook-mode bot throughput against a fake Telegram.
+
+Runs a stand-in Bot API server (aiohttp) that answers setWebhook,
+sendMessage, answerCallbackQuery etc. and records when each reply
+arrives. It then starts the API with BOT_MODE=webhook pointed at it
+(BOT_API_URL) and POSTs synthetic updates to the webhook the way
+Telegram does: up to --concurrency at a time, with the secret header.
+Half the updates are /start messages and half leaderboard button
+presses, which read the shared leaderboard cache.
+
+Reported:
+- webhook acks/s and ack latency (what Telegram sees);
+- handled updates/s and update-to-reply latency (what players see).
+
+Usage (from backend/):
+    python -m benchmarks.bot_webhook --updates 2000 --concurrency 40
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from aiohttp import ClientSession, web
+
+from benchmarks.server_throughput import free_port, start_server, stop_server
+
+SECRET = "bench-secret"
+CHAT_BASE = 1_000_000
+
+
+class FakeTelegram:
+    """Minimal Bot API: every call succeeds; replies are timestamped."""
+
+    def __init__(self):
+        self.calls: dict[str, int] = {}
+        self.replies: dict[int, float] = {}  # chat_id -> arrival time
+        self.webhook: dict = {}
+        self.all_replied = asyncio.Event()
+        self.expected = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = dict(await request.post())
+        self.calls[method] = self.calls.get(method, 0) + 1
+
+        if method == "sendMessage":
+            chat_id = int(params["chat_id"])
+            self.replies.setdefault(chat_id, time.perf_counter())
+            if len(self.replies) >= self.expected:
+                self.all_replied.set()
+            result = {
+                "message_id": len(self.replies),
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": params.get("text", ""),
+            }
+        elif method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        else:
+            if method == "setWebhook":
+                self.webhook = params
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    async def start(self, port: int) -> web.AppRunner:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", port).start()
+        return runner
+
+
+def make_update(update_id: int) -> dict:
+    chat = {"id": CHAT_BASE + update_id, "type": "private"}
+    user = {"id": CHAT_BASE + update_id, "is_bot": False, "first_name": f"Load{update_id}"}
+    if update_id % 2:
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": user,
+                "chat_instance": "bench",
+                "data": "leaderboard",
+                "message": {"message_id": 1, "date": int(time.time()), "chat": chat, "text": "menu"},
+            },
+        }
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": chat,
+            "from": user,
+            "text": "/start",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+        },
+    }
+
+
+async def drive(api_port: int, fake: FakeTelegram, updates: int, concurrency: int) -> dict:
+    url = f"http://127.0.0.1:{api_port}/telegram/webhook"
+    sent: dict[int, float] = {}
+    ack_latencies: list[float] = []
+    queue = iter(range(1, updates + 1))
+    fake.expected = updates
+
+    async def sender(session: ClientSession):
+        for update_id in queue:
+            started = time.perf_counter()
+            sent[CHAT_BASE + update_id] = started
+            async with session.post(
+                url,
+                json=make_update(update_id),
+                headers={"X-Telegram-Bot-Api-Secret-Token": SECRET},
+            ) as response:
+                await response.read()
+                if response.status != 200:
+                    raise RuntimeError(f"webhook answered {response.status}")
+            ack_latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    async with ClientSession() as session:
+        await asyncio.gather(*(sender(session) for _ in range(concurrency)))
+    acked = time.perf_counter()
+    try:
+        await asyncio.wait_for(fake.all_replied.wait(), timeout=60)
+    except asyncio.TimeoutError:
+        pass
+    finished = max(fake.replies.values(), default=acked)
+
+    reply_latencies = sorted(fake.replies[chat] - sent[chat] for chat in fake.replies if chat in sent)
+    ack_latencies.sort()
+    return {
+        "acks_per_s": updates / (acked - started),
+        "ack_p50_ms": statistics.median(ack_latencies) * 1000,
+        "ack_p99_ms": ack_latencies[int(len(ack_latencies) * 0.99)] * 1000,
+        "handled": len(reply_latencies),
+        "handled_per_s": len(reply_latencies) / (finished - started),
+        "reply_p50_ms": statistics.median(reply_latencies) * 1000 if reply_latencies else 0.0,
+        "reply_p99_ms": reply_latencies[int(len(reply_latencies) * 0.99)] * 1000 if reply_latencies else 0.0,
+    }
+
+
+async def main(args) -> int:
+    fake = FakeTelegram()
+    fake_port, api_port = free_port(), free_port()
+    runner = await fake.start(fake_port)
+    os.environ.update(
+        BOT_MODE="webhook",
+        BOT_API_URL=f"http://127.0.0.1:{fake_port}",
+        BOT_WEBHOOK_SECRET=SECRET,
+        API_URL=f"http://127.0.0.1:{api_port}",
+    )
+    try:
+        with tempfile.TemporaryDirectory() as scratch:
+            process = await asyncio.to_thread(
+                start_server, "prod", api_port, args.workers, f"sqlite+aiosqlite:///{scratch}/bot.db"
+            )
+            try:
+                result = await drive(api_port, fake, args.updates, args.concurrency)
+            finally:
+                await asyncio.to_thread(stop_server, process)
+    finally:
+        await runner.cleanup()
+
+    webhook_ok = fake.webhook.get("url", "").endswith("/telegram/webhook") and fake.webhook.get("secret_token") == SECRET
+    print(f"setWebhook registered: {'yes' if webhook_ok else 'NO'}")
+    print(f"Bot API calls: {dict(sorted(fake.calls.items()))}")
+    print(f"webhook acks   {result['acks_per_s']:>9,.0f}/s  p50 {result['ack_p50_ms']:.2f} ms  "
+          f"p99 {result['ack_p99_ms']:.2f} ms")
+    print(f"handled        {result['handled_per_s']:>9,.0f}/s  p50 {result['reply_p50_ms']:.2f} ms  "
+          f"p99 {result['reply_p99_ms']:.2f} ms  ({result['handled']}/{args.updates} replied)")
+    return 0 if webhook_ok and result["handled"] == args.updates else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=40, help="Telegram's max_connections")
+    parser.add_argument("--workers", type=int, default=1, help="API worker processes")
+    raise SystemExit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,132 @@
+"""
+Optimistic concurrency stress test.
+
+Runs several concurrent mining-tick writers per player, each with its own
+session (like duplicate sockets, REST calls and the sweeper racing each
+other), against the configured DATABASE_URL. Every committed award is
+tallied; at the end each player's skill XP and ore count must equal the
+tally. A lost update would show up as XP below the tally, a double award
+as XP above it.
+
+Usage (from backend/):
+    python -m benchmarks.concurrency --users 50 --writers 4 --seconds 10
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.database import async_session, engine, init_db
+from app.game.data.ores import get_ore
+from app.game.skills.mining import MiningSkill
+from app.metrics import conflict_rate, skill_write_conflicts, skill_writes
+from app.models import InventoryItem, Skill, User
+
+BASE_ID = 9_300_000_000_000
+ORE_ID = "copper"
+
+
+async def seed(users: int):
+    started = datetime.now(timezone.utc) - timedelta(seconds=get_ore(ORE_ID).mining_time)
+    async with engine.begin() as conn:
+        await cleanup_rows(conn)
+        await conn.execute(insert(User), [
+            {"telegram_id": BASE_ID + i} for i in range(users)
+        ])
+        await conn.execute(insert(Skill), [
+            {
+                "user_id": BASE_ID + i,
+                "skill_type": MiningSkill.SKILL_TYPE,
+                "xp": 0,
+                "level": 1,
+                "version": 0,
+                "event_watermark": 0,
+                "current_action": ORE_ID,
+                "action_started": started,
+            }
+            for i in range(users)
+        ])
+
+
+async def cleanup_rows(conn):
+    for model, column in ((InventoryItem, InventoryItem.user_id), (Skill, Skill.user_id), (User, User.telegram_id)):
+        await conn.execute(delete(model).where(column >= BASE_ID))
+
+
+async def writer(user_id: int, deadline: float, awarded: Counter, failures: Counter):
+    rng = random.Random(user_id)
+    while time.perf_counter() < deadline:
+        try:
+            async with async_session() as db:
+                result = await MiningSkill(db).process_mining_tick(user_id)
+                await db.commit()
+            if result is not None and result.completed:
+                awarded[user_id] += result.xp_gained
+        except StaleDataError:
+            failures["retries exhausted"] += 1
+        except Exception as exc:
+            failures[type(exc).__name__] += 1
+        await asyncio.sleep(rng.uniform(0, 0.02))
+
+
+async def main(users: int, writers: int, seconds: float):
+    await init_db()
+    await seed(users)
+
+    awarded: Counter = Counter()
+    failures: Counter = Counter()
+    deadline = time.perf_counter() + seconds
+    try:
+        await asyncio.gather(*(
+            writer(BASE_ID + i, deadline, awarded, failures)
+            for i in range(users)
+            for _ in range(writers)
+        ))
+
+        ore = get_ore(ORE_ID)
+        async with async_session() as db:
+            skills = {
+                skill.user_id: skill.xp
+                for skill in (await db.execute(select(Skill).where(Skill.user_id >= BASE_ID))).scalars()
+            }
+            ores = {
+                item.user_id: item.quantity
+                for item in (await db.execute(
+                    select(InventoryItem).where(InventoryItem.user_id >= BASE_ID)
+                )).scalars()
+            }
+
+        lost = sum(max(awarded[uid] - xp, 0) for uid, xp in skills.items())
+        extra = sum(max(xp - awarded[uid], 0) for uid, xp in skills.items())
+        ore_mismatch = sum(1 for uid, xp in skills.items() if ores.get(uid, 0) * ore.xp != xp)
+
+        print(f"{users} players x {writers} concurrent writers for {seconds:.0f}s")
+        print(f"writes committed:   {skill_writes.value:,}")
+        print(f"version conflicts:  {skill_write_conflicts.value:,} ({conflict_rate():.1%} of attempts)")
+        print(f"XP awarded:         {sum(awarded.values()):,}")
+        print(f"XP stored:          {sum(skills.values()):,}")
+        print(f"lost XP:            {lost:,}")
+        print(f"double-awarded XP:  {extra:,}")
+        print(f"ore/XP mismatches:  {ore_mismatch}")
+        if failures:
+            print(f"failed ticks:       {dict(failures)}")
+        print("OK" if lost == extra == ore_mismatch == 0 else "FAILED")
+    finally:
+        async with engine.begin() as conn:
+            await cleanup_rows(conn)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--writers", type=int, default=4, help="concurrent writers per player")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.writers, args.seconds))
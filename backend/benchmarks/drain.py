@@ -0,0 +1,102 @@
+"""
+Graceful drain of the production launcher under live websocket clients.
+
+Seeds --clients players with an action running, starts python -m
+app.server on a scratch SQLite database, connects one websocket per
+player (each resumes its live action) and sends SIGTERM. Reports:
+
+    drain      SIGTERM -> last server_draining frame received
+    exit       SIGTERM -> launcher exited
+    closes     close codes seen by the clients (1012 = drained)
+    reconnect  spread of the reconnect_in hints, and the busiest second
+               of reconnects they produce, against every client
+               reconnecting together after a plain disconnect
+
+Usage (from backend/):
+    python -m benchmarks.drain --clients 200 --workers 1
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import statistics
+import tempfile
+import time
+from collections import Counter
+
+import websockets
+
+from benchmarks.server_throughput import free_port, start_server
+from benchmarks.startup import seed
+
+
+async def client(port: int, user_id: int, connected: asyncio.Event, total: int, state: dict) -> dict:
+    result = {"hint": None, "frame_at": None, "close": None}
+    async with websockets.connect(f"ws://127.0.0.1:{port}/ws/{user_id}", max_queue=None) as ws:
+        state["connected"] += 1
+        if state["connected"] == total:
+            connected.set()
+        try:
+            async for raw in ws:
+                message = json.loads(raw)
+                if message.get("type") == "server_draining":
+                    result["hint"] = message["reconnect_in"]
+                    result["frame_at"] = time.perf_counter()
+        except websockets.ConnectionClosed:
+            pass
+        result["close"] = ws.close_code
+    return result
+
+
+async def run(args, port: int, process) -> tuple[list[dict], float]:
+    connected = asyncio.Event()
+    state = {"connected": 0}
+    tasks = [
+        asyncio.create_task(client(port, 1 + i, connected, args.clients, state))
+        for i in range(args.clients)
+    ]
+    await asyncio.wait_for(connected.wait(), 60)
+    await asyncio.sleep(args.settle)  # let live actions tick
+
+    signalled = time.perf_counter()
+    os.killpg(process.pid, signal.SIGTERM)
+    results = await asyncio.gather(*tasks)
+    await asyncio.get_running_loop().run_in_executor(None, process.wait, 60)
+    exited = time.perf_counter() - signalled
+    for result in results:
+        if result["frame_at"] is not None:
+            result["frame_at"] -= signalled
+    return results, exited
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite+aiosqlite:///{tmp}/drain.db"
+        seed(database_url, args.clients)
+        port = free_port()
+        process = start_server("prod", port, args.workers, database_url)
+        results, exited = asyncio.run(run(args, port, process))
+
+    hints = sorted(r["hint"] for r in results if r["hint"] is not None)
+    frames = [r["frame_at"] for r in results if r["frame_at"] is not None]
+    closes = Counter(r["close"] for r in results)
+    print(f"{args.clients} clients, {args.workers} worker(s)")
+    print(f"drain      {max(frames):.2f}s to the last server_draining frame" if frames else "drain      no frames")
+    print(f"exit       {exited:.2f}s")
+    print(f"closes     {dict(closes)}")
+    if hints:
+        busiest = max(Counter(int(hint) for hint in hints).values())
+        print(
+            f"reconnect  hints {hints[0]:.1f}-{hints[-1]:.1f}s (median {statistics.median(hints):.1f}s), "
+            f"busiest second {busiest} reconnects vs {len(results)} without hints"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--settle", type=float, default=1.0, help="seconds of live ticking before SIGTERM")
+    main(parser.parse_args())
@@ -0,0 +1,114 @@
+"""
+Row vs compact inventory storage benchmark (PostgreSQL).
+
+Loads a synthetic population into both `inventory` and `inventory_bags`,
+then times per-user reads (get_counts) and writes (add one ore) through
+RowInventory and CompactInventory, and reports how much each table grew.
+
+Synthetic users live in a reserved telegram_id range and are deleted
+afterwards (the FKs cascade).
+
+Usage (from backend/):
+    python -m benchmarks.inventory_storage --users 10000 --ops 5000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from sqlalchemy import text
+
+from app.database import async_session, engine, init_db
+from app.game.data.ores import ORES
+from app.game.inventory import CompactInventory, RowInventory
+
+BASE_ID = 9_000_000_000_000
+
+
+async def table_size(table: str) -> int:
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            text("SELECT pg_total_relation_size(CAST(:table AS regclass))"),
+            {"table": table}
+        )
+        return result.scalar_one()
+
+
+async def load(users: int):
+    item_types = [f"{ore.id}_ore" for ore in ORES.values()]
+    slots = max(ore.item_id for ore in ORES.values())
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "INSERT INTO users (telegram_id) "
+            "SELECT CAST(:base AS bigint) + g FROM generate_series(1, :n) AS g"
+        ), {"base": BASE_ID, "n": users})
+        await conn.execute(text(
+            "INSERT INTO inventory (user_id, item_type, quantity) "
+            "SELECT CAST(:base AS bigint) + g, t, 100 FROM generate_series(1, :n) AS g, unnest(CAST(:types AS text[])) AS t"
+        ), {"base": BASE_ID, "n": users, "types": item_types})
+        await conn.execute(text(
+            "INSERT INTO inventory_bags (user_id, counts) "
+            "SELECT CAST(:base AS bigint) + g, array_fill(100::bigint, ARRAY[:slots]) FROM generate_series(1, :n) AS g"
+        ), {"base": BASE_ID, "n": users, "slots": slots})
+        await conn.execute(text("ANALYZE inventory"))
+        await conn.execute(text("ANALYZE inventory_bags"))
+
+
+async def cleanup():
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("DELETE FROM users WHERE telegram_id > :base"),
+            {"base": BASE_ID}
+        )
+
+
+async def run_ops(store_cls, users: int, ops: int, write: bool) -> float:
+    """Run `ops` single-user operations, one transaction each. Returns ops/s."""
+    rng = random.Random(42)
+    item_types = [f"{ore.id}_ore" for ore in ORES.values()]
+    start = time.perf_counter()
+    for _ in range(ops):
+        user_id = BASE_ID + rng.randint(1, users)
+        async with async_session() as db:
+            store = store_cls(db)
+            if write:
+                await store.add(user_id, rng.choice(item_types), 1)
+            else:
+                await store.get_counts(user_id)
+            await db.commit()
+    return ops / (time.perf_counter() - start)
+
+
+async def main(users: int, ops: int):
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("This benchmark needs a PostgreSQL DATABASE_URL")
+
+    await init_db()
+    await cleanup()
+    sizes_before = {t: await table_size(t) for t in ("inventory", "inventory_bags")}
+    await load(users)
+    sizes_after = {t: await table_size(t) for t in ("inventory", "inventory_bags")}
+
+    try:
+        print(f"{users:,} users, {len(ORES)} item types, {ops:,} ops per case\n")
+        print(f"{'storage':<10} {'read ops/s':>12} {'write ops/s':>12} {'table growth':>14}")
+        for name, store_cls, table in (
+            ("rows", RowInventory, "inventory"),
+            ("compact", CompactInventory, "inventory_bags"),
+        ):
+            reads = await run_ops(store_cls, users, ops, write=False)
+            writes = await run_ops(store_cls, users, ops, write=True)
+            growth = sizes_after[table] - sizes_before[table]
+            print(f"{name:<10} {reads:>12,.0f} {writes:>12,.0f} {growth / 1024 / 1024:>11.1f} MB")
+    finally:
+        await cleanup()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--ops", type=int, default=5_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.ops))
@@ -0,0 +1,297 @@
+"""
+Micro-benchmarks for game logic and data functions.
+
+A small pytest-benchmark-style harness: each benchmark is calibrated to
+run for at least --min-time per round, timed over --rounds rounds, and
+reported as per-call min/median/mean/stddev. Results are saved as JSON
+(tagged with the git commit) so two runs can be compared:
+
+    python -m benchmarks.micro                               # run + save
+    python -m benchmarks.micro --compare benchmarks/results/<earlier>.json
+    python -m benchmarks.micro -k tick                       # subset by name
+
+Database benchmarks run MiningSkill against an in-memory SQLite engine
+with a VirtualClock, so they measure our code and SQLAlchemy overhead
+rather than network latency.
+
+Usage (from backend/):
+    python -m benchmarks.micro
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable
+from urllib.parse import quote, urlencode
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.config import settings
+from app.database import Base
+from app.game.analytics import rollups
+from app.game.clock import VirtualClock
+from app.game.data.ores import get_available_ores, get_ore
+from app.game.data.skills import Action, SkillDef
+from app.game.data.xp_table import XP_TABLE, get_level_for_xp, get_xp_to_next_level
+from app.game.skills.action import ActionResult
+from app.game.skills.mining import MiningSkill
+from app.models import Skill, User
+from app.routers.auth import validate_telegram_data
+from app.tracing import exporter, start_trace
+
+RESULTS_DIR = Path(__file__).parent / "results"
+USER_ID = 1
+
+
+class Harness:
+    """Calibrates, times and records benchmarks."""
+
+    def __init__(self, rounds: int, min_time: float, selected: str | None):
+        self.rounds = rounds
+        self.min_time = min_time
+        self.selected = selected
+        self.results: list[dict] = []
+
+    def wanted(self, name: str) -> bool:
+        return self.selected is None or self.selected in name
+
+    def _record(self, name: str, iterations: int, timings: list[float]):
+        per_call = [t / iterations for t in timings]
+        self.results.append({
+            "name": name,
+            "rounds": len(per_call),
+            "iterations": iterations,
+            "min": min(per_call),
+            "max": max(per_call),
+            "mean": statistics.fmean(per_call),
+            "median": statistics.median(per_call),
+            "stddev": statistics.stdev(per_call) if len(per_call) > 1 else 0.0,
+            "ops": 1.0 / statistics.median(per_call),
+        })
+        print(format_row(self.results[-1]))
+
+    def bench(self, name: str, fn: Callable[[], object]):
+        if not self.wanted(name):
+            return
+
+        def timed(n: int) -> float:
+            start = time.perf_counter()
+            for _ in range(n):
+                fn()
+            return time.perf_counter() - start
+
+        iterations = 1
+        while timed(iterations) < self.min_time:
+            iterations *= 2
+        self._record(name, iterations, [timed(iterations) for _ in range(self.rounds)])
+
+    async def bench_async(self, name: str, fn: Callable[[], Awaitable[object]]):
+        if not self.wanted(name):
+            return
+
+        async def timed(n: int) -> float:
+            start = time.perf_counter()
+            for _ in range(n):
+                await fn()
+            return time.perf_counter() - start
+
+        iterations = 1
+        while await timed(iterations) < self.min_time:
+            iterations *= 2
+        self._record(name, iterations, [await timed(iterations) for _ in range(self.rounds)])
+
+
+def format_row(result: dict) -> str:
+    return (f"{result['name']:<44} {result['min'] * 1e6:>10.2f} {result['median'] * 1e6:>10.2f} "
+            f"{result['mean'] * 1e6:>10.2f} {result['stddev'] * 1e6:>9.2f} {result['ops']:>12,.0f}")
+
+
+def header() -> str:
+    return (f"{'benchmark':<44} {'min us':>10} {'median us':>10} {'mean us':>10} "
+            f"{'stddev':>9} {'ops/s':>12}")
+
+
+def signed_init_data(user: dict) -> str:
+    """initData as Telegram would send it, signed with settings.BOT_TOKEN."""
+    fields = {
+        "auth_date": "1700000000",
+        "query_id": "AAHdF6IQAAAAAN0XohDhrOrc",
+        "user": json.dumps(user, separators=(",", ":")),
+    }
+    check = "\n".join(f"{key}={value}" for key, value in sorted(fields.items()))
+    secret = hmac.new(b"WebAppData", settings.BOT_TOKEN.encode(), hashlib.sha256).digest()
+    fields["hash"] = hmac.new(secret, check.encode(), hashlib.sha256).hexdigest()
+    return urlencode(fields, quote_via=quote)
+
+
+def data_benchmarks(h: Harness):
+    top_xp = XP_TABLE[-1] + 1
+    h.bench("get_level_for_xp[level 1]", lambda: get_level_for_xp(0))
+    h.bench("get_level_for_xp[level 50]", lambda: get_level_for_xp(XP_TABLE[49]))
+    h.bench("get_level_for_xp[level 100]", lambda: get_level_for_xp(top_xp))
+    # Distinct XP values defeat get_level_for_xp's lru_cache, as live play does
+    xp_values = iter(range(10 ** 9))
+    h.bench("get_level_for_xp[uncached]", lambda: get_level_for_xp(next(xp_values)))
+    h.bench("get_xp_to_next_level", lambda: get_xp_to_next_level(XP_TABLE[49] + 10, 50))
+    h.bench("get_available_ores[level 1]", lambda: get_available_ores(1))
+    h.bench("get_available_ores[level 100]", lambda: get_available_ores(100))
+    # Unregistered skill the size content is growing towards
+    large = SkillDef(skill_type="bench", name="Bench", verb="bench", verb_ing="benching", actions={
+        f"a{i}": Action(
+            skill_type="bench", id=f"a{i}", name=f"A{i}", level_required=1 + i % 99, xp=1,
+            duration=1.0, item_type=f"a{i}_item", item_id=1000 + i,
+        )
+        for i in range(300)
+    })
+    h.bench("SkillDef.unlocked[300 actions, level 50]", lambda: large.unlocked(50))
+
+    init_data = signed_init_data({"id": USER_ID, "first_name": "Bench", "username": "bench"})
+    assert validate_telegram_data(init_data) is not None
+    h.bench("validate_telegram_data[valid]", lambda: validate_telegram_data(init_data))
+    h.bench("validate_telegram_data[bad hash]", lambda: validate_telegram_data(init_data[:-4] + "0000"))
+
+    h.bench("ActionResult[progress]", lambda: ActionResult(
+        success=True, action_id="copper", action_name="Copper Ore", total_xp=1234,
+        level=12, progress=0.5, xp_in_level=100, xp_needed=250, message="Mining Copper Ore...",
+    ))
+
+
+async def db_benchmarks(h: Harness):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    clock = VirtualClock()
+    copper = get_ore("copper")
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(User), [{"telegram_id": USER_ID}])
+            await conn.execute(insert(Skill), [{
+                "user_id": USER_ID, "skill_type": MiningSkill.SKILL_TYPE, "xp": 0, "level": 1,
+                "version": 0, "event_watermark": 0,
+            }])
+        async with sessions() as db:
+            await MiningSkill(db, clock=clock).start_mining(USER_ID, "copper")
+            await db.commit()
+
+        async def tick():
+            async with sessions() as db:
+                result = await MiningSkill(db, clock=clock).process_mining_tick(USER_ID)
+                await db.commit()
+            return result
+
+        async def tick_completed():
+            clock.advance(copper.mining_time)
+            return await tick()
+
+        async def status():
+            async with sessions() as db:
+                return await MiningSkill(db, clock=clock).get_status(USER_ID)
+
+        await tick_completed()  # create the inventory row
+        await h.bench_async("process_mining_tick[in progress]", tick)
+        await h.bench_async("process_mining_tick[ore completed]", tick_completed)
+        await h.bench_async("get_status", status)
+
+        # Cost of a fully recorded trace (the production cost is this
+        # difference times TRACE_SAMPLE_RATE)
+        async def traced_tick():
+            with start_trace("bench tick"):
+                result = await tick()
+            exporter.drain()
+            return result
+
+        saved = settings.TRACE_SAMPLE_RATE, settings.TRACE_EXPORT_PATH
+        settings.TRACE_SAMPLE_RATE, settings.TRACE_EXPORT_PATH = 1.0, os.devnull
+        try:
+            await h.bench_async("process_mining_tick[traced]", traced_tick)
+        finally:
+            settings.TRACE_SAMPLE_RATE, settings.TRACE_EXPORT_PATH = saved
+        rollups.drain()
+    finally:
+        await engine.dispose()
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def save(results: list[dict], path: Path | None) -> Path:
+    commit = git_commit()
+    stamp = datetime.now(timezone.utc)
+    if path is None:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        path = RESULTS_DIR / f"{stamp:%Y%m%dT%H%M%S}_{commit}.json"
+    path.write_text(json.dumps({
+        "commit": commit,
+        "datetime": stamp.isoformat(),
+        "machine": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "system": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+        },
+        "benchmarks": results,
+    }, indent=2) + "\n")
+    return path
+
+
+def compare(results: list[dict], baseline_path: Path, threshold: float) -> int:
+    """Print median changes against a saved run; returns the regression count."""
+    baseline = json.loads(baseline_path.read_text())
+    before = {result["name"]: result for result in baseline["benchmarks"]}
+    regressions = 0
+    print(f"\ncompared with {baseline['commit']} ({baseline_path.name}):")
+    for result in results:
+        old = before.get(result["name"])
+        if old is None:
+            print(f"  {result['name']:<44} new")
+            continue
+        change = result["median"] / old["median"] - 1.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"  {result['name']:<44} {old['median'] * 1e6:>10.2f} -> {result['median'] * 1e6:>10.2f} us "
+              f"({change:+.1%}){flag}")
+    return regressions
+
+
+async def main(args) -> int:
+    h = Harness(args.rounds, args.min_time, args.k)
+    print(header())
+    data_benchmarks(h)
+    await db_benchmarks(h)
+
+    if not args.no_save:
+        print(f"\nsaved {save(h.results, args.save)}")
+    if args.compare:
+        return 1 if compare(h.results, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-k", help="only run benchmarks whose name contains this")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.05, help="minimum seconds per round")
+    parser.add_argument("--save", type=Path, help="result file (default: benchmarks/results/<time>_<commit>.json)")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--compare", type=Path, help="earlier result file to compare medians against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="median slowdown reported as a regression (default 10%%)")
+    raise SystemExit(asyncio.run(main(parser.parse_args())))
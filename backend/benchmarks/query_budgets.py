@@ -0,0 +1,93 @@
+"""
+SQL statement budgets for the hot paths.
+
+Runs each MiningSkill operation once against an in-memory SQLite engine
+inside assert_query_budget() and fails (exit 1) if any of them issues
+more statements than its budget. Run it after touching game code to
+catch N+1 patterns before they reach production; the test suite runs
+it too (tests/test_query_budgets.py).
+
+Usage (from backend/):
+    python -m benchmarks.query_budgets
+"""
+
+import asyncio
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database import Base, assert_query_budget
+from app.game.analytics import rollups
+from app.game.clock import VirtualClock
+from app.game.data.ores import get_ore
+from app.game.skills.mining import MiningSkill
+from app.models import Skill, User
+
+USER_ID = 1
+
+# Operation -> maximum statements
+BUDGETS = {
+    "get_state_version": 1,
+    "get_status": 2,
+    "start_mining": 2,
+    "process_mining_tick[in progress]": 1,
+    "process_mining_tick[ore completed]": 4,
+    "stop_mining": 2,
+}
+
+
+async def main() -> int:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    sessions = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    clock = VirtualClock()
+    copper = get_ore("copper")
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [{"telegram_id": USER_ID}])
+        await conn.execute(insert(Skill), [{
+            "user_id": USER_ID, "skill_type": MiningSkill.SKILL_TYPE, "xp": 0, "level": 1,
+            "version": 0, "event_watermark": 0,
+        }])
+
+    async def run(name: str | None, operation, advance: float):
+        clock.advance(advance)
+        async with sessions() as db:
+            mining = MiningSkill(db, clock=clock)
+            if name is None:
+                await operation(mining)
+                await db.commit()
+                return
+            with assert_query_budget(BUDGETS[name], name) as stats:
+                await operation(mining)
+                await db.commit()
+        print(f"{name:<36} {stats.statements:>3} / {BUDGETS[name]}")
+
+    failures = 0
+    steps = [
+        ("start_mining", lambda m: m.start_mining(USER_ID, "copper"), 0.0),
+        # First completion creates the inventory row; budget the steady state
+        (None, lambda m: m.process_mining_tick(USER_ID), copper.mining_time),
+        ("process_mining_tick[in progress]", lambda m: m.process_mining_tick(USER_ID), 0.0),
+        ("process_mining_tick[ore completed]", lambda m: m.process_mining_tick(USER_ID), copper.mining_time),
+        ("get_state_version", lambda m: m.get_state_version(USER_ID), 0.0),
+        ("get_status", lambda m: m.get_status(USER_ID), 0.0),
+        ("stop_mining", lambda m: m.stop_mining(USER_ID), 0.0),
+    ]
+    print(f"{'operation':<36} statements / budget")
+    try:
+        for name, operation, advance in steps:
+            try:
+                await run(name, operation, advance)
+            except AssertionError as exc:
+                failures += 1
+                print(f"OVER BUDGET: {exc}")
+    finally:
+        rollups.drain()
+        await engine.dispose()
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
@@ -0,0 +1,147 @@
+"""
+Reconnect storm against resumable websocket sessions.
+
+Seeds --clients players with an action running, serves app.main in
+process on a scratch SQLite database, connects every player once, then
+has them all reconnect at the same moment three times:
+
+    cold       no resume token or version: a full status each (paced
+               by WS_RESYNC_RATE/BURST, server_busy past the max wait)
+    resume     token and version of the last session: the parked
+               snapshot answers with status_unchanged or a delta
+    stateless  the same, after dropping every parked session (another
+               worker, or a restart): one query to confirm the version
+
+For each storm: the first frame types the clients got, statements the
+database ran, and the spread of time from connect to first status.
+
+Usage (from backend/):
+    python -m benchmarks.reconnect_storm --clients 500 --resync-rate 100
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from collections import Counter
+from urllib.parse import urlencode
+
+import websockets
+
+from benchmarks.server_throughput import free_port
+from benchmarks.startup import seed
+
+STATUS_FRAMES = ("status", "status_delta", "status_unchanged", "server_busy")
+
+
+async def reconnect(port: int, user_id: int, last: dict | None) -> dict:
+    """Connect, wait for the first status frame, and close."""
+    params = {"resume": last["token"], "version": last["version"]} if last else {}
+    url = f"ws://127.0.0.1:{port}/ws/{user_id}" + (f"?{urlencode(params)}" if params else "")
+    started = time.perf_counter()
+    token = None
+    async with websockets.connect(url, max_queue=None, open_timeout=60) as ws:
+        async for raw in ws:
+            message = json.loads(raw)
+            if message["type"] == "session":
+                token = message["resume_token"]
+            elif message["type"] in STATUS_FRAMES:
+                return {
+                    "kind": message["type"],
+                    "latency": time.perf_counter() - started,
+                    "token": token,
+                    "version": message.get("version", last and last["version"]),
+                }
+    raise RuntimeError(f"user {user_id}: closed before any status")
+
+
+async def storm(port: int, sessions: dict[int, dict | None], counter: dict) -> list[dict]:
+    before = counter["statements"]
+    results = await asyncio.gather(*(reconnect(port, user_id, last) for user_id, last in sessions.items()))
+    await asyncio.sleep(0.5)  # let the handlers see the closes and park
+    for user_id, result in zip(sessions, results):
+        if result["kind"] != "server_busy":
+            sessions[user_id] = result
+    counter["last"] = counter["statements"] - before
+    return results
+
+
+def report(name: str, results: list[dict], statements: int):
+    kinds = Counter(r["kind"] for r in results)
+    latencies = sorted(r["latency"] for r in results)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) >= 20 else latencies[-1]
+    print(
+        f"{name:<10} {statements:>6} stmts {statements / len(results):>5.1f}/client  "
+        f"median {statistics.median(latencies) * 1000:>6.0f} ms  p95 {p95 * 1000:>6.0f} ms  "
+        f"max {latencies[-1] * 1000:>6.0f} ms  {dict(kinds)}"
+    )
+
+
+async def run(args):
+    import uvicorn
+    from sqlalchemy import event
+    from app.routers.websocket import manager
+    from app.sharding import shards
+
+    counter = {"statements": 0}
+
+    def count(*_):
+        counter["statements"] += 1
+
+    for engine in shards.engines:
+        event.listen(engine.sync_engine, "before_cursor_execute", count)
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config("app.main:app", host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    try:
+        sessions: dict[int, dict | None] = {1 + i: None for i in range(args.clients)}
+        await storm(port, sessions, counter)  # first connect of every player
+        # The pacing bucket refills before each storm
+        await asyncio.sleep(args.resync_burst / args.resync_rate)
+        print(f"{args.clients} clients, resyncs paced at {args.resync_rate:g}/s (burst {args.resync_burst:g})")
+
+        cold = {user_id: None for user_id in sessions}
+        results = await storm(port, cold, counter)
+        report("cold", results, counter["last"])
+        sessions = cold
+        await asyncio.sleep(args.resync_burst / args.resync_rate)
+
+        results = await storm(port, sessions, counter)
+        report("resume", results, counter["last"])
+
+        manager.parked.clear()
+        results = await storm(port, sessions, counter)
+        report("stateless", results, counter["last"])
+    finally:
+        server.should_exit = True
+        await serving
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite+aiosqlite:///{tmp}/storm.db"
+        os.environ.update(
+            RATE_LIMIT_ENABLED="false",
+            WARMUP_ENABLED="false",
+            WS_RESYNC_RATE=str(args.resync_rate),
+            WS_RESYNC_BURST=str(args.resync_burst),
+            WS_RESYNC_MAX_WAIT=str(args.max_wait),
+        )
+        seed(database_url, args.clients)
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--resync-rate", type=float, default=100.0)
+    parser.add_argument("--resync-burst", type=float, default=200.0)
+    parser.add_argument("--max-wait", type=float, default=5.0)
+    main(parser.parse_args())
@@ -0,0 +1,200 @@
+"""
+Requests/s of the production launcher against the development runner.
+
+Starts each server configuration as a subprocess on a scratch SQLite
+database, drives it with keep-alive HTTP/1.1 clients (plain asyncio
+sockets, spread over several client processes) and reports throughput
+and latency per endpoint:
+
+    dev   uvicorn.run("app.main:app", reload=True) as run.py does
+          (auto loop/parser, access log on, 5s keep-alive, one worker)
+    prod  python -m app.server with WEB_CONCURRENCY=--workers
+
+Load generation shares the machine with the server, so absolute numbers
+are pessimistic; compare configurations within one run. Worker scaling
+needs at least as many free cores as workers.
+
+Usage (from backend/):
+    python -m benchmarks.server_throughput --workers 4 --duration 10
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+USER_ID = 1
+
+ENDPOINTS = {
+    "ores": "/game/ores",
+    "status": f"/game/mining/status?user_id={USER_ID}",
+}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_command(config: str, port: int) -> list[str]:
+    if config == "dev":
+        return [sys.executable, "-c", (
+            "import uvicorn; "
+            f"uvicorn.run('app.main:app', host='127.0.0.1', port={port}, reload=True)"
+        )]
+    return [sys.executable, "-m", "app.server"]
+
+
+def start_server(config: str, port: int, workers: int, database_url: str) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        HOST="127.0.0.1",
+        PORT=str(port),
+        WEB_CONCURRENCY=str(workers),
+        PYTHONPATH=str(BACKEND_DIR),
+        # Every load connection is one IP and one player
+        RATE_LIMIT_ENABLED="false",
+    )
+    process = subprocess.Popen(
+        server_command(config, port),
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,  # so the reloader's and workers' children stop with it
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f"{config} server did not become healthy")
+
+
+def stop_server(process: subprocess.Popen):
+    try:
+        os.killpg(process.pid, signal.SIGINT)
+        process.wait(timeout=15)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+def seed_player(port: int):
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}/auth/telegram",
+        data=json.dumps({"init_data": json.dumps({"id": USER_ID, "first_name": "Bench"})}).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    urllib.request.urlopen(request, timeout=10).close()
+    # Creates the skill row before concurrent status reads race to do it
+    urllib.request.urlopen(f"http://127.0.0.1:{port}{ENDPOINTS['status']}", timeout=10).close()
+
+
+async def _connection(port: int, path: str, until: float, latencies: list[float]) -> int:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    request = f"GET {path} HTTP/1.1\r\nHost: bench\r\n\r\n".encode()
+    errors = 0
+    try:
+        while time.perf_counter() < until:
+            started = time.perf_counter()
+            writer.write(request)
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n")[1:]:
+                name, _, value = line.partition(b":")
+                if name.strip().lower() == b"content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            if not head.startswith(b"HTTP/1.1 200"):
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+    finally:
+        writer.close()
+    return errors
+
+
+def _client(args: tuple) -> tuple[list[float], int]:
+    port, path, connections, duration = args
+
+    async def run():
+        latencies: list[float] = []
+        until = time.perf_counter() + duration
+        errors = await asyncio.gather(*(
+            _connection(port, path, until, latencies) for _ in range(connections)
+        ))
+        return latencies, sum(errors)
+
+    return asyncio.run(run())
+
+
+def load(port: int, path: str, clients: int, connections: int, duration: float) -> dict:
+    per_client = max(1, connections // clients)
+    with multiprocessing.get_context("spawn").Pool(clients) as pool:
+        results = pool.map(_client, [(port, path, per_client, duration)] * clients)
+    latencies = sorted(latency for client_latencies, _ in results for latency in client_latencies)
+    errors = sum(client_errors for _, client_errors in results)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / duration,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0,
+    }
+
+
+def main(args) -> int:
+    rows = []
+    with tempfile.TemporaryDirectory() as scratch:
+        for config in args.configs.split(","):
+            database_url = f"sqlite+aiosqlite:///{scratch}/{config}.db"
+            port = free_port()
+            process = start_server(config, port, args.workers if config == "prod" else 1, database_url)
+            try:
+                seed_player(port)
+                for name in args.endpoints.split(","):
+                    # Warm up connections, caches and prepared statements
+                    load(port, ENDPOINTS[name], 1, 4, 1.0)
+                    result = load(port, ENDPOINTS[name], args.clients, args.connections, args.duration)
+                    rows.append((config, name, result))
+            finally:
+                stop_server(process)
+
+    print(f"{'config':<8} {'endpoint':<10} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for config, name, result in rows:
+        print(f"{config:<8} {name:<10} {result['rps']:>10,.0f} {result['p50_ms']:>9.2f} "
+              f"{result['p99_ms']:>9.2f} {result['errors']:>7}")
+
+    baseline = {name: result for config, name, result in rows if config == "dev"}
+    for config, name, result in rows:
+        if config != "dev" and name in baseline and baseline[name]["rps"]:
+            print(f"{config} vs dev [{name}]: {result['rps'] / baseline[name]['rps']:.2f}x req/s")
+    return 1 if any(result["errors"] for _, _, result in rows) else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--configs", default="dev,prod", help="comma-separated: dev, prod")
+    parser.add_argument("--endpoints", default="ores,status", help=f"comma-separated: {', '.join(ENDPOINTS)}")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="prod worker processes")
+    parser.add_argument("--clients", type=int, default=2, help="load generator processes")
+    parser.add_argument("--connections", type=int, default=32, help="keep-alive connections in total")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per endpoint")
+    raise SystemExit(main(parser.parse_args()))
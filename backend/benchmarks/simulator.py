@@ -0,0 +1,334 @@
+"""
+Virtual-clock capacity simulator.
+
+Drives the real MiningSkill and settle_all() code for a synthetic
+population on SQLite with a VirtualClock, so simulated days run in
+minutes. Reports DB statements and rows written, websocket messages sent
+and the level distribution, to forecast load and tune the ORES /
+XP_TABLE economy without a live cluster.
+
+Player model: each simulated hour a player is online with --online-prob.
+Connecting runs the real get_status/start_mining on the best unlocked
+ore; online players switch ore after levelling up, as the client does.
+Progress (XP, ores, levels) for everyone comes from the real settle_all()
+every --sweep-interval simulated seconds. Its arithmetic matches a tick
+at every ore completion, so the economy is exact while the run costs
+sweeps x active miners instead of one transaction per ore.
+
+Online players' live load is not replayed pass by pass. The
+ActionScheduler reports progress from memory (no statements) and settles
+due players with one settle() per pass; the real settle() is run once at
+startup for a single due player to measure a pass's statements and rows.
+Statements are charged per pass with a completion (at most one pass per
+TICK_RATE) and rows per completion.
+
+For very large populations, simulate a sample and pass --scale to
+extrapolate the load figures.
+
+Usage (from backend/):
+    python -m benchmarks.simulator --players 10000 --days 1
+    python -m benchmarks.simulator --players 1000000 --days 7 --sweep-interval 3600 --db /tmp/sim.db
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from app.config import settings
+from app.database import Base
+from app.game.analytics import rollups
+from app.game.clock import VirtualClock
+from app.game.data.ores import get_available_ores, get_ore
+from app.game.settlement import settle, settle_all
+from app.game.skills.mining import MiningSkill
+from app.models import Skill, User
+
+BASE_ID = 1_000_000
+CALIBRATION_ID = BASE_ID - 1
+HOUR = 3600.0
+DAY = 24 * HOUR
+SEED_BATCH = 10_000
+LOOKUP_CHUNK = 500
+
+
+@dataclass
+class Load:
+    """Counters for one simulated day."""
+    statements: float = 0
+    writes: float = 0
+    rows_written: float = 0
+    messages: Counter = field(default_factory=Counter)
+    ores: int = 0
+    xp: int = 0
+    sweeps: int = 0
+    rollup_rows: int = 0
+    online_seconds: float = 0.0
+
+
+@dataclass
+class TickCost:
+    """Statements and rows written by one real live settlement pass."""
+    statements: int = 0
+    writes: int = 0
+    rows_written: int = 0
+
+
+def best_ore(level: int) -> str:
+    return get_available_ores(level)[-1].id
+
+
+class Simulator:
+    def __init__(self, engine: AsyncEngine, players: int, online_prob: float, sweep_interval: float, seed: int):
+        self.engine = engine
+        self.players = players
+        self.online_prob = online_prob
+        self.sweep_interval = sweep_interval
+        self.rng = random.Random(seed)
+        self.clock = VirtualClock()
+        self.sessions = async_sessionmaker(engine, expire_on_commit=False)
+
+        # Online player -> (level, ore) as last seen
+        self.online: dict[int, tuple[int, str]] = {}
+        self.award_pass = TickCost()
+        self._rollup_keys: set = set()
+
+        self.day = Load()
+        self.days: list[Load] = []
+        self.simulated_seconds = 0.0
+        self._counting: Load | TickCost = self.day
+        event.listen(engine.sync_engine, "before_cursor_execute", self._count_statement)
+
+    def _count_statement(self, conn, cursor, statement, parameters, context, executemany):
+        self._counting.statements += 1
+        if statement.lstrip()[:6].upper() in ("INSERT", "UPDATE", "DELETE"):
+            self._counting.writes += 1
+            self._counting.rows_written += len(parameters) if executemany else 1
+
+    async def seed(self):
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            for start in range(CALIBRATION_ID, BASE_ID + self.players, SEED_BATCH):
+                ids = range(start, min(start + SEED_BATCH, BASE_ID + self.players))
+                await conn.execute(insert(User), [{"telegram_id": uid} for uid in ids])
+                await conn.execute(insert(Skill), [
+                    {"user_id": uid, "skill_type": MiningSkill.SKILL_TYPE, "xp": 0, "level": 1,
+                     "version": 0, "event_watermark": 0}
+                    for uid in ids
+                ])
+
+    async def _measure_pass(self, cost: TickCost):
+        self._counting = cost
+        try:
+            await settle(self.engine, now=self.clock(), only=[CALIBRATION_ID], notify=False)
+        finally:
+            self._counting = self.day
+
+    async def calibrate(self):
+        """Measure the real live settlement cost on a dedicated player."""
+        async with self.sessions() as db:
+            await MiningSkill(db, clock=self.clock).start_mining(CALIBRATION_ID, "copper")
+            await db.commit()
+        # Warm the inventory row so the measured pass is the steady-state one
+        self.clock.advance(get_ore("copper").mining_time)
+        await self._measure_pass(TickCost())
+        self.clock.advance(get_ore("copper").mining_time)
+        await self._measure_pass(self.award_pass)
+        async with self.sessions() as db:
+            await MiningSkill(db, clock=self.clock).stop_mining(CALIBRATION_ID)
+            await db.commit()
+        rollups.drain()
+        self.day = Load()
+        self._counting = self.day
+
+    def charge_passes(self, passes: float, completions: int):
+        self.day.statements += self.award_pass.statements * passes
+        self.day.writes += self.award_pass.writes * passes
+        self.day.rows_written += self.award_pass.rows_written * completions
+
+    async def start_best(self, user_id: int, level: int, current_action: str | None):
+        ore_id = best_ore(level)
+        if current_action != ore_id:
+            async with self.sessions() as db:
+                await MiningSkill(db, clock=self.clock).start_mining(user_id, ore_id)
+                await db.commit()
+            self.day.messages["mining_started"] += 1
+        self.online[user_id] = (level, ore_id)
+
+    async def connect(self, user_id: int):
+        """Open the app: initial status, then mine the best unlocked ore."""
+        async with self.sessions() as db:
+            status = await MiningSkill(db, clock=self.clock).get_status(user_id)
+        self.day.messages["status"] += 1
+        await self.start_best(user_id, status["level"], status["current_action"])
+
+    async def hourly(self):
+        """Reshuffle who is online for the next hour."""
+        for offset in range(self.players):
+            user_id = BASE_ID + offset
+            online = self.rng.random() < self.online_prob
+            if online and user_id not in self.online:
+                await self.connect(user_id)
+            elif not online and user_id in self.online:
+                del self.online[user_id]
+
+    async def sweep(self, elapsed: float):
+        """Settle everyone, then account online players' ticks and level-ups."""
+        _, ores = await settle_all(self.engine, now=self.clock())
+        self.day.sweeps += 1
+        self.day.ores += ores
+
+        online_ores = 0
+        for (user_id, _, hour), (xp, actions) in rollups.drain().items():
+            self._rollup_keys.add((user_id, hour))
+            self.day.xp += xp
+            if user_id in self.online:
+                online_ores += actions
+
+        self.day.online_seconds += len(self.online) * elapsed
+        self.day.messages["ore_mined"] += online_ores
+        self.charge_passes(min(online_ores, elapsed / settings.TICK_RATE), online_ores)
+        progress_ticks = max(len(self.online) * elapsed / settings.TICK_RATE - online_ores, 0)
+        self.day.messages["mining_tick"] += int(progress_ticks)
+
+        online = list(self.online)
+        for start in range(0, len(online), LOOKUP_CHUNK):
+            async with self.engine.connect() as conn:
+                result = await conn.execute(
+                    select(Skill.user_id, Skill.level)
+                    .where(Skill.user_id.in_(online[start:start + LOOKUP_CHUNK]))
+                )
+                levels = result.all()
+            for user_id, level in levels:
+                old_level, ore_id = self.online[user_id]
+                if level > old_level:
+                    # One level_up per level gained; the client then asks for status
+                    self.day.messages["level_up"] += level - old_level
+                    self.day.messages["status"] += level - old_level
+                    await self.start_best(user_id, level, ore_id)
+
+    def flush_rollups(self):
+        # The aggregator upserts one row per (user, skill, hour) counter
+        self.day.rollup_rows += len(self._rollup_keys)
+        self._rollup_keys.clear()
+
+    def close_day(self):
+        self.days.append(self.day)
+        self.day = Load()
+        self._counting = self.day
+
+    async def run(self, days: float):
+        self.simulated_seconds = days * DAY
+        await self.calibrate()
+        start = self.clock()
+        end = start + timedelta(seconds=days * DAY)
+        last_sweep = start
+        timers = {
+            "hour": start,
+            "sweep": start + timedelta(seconds=self.sweep_interval),
+            "flush": start + timedelta(seconds=settings.ROLLUP_FLUSH_INTERVAL),
+            "day": start + timedelta(seconds=DAY),
+        }
+        periods = {
+            "hour": HOUR,
+            "sweep": self.sweep_interval,
+            "flush": settings.ROLLUP_FLUSH_INTERVAL,
+            "day": DAY,
+        }
+
+        while True:
+            boundary = min(min(timers.values()), end)
+            self.clock.set(boundary)
+            if boundary == end:
+                await self.sweep((boundary - last_sweep).total_seconds())
+                self.flush_rollups()
+                break
+            # Same-instant timers in a fixed order: settle before rolling the day
+            for name in ("sweep", "flush", "day", "hour"):
+                if timers[name] != boundary:
+                    continue
+                if name == "sweep":
+                    await self.sweep((boundary - last_sweep).total_seconds())
+                    last_sweep = boundary
+                elif name == "flush":
+                    self.flush_rollups()
+                elif name == "day":
+                    self.close_day()
+                else:
+                    await self.hourly()
+                timers[name] += timedelta(seconds=periods[name])
+
+        if self.day.sweeps:
+            self.close_day()
+
+    async def levels(self) -> list[tuple[int, int]]:
+        async with self.engine.connect() as conn:
+            result = await conn.execute(
+                select(Skill.level, func.count())
+                .where(Skill.user_id >= BASE_ID)
+                .group_by(Skill.level)
+                .order_by(Skill.level)
+            )
+            return [(level, count) for level, count in result]
+
+
+def report(sim: Simulator, levels: list[tuple[int, int]], scale: float, wall: float):
+    print(f"{sim.players:,} players, online p={sim.online_prob}, "
+          f"sweep every {sim.sweep_interval:g}s, load x{scale:g}")
+    print(f"measured live settlement pass: {sim.award_pass.statements} statements / "
+          f"{sim.award_pass.rows_written} rows written per player, progress ticks 0 statements\n")
+    print(f"{'day':>3} {'statements':>14} {'writes':>12} {'rows written':>13} {'rollup rows':>12} "
+          f"{'messages':>14} {'ores':>13} {'xp':>15}")
+    for index, day in enumerate(sim.days, 1):
+        print(f"{index:>3} {day.statements * scale:>14,.0f} {day.writes * scale:>12,.0f} "
+              f"{day.rows_written * scale:>13,.0f} {day.rollup_rows * scale:>12,.0f} "
+              f"{sum(day.messages.values()) * scale:>14,.0f} {day.ores * scale:>13,.0f} {day.xp * scale:>15,.0f}")
+
+    messages = sum((day.messages for day in sim.days), Counter())
+    print("\nmessages by type: " + ", ".join(
+        f"{kind}={count * scale:,.0f}" for kind, count in messages.most_common()
+    ))
+    seconds = sim.simulated_seconds
+    writes = sum(day.rows_written for day in sim.days) * scale
+    print(f"average rows written/s: {writes / seconds:,.1f}")
+    print(f"average messages/s:     {sum(messages.values()) * scale / seconds:,.1f}")
+
+    print("\nlevel distribution:")
+    total = sum(count for _, count in levels)
+    for level, count in levels:
+        bar = "#" * max(1, round(40 * count / total))
+        print(f"  {level:>3} {count:>9,} {count / total:>6.1%} {bar}")
+    print(f"\nsimulated in {wall:.1f}s")
+
+
+async def main(args):
+    url = f"sqlite+aiosqlite:///{args.db}" if args.db else "sqlite+aiosqlite://"
+    engine = create_async_engine(url)
+    sim = Simulator(engine, args.players, args.online_prob, args.sweep_interval, args.seed)
+    try:
+        await sim.seed()
+        wall = time.perf_counter()
+        await sim.run(args.days)
+        wall = time.perf_counter() - wall
+        report(sim, await sim.levels(), args.scale, wall)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--players", type=int, default=10_000)
+    parser.add_argument("--days", type=float, default=1.0)
+    parser.add_argument("--online-prob", type=float, default=0.05, help="chance a player is online in a given hour")
+    parser.add_argument("--sweep-interval", type=float, default=settings.SETTLE_SWEEP_INTERVAL,
+                        help="simulated seconds between settlements")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply load figures (population sampling)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--db", help="SQLite file (default: in memory)")
+    asyncio.run(main(parser.parse_args()))
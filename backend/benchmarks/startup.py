@@ -0,0 +1,170 @@
+"""
+Time to ready of the production launcher.
+
+Starts python -m app.server (one worker) on a scratch SQLite database and
+polls /health, reporting per scenario:
+
+    listening  first HTTP response of any status (503 while starting)
+    ready      first 200 from /health
+    phases     the worker's own report: imports, schema, services, warm-up
+
+Scenarios:
+
+    empty db      migrations run by the launcher before the worker starts
+    warm-up off   schema current, WARMUP_ENABLED=false
+    warm-up on    schema current, --players active players to preload
+
+followed by the slowest imports of app.main (python -X importtime).
+
+Usage (from backend/):
+    python -m benchmarks.startup --runs 3 --players 500
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.server_throughput import BACKEND_DIR, free_port, stop_server
+
+READY_LINE = re.compile(r"Ready in [\d.]+s \(pid \d+: (.*)\)")
+
+
+def start(port: int, database_url: str, warm_up: bool) -> tuple[subprocess.Popen, list[str]]:
+    env = dict(
+        os.environ,
+        DATABASE_URL=database_url,
+        HOST="127.0.0.1",
+        PORT=str(port),
+        WEB_CONCURRENCY="1",
+        PYTHONPATH=str(BACKEND_DIR),
+        WARMUP_ENABLED=str(warm_up).lower(),
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "app.server"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        start_new_session=True,
+    )
+    lines: list[str] = []
+    threading.Thread(target=lambda: lines.extend(process.stdout), daemon=True).start()
+    return process, lines
+
+
+def time_to_ready(port: int, database_url: str, warm_up: bool) -> dict:
+    started = time.perf_counter()
+    process, lines = start(port, database_url, warm_up)
+    listening = None
+    try:
+        while time.perf_counter() - started < 60:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1):
+                    ready = time.perf_counter() - started
+                    break
+            except urllib.error.HTTPError:
+                listening = listening or time.perf_counter() - started
+            except OSError:
+                pass
+            time.sleep(0.005)
+        else:
+            raise RuntimeError("server did not become ready:\n" + "".join(lines))
+        listening = listening or ready
+        # The worker prints its report as it flips /health to ready
+        deadline = time.perf_counter() + 2
+        phases = None
+        while phases is None and time.perf_counter() < deadline:
+            phases = next((m.group(1) for m in map(READY_LINE.search, list(lines)) if m), None)
+            time.sleep(0.01)
+    finally:
+        stop_server(process)
+    return {"listening": listening, "ready": ready, "phases": phases or "?"}
+
+
+def seed(database_url: str, players: int):
+    """Migrate the database and add `players` players with an action running."""
+    os.environ["DATABASE_URL"] = database_url
+    from datetime import datetime, timezone
+    from sqlalchemy import insert
+    from app.database import init_db
+    from app.models import Skill, User
+    from app.sharding import shards
+
+    async def run():
+        await init_db()
+        now = datetime.now(timezone.utc)
+        async with shards.engines[0].begin() as conn:
+            if players:
+                await conn.execute(insert(User), [{"telegram_id": 1 + i} for i in range(players)])
+                await conn.execute(insert(Skill), [
+                    {"user_id": 1 + i, "skill_type": "mining", "xp": 0, "level": 1, "version": 0,
+                     "event_watermark": 0, "current_action": "copper", "action_started": now}
+                    for i in range(players)
+                ])
+        await shards.dispose()
+
+    asyncio.run(run())
+
+
+def slowest_imports(top: int) -> list[tuple[float, str]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR,
+        env=dict(os.environ, PYTHONPATH=str(BACKEND_DIR)),
+        capture_output=True,
+        text=True,
+    )
+    rows, in_app = [], False
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Direct imports of app.main only (interpreter start-up comes before
+        # the app package; nested imports are counted in their parents)
+        in_app = in_app or name.strip() == "app"
+        if in_app and len(name) - len(name.lstrip()) == 3:
+            rows.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        seeded = f"sqlite+aiosqlite:///{tmp}/seeded.db"
+        seed(seeded, args.players)
+
+        scenarios = [
+            ("empty db", lambda run: f"sqlite+aiosqlite:///{tmp}/empty{run}.db", args.warm_up_empty),
+            ("warm-up off", lambda run: seeded, False),
+            ("warm-up on", lambda run: seeded, True),
+        ]
+        print(f"{args.runs} runs per scenario, {args.players} active players seeded")
+        print(f"{'scenario':<12} {'listening':>10} {'ready':>8}  worker phases (last run)")
+        for name, database_url, warm_up in scenarios:
+            results = [time_to_ready(free_port(), database_url(run), warm_up) for run in range(args.runs)]
+            print(
+                f"{name:<12} {statistics.median(r['listening'] for r in results):>9.2f}s "
+                f"{statistics.median(r['ready'] for r in results):>7.2f}s  {results[-1]['phases']}"
+            )
+
+    print("\nSlowest direct imports of app.main (cumulative):")
+    for seconds, module in slowest_imports(args.top_imports):
+        print(f"  {seconds * 1000:>7.1f} ms  {module}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--players", type=int, default=500)
+    parser.add_argument("--warm-up-empty", action="store_true", help="warm up in the empty-db scenario too")
+    parser.add_argument("--top-imports", type=int, default=10)
+    main(parser.parse_args())
@@ -0,0 +1,120 @@
+"""
+Hot-query statement cache benchmark.
+
+Times the per-tick skill lookup (Skill by user_id + skill_type) built two
+ways, against the configured DATABASE_URL:
+
+- rebuilt: a fresh ORM select() per call (the old code path)
+- cached:  the module-level SKILL_BY_USER statement with bind values
+
+On asyncpg each case also runs with the driver's prepared statement cache
+disabled and at DB_PREPARED_STATEMENT_CACHE_SIZE.
+
+Usage (from backend/):
+    python -m benchmarks.statement_cache --users 1000 --ops 20000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.config import settings
+from app.database import engine_options, init_db
+from app.game.skills.mining import SKILL_BY_USER, MiningSkill
+from app.models import Skill, User
+
+BASE_ID = 9_100_000_000_000
+
+
+async def rebuilt(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        select(Skill).where(
+            Skill.user_id == user_id,
+            Skill.skill_type == MiningSkill.SKILL_TYPE
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+async def cached(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        SKILL_BY_USER,
+        {"user_id": user_id, "skill_type": MiningSkill.SKILL_TYPE}
+    )
+    return result.scalar_one_or_none()
+
+
+async def run_case(lookup, prepared_cache_size: int | None, users: int, ops: int) -> float:
+    options = engine_options(settings.DATABASE_URL)
+    if prepared_cache_size is not None:
+        options["connect_args"] = {"prepared_statement_cache_size": prepared_cache_size}
+    engine = create_async_engine(settings.DATABASE_URL, **options)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    rng = random.Random(7)
+
+    try:
+        async with session_factory() as db:
+            # Warm up the pool connection and caches
+            await lookup(db, BASE_ID + 1)
+            start = time.perf_counter()
+            for _ in range(ops):
+                await lookup(db, BASE_ID + rng.randint(1, users))
+                db.expunge_all()
+            elapsed = time.perf_counter() - start
+    finally:
+        await engine.dispose()
+
+    return ops / elapsed
+
+
+async def seed(users: int):
+    from app.database import engine
+    async with engine.begin() as conn:
+        await conn.execute(delete(User).where(User.telegram_id > BASE_ID))
+        await conn.execute(insert(User), [
+            {"telegram_id": BASE_ID + i} for i in range(1, users + 1)
+        ])
+        await conn.execute(insert(Skill), [
+            {"user_id": BASE_ID + i, "skill_type": MiningSkill.SKILL_TYPE, "xp": 0, "level": 1, "version": 0}
+            for i in range(1, users + 1)
+        ])
+
+
+async def cleanup():
+    from app.database import engine
+    async with engine.begin() as conn:
+        await conn.execute(delete(Skill).where(Skill.user_id > BASE_ID))
+        await conn.execute(delete(User).where(User.telegram_id > BASE_ID))
+    await engine.dispose()
+
+
+async def main(users: int, ops: int):
+    await init_db()
+    await seed(users)
+
+    prepared_sizes: list[int | None] = [None]
+    if "+asyncpg" in settings.DATABASE_URL:
+        prepared_sizes = [0, settings.DB_PREPARED_STATEMENT_CACHE_SIZE]
+
+    try:
+        print(f"{ops:,} skill lookups over {users:,} users\n")
+        print(f"{'statement':<10} {'prepared cache':>15} {'statements/s':>14}")
+        for name, lookup in (("rebuilt", rebuilt), ("cached", cached)):
+            for size in prepared_sizes:
+                rate = await run_case(lookup, size, users, ops)
+                label = "n/a" if size is None else str(size)
+                print(f"{name:<10} {label:>15} {rate:>14,.0f}")
+    finally:
+        await cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--ops", type=int, default=20_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.ops))
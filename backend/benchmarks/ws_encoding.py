@@ -0,0 +1,194 @@
+"""
+Websocket bandwidth and CPU by frame encoding and compression.
+
+Frames (offline): bytes and encode time per message type for JSON and
+the binary schemas (app.wire), each also through permessage-deflate
+(raw deflate with context takeover, as the extension sends it).
+
+Live: seeds --clients players with an action running, starts python -m
+app.server (one worker) on a scratch SQLite database and, for each of
+JSON and binary, without and with permessage-deflate, keeps every client
+connected for --seconds while its action ticks. Clients connect through
+a relay that counts the bytes the server sends. Reports per variant:
+
+    down      server -> client bytes per second per client (wire)
+    frames    frames received per second per client
+    cpu       server process CPU, percent of one core
+
+Usage (from backend/):
+    python -m benchmarks.ws_encoding --clients 200 --seconds 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import zlib
+
+import websockets
+
+from benchmarks.server_throughput import free_port, start_server, stop_server
+from benchmarks.startup import seed
+
+
+def deflate_sizes(frames: list[bytes]) -> list[int]:
+    """Per-message deflate payload sizes, sharing one compression context."""
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    # The 00 00 ff ff tail of each sync flush is not sent (RFC 7692)
+    return [len(compressor.compress(frame) + compressor.flush(zlib.Z_SYNC_FLUSH)) - 4 for frame in frames]
+
+
+def per_call_us(fn, repeat: int = 20000) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def sample_messages() -> dict[str, dict]:
+    from app.game.data.ores import ORE_DEFINITIONS
+
+    return {
+        "mining_tick": {"type": "mining_tick", "progress": 0.4523, "ore_id": "copper", "ore_name": "Copper Ore"},
+        "ore_mined": {
+            "type": "ore_mined", "ore_id": "iron", "ore_name": "Iron Ore", "ore_quantity": 1234,
+            "xp_gained": 25, "total_xp": 123456, "level": 42, "xp_in_level": 3456, "xp_needed": 9876,
+            "message": "You mined Iron Ore! (+25 XP)",
+        },
+        "status": {"type": "status", "version": 57, "data": {
+            "version": 57, "skill_type": "mining", "level": 42, "xp": 123456, "xp_in_level": 3456,
+            "xp_needed": 9876, "current_action": "iron", "action_started": "2024-01-01T00:00:00+00:00",
+            "available_ores": [
+                {**ore, "quantity": 100 * i, "unlocked": ore["level_required"] <= 42}
+                for i, ore in enumerate(ORE_DEFINITIONS)
+            ],
+            "inventory": {"copper": 0, "iron": 100, "silver": 200},
+        }},
+    }
+
+
+def frame_report():
+    from app import wire
+
+    print("Frames (bytes; deflate is the steady-state size of the 100th repeat)")
+    print(f"{'message':<12} {'json':>6} {'+deflate':>9} {'binary':>7} {'+deflate':>9} {'json us':>8} {'binary us':>10}")
+    for name, message in sample_messages().items():
+        text = json.dumps(message, separators=(",", ":")).encode()
+        binary = wire.encode(message)
+        sizes = [len(text), deflate_sizes([text] * 100)[-1]]
+        sizes += [len(binary), deflate_sizes([binary] * 100)[-1]] if binary else [None, None]
+        json_us = per_call_us(lambda: json.dumps(message, separators=(",", ":")).encode())
+        binary_us = per_call_us(lambda: wire.encode(message)) if binary else None
+        cells = [f"{size:>{width}}" if size is not None else f"{'-':>{width}}" for size, width in zip(sizes, (6, 9, 7, 9))]
+        print(f"{name:<12} {' '.join(cells)} {json_us:>8.2f} " + (f"{binary_us:>10.2f}" if binary_us else f"{'-':>10}"))
+    status = json.dumps(sample_messages()["status"], separators=(",", ":")).encode()
+    print(f"first status frame on a fresh connection: {len(status)} bytes, {deflate_sizes([status])[0]} deflated\n")
+
+
+class Relay:
+    """TCP relay to the server counting the bytes it sends to clients."""
+
+    def __init__(self, target_port: int):
+        self.target_port = target_port
+        self.down = 0
+
+    async def _pump(self, reader, writer, count: bool):
+        try:
+            while data := await reader.read(65536):
+                if count:
+                    self.down += len(data)
+                writer.write(data)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle(self, client_reader, client_writer):
+        server_reader, server_writer = await asyncio.open_connection("127.0.0.1", self.target_port)
+        await asyncio.gather(
+            self._pump(client_reader, server_writer, False),
+            self._pump(server_reader, client_writer, True),
+        )
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+
+def cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def client(port: int, user_id: int, protocol: str, deflate: bool, counts: list):
+    """Receive until cancelled."""
+    async with websockets.connect(
+        f"ws://127.0.0.1:{port}/ws/{user_id}",
+        subprotocols=[protocol],
+        compression="deflate" if deflate else None,
+        max_queue=None,
+    ) as ws:
+        assert ws.subprotocol == protocol
+        async for _ in ws:
+            counts[0] += 1
+
+
+async def live_variant(args, server_port: int, pid: int, protocol: str, deflate: bool) -> dict:
+    relay = Relay(server_port)
+    port = await relay.start()
+    counts = [0]
+    tasks = [
+        asyncio.create_task(client(port, 1 + i, protocol, deflate, counts))
+        for i in range(args.clients)
+    ]
+    await asyncio.sleep(args.settle)  # connects and initial statuses
+    down, frames, cpu = relay.down, counts[0], cpu_seconds(pid)
+    started = time.perf_counter()
+    await asyncio.sleep(args.seconds)
+    elapsed = time.perf_counter() - started
+    result = {
+        "down": (relay.down - down) / elapsed / args.clients,
+        "frames": (counts[0] - frames) / elapsed / args.clients,
+        "cpu": (cpu_seconds(pid) - cpu) / elapsed * 100,
+    }
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    relay.server.close()
+    await asyncio.sleep(0.5)  # let the server see the closes
+    return result
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite+aiosqlite:///{tmp}/encoding.db"
+        seed(database_url, args.clients)
+        # Imported once seed() has pointed the settings at the scratch database
+        from app import wire
+
+        frame_report()
+        os.environ["WARMUP_ENABLED"] = "false"
+        port = free_port()
+        process = start_server("prod", port, 1, database_url)
+        try:
+            print(f"Live: {args.clients} clients, {args.seconds:g}s per variant, 1 worker")
+            print(f"{'variant':<16} {'down B/s':>9} {'frames/s':>9} {'cpu %':>6}")
+            for protocol in (wire.JSON_PROTOCOL, wire.BINARY_PROTOCOL):
+                for deflate in (False, True):
+                    result = asyncio.run(live_variant(args, port, process.pid, protocol, deflate))
+                    name = ("binary" if protocol == wire.BINARY_PROTOCOL else "json") + (" + deflate" if deflate else "")
+                    print(f"{name:<16} {result['down']:>9.0f} {result['frames']:>9.1f} {result['cpu']:>6.1f}")
+        finally:
+            stop_server(process)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds to connect before measuring")
+    main(parser.parse_args())
@@ -0,0 +1,189 @@
+"""
+Admin CLI - bulk player export/import.
+
+    python manage.py export players.ndjson.gz
+    python manage.py import players.ndjson.gz
+
+Streams every player table (users, skills, inventory, ...) from every
+shard with server-side cursors, so memory stays constant whatever the
+player count. Import routes each row to its player's shard and loads it
+in batches (PostgreSQL COPY via asyncpg, batched INSERTs elsewhere).
+
+File format: line-delimited JSON, gzip-compressed when the name ends in
+.gz. Each table starts with a header line and is followed by one compact
+JSON array per row, in header column order:
+
+    {"table": "users", "columns": ["telegram_id", "username", ...]}
+    [123456, "alice", ...]
+
+Surrogate autoincrement ids are not exported; they are reassigned on
+import. skills.event_watermark refers to an action_events id, so it is
+exported as the number of the skill's events it covers and turned back
+into an id once the skills are loaded (see app.sharding.copy_query).
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import sys
+import time
+from datetime import datetime
+from typing import IO
+
+from sqlalchemy import DateTime, Table, insert
+
+from app.database import UTCDateTime, init_db
+from app.sharding import copy_columns, copy_query, player_tables, rebase_watermarks, shards
+
+
+def open_file(path: str, mode: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", compresslevel=6)
+    return open(path, mode, encoding="utf-8")
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class Progress:
+    """Rows/s reporting on stderr."""
+
+    def __init__(self, verb: str):
+        self.verb = verb
+        self.rows = 0
+        self.start = time.perf_counter()
+        self._last_report = self.start
+
+    def add(self, rows: int, table: str):
+        self.rows += rows
+        now = time.perf_counter()
+        if now - self._last_report >= 1.0:
+            self._last_report = now
+            self.report(table)
+
+    def report(self, table: str = "done"):
+        elapsed = time.perf_counter() - self.start
+        rate = self.rows / elapsed if elapsed else 0.0
+        print(f"{self.verb} {self.rows:,} rows ({rate:,.0f} rows/s) [{table}]", file=sys.stderr)
+
+
+async def export_players(path: str, tables: set[str] | None, batch_size: int):
+    progress = Progress("exported")
+    with open_file(path, "w") as out:
+        for table, _ in player_tables():
+            if tables and table.name not in tables:
+                continue
+            columns = copy_columns(table)
+            out.write(json.dumps({"table": table.name, "columns": columns}) + "\n")
+
+            for shard_engine in shards.engines:
+                async with shard_engine.connect() as conn:
+                    result = await conn.stream(copy_query(table).execution_options(yield_per=batch_size))
+                    async for partition in result.partitions():
+                        out.write("".join(
+                            json.dumps([_encode(value) for value in row], separators=(",", ":")) + "\n"
+                            for row in partition
+                        ))
+                        progress.add(len(partition), table.name)
+    progress.report()
+
+
+async def _load_batch(shard: int, table: Table, columns: list[str], rows: list[list]):
+    shard_engine = shards.engines[shard]
+    async with shard_engine.begin() as conn:
+        if shard_engine.dialect.driver == "asyncpg":
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                table.name,
+                records=[tuple(row) for row in rows],
+                columns=columns,
+            )
+        else:
+            await conn.execute(insert(table), [dict(zip(columns, row)) for row in rows])
+        if table.name == "skills":
+            # The player's events were loaded with the previous table
+            user_index = columns.index("user_id")
+            await rebase_watermarks(conn, list({row[user_index] for row in rows}))
+
+
+async def import_players(path: str, batch_size: int):
+    table_by_name = {table.name: (table, key) for table, key in player_tables()}
+    progress = Progress("imported")
+
+    table = None
+    columns: list[str] = []
+    decoders: list = []
+    key_index = 0
+    batches: dict[int, list[list]] = {}
+
+    async def flush_all():
+        for shard, rows in batches.items():
+            if rows:
+                await _load_batch(shard, table, columns, rows)
+                progress.add(len(rows), table.name)
+        batches.clear()
+
+    with open_file(path, "r") as src:
+        for line in src:
+            record = json.loads(line)
+
+            if isinstance(record, dict):
+                if table is not None:
+                    await flush_all()
+                table, key = table_by_name[record["table"]]
+                columns = record["columns"]
+                key_index = columns.index(key)
+                decoders = [
+                    datetime.fromisoformat if isinstance(table.c[name].type, (DateTime, UTCDateTime)) else None
+                    for name in columns
+                ]
+                continue
+
+            row = [
+                decode(value) if decode and value is not None else value
+                for decode, value in zip(decoders, record)
+            ]
+            shard = shards.shard_for(row[key_index])
+            batch = batches.setdefault(shard, [])
+            batch.append(row)
+            if len(batch) >= batch_size:
+                await _load_batch(shard, table, columns, batch)
+                progress.add(len(batch), table.name)
+                batches[shard] = []
+
+        if table is not None:
+            await flush_all()
+    progress.report()
+
+
+async def main(argv: list[str]):
+    parser = argparse.ArgumentParser(description="Idle Mining admin tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_cmd = commands.add_parser("export", help="stream all player data to a file")
+    export_cmd.add_argument("path")
+    export_cmd.add_argument("--tables", help="comma-separated subset of tables")
+    export_cmd.add_argument("--batch-size", type=int, default=5000)
+
+    import_cmd = commands.add_parser("import", help="bulk-load a file written by export")
+    import_cmd.add_argument("path")
+    import_cmd.add_argument("--batch-size", type=int, default=5000)
+
+    args = parser.parse_args(argv)
+    await init_db()
+    try:
+        if args.command == "export":
+            tables = set(args.tables.split(",")) if args.tables else None
+            await export_players(args.path, tables, args.batch_size)
+        elif args.command == "import":
+            await import_players(args.path, args.batch_size)
+    finally:
+        await shards.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1:]))
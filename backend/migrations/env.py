@@ -0,0 +1,82 @@
+"""
+Alembic environment.
+
+From the command line every shard is migrated in turn (DATABASE_URL, or
+each of DATABASE_SHARD_URLS). app.schema runs migrations itself and
+hands over an open connection in config.attributes["connection"].
+"""
+
+import asyncio
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import pool
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import settings
+from app.database import Base, UTCDateTime
+import app.models  # noqa: F401  (registers every table on Base.metadata)
+
+config = context.config
+
+target_metadata = Base.metadata
+
+
+def render_item(type_, obj, autogen_context):
+    """Render app column types with an import instead of a module path."""
+    if type_ == "type" and isinstance(obj, UTCDateTime):
+        autogen_context.imports.add("from app.database import UTCDateTime")
+        return "UTCDateTime()"
+    return False
+
+
+def shard_urls() -> list[str]:
+    urls = [url.strip() for url in settings.DATABASE_SHARD_URLS.split(",") if url.strip()]
+    return urls or [settings.DATABASE_URL]
+
+
+def do_run_migrations(connection: Connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_item=render_item,
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_offline() -> None:
+    """Emit SQL for the first shard's dialect instead of running it."""
+    context.configure(
+        url=shard_urls()[0],
+        target_metadata=target_metadata,
+        render_item=render_item,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_async_migrations() -> None:
+    for url in shard_urls():
+        connectable = create_async_engine(url, poolclass=pool.NullPool)
+        async with connectable.connect() as connection:
+            await connection.run_sync(do_run_migrations)
+        await connectable.dispose()
+
+
+connection = config.attributes.get("connection")
+if connection is not None:
+    do_run_migrations(connection)
+else:
+    if config.config_file_name is not None:
+        fileConfig(config.config_file_name)
+    if context.is_offline_mode():
+        run_migrations_offline()
+    else:
+        asyncio.run(run_async_migrations())
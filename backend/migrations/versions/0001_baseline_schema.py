@@ -0,0 +1,64 @@
+"""Baseline schema: every table as the create_all boot left it
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 01:51:34.134601
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from app.database import UTCDateTime
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('users',
+    sa.Column('telegram_id', sa.BigInteger(), nullable=False),
+    sa.Column('username', sa.String(length=255), nullable=True),
+    sa.Column('first_name', sa.String(length=255), nullable=True),
+    sa.Column('created_at', UTCDateTime(), server_default=sa.func.now(), nullable=False),
+    sa.Column('last_active', UTCDateTime(), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('telegram_id')
+    )
+    op.create_table('inventory',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('item_type', sa.String(length=50), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.telegram_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_inventory_item_type', 'inventory', ['item_type'], unique=False)
+    op.create_index('ix_inventory_user_id', 'inventory', ['user_id'], unique=False)
+
+    op.create_table('skills',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('skill_type', sa.String(length=50), nullable=False),
+    sa.Column('xp', sa.BigInteger(), nullable=False),
+    sa.Column('level', sa.Integer(), nullable=False),
+    sa.Column('current_action', sa.String(length=50), nullable=True),
+    sa.Column('action_started', UTCDateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.telegram_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_skills_skill_type', 'skills', ['skill_type'], unique=False)
+    op.create_index('ix_skills_user_id', 'skills', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_skills_user_id', table_name='skills')
+    op.drop_index('ix_skills_skill_type', table_name='skills')
+    op.drop_table('skills')
+
+    op.drop_index('ix_inventory_user_id', table_name='inventory')
+    op.drop_index('ix_inventory_item_type', table_name='inventory')
+    op.drop_table('inventory')
+
+    op.drop_table('users')
@@ -0,0 +1,27 @@
+"""Partial index on active skill actions for the settlement sweeper
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 14:02:11.418305
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from app.schema import adopted_has
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if adopted_has('skills', index='ix_skills_active_action'):
+        return
+    op.create_index('ix_skills_active_action', 'skills', ['current_action'], unique=False, postgresql_where=sa.text('current_action IS NOT NULL'), sqlite_where=sa.text('current_action IS NOT NULL'))
+
+
+def downgrade() -> None:
+    op.drop_index('ix_skills_active_action', table_name='skills', postgresql_where=sa.text('current_action IS NOT NULL'), sqlite_where=sa.text('current_action IS NOT NULL'))
@@ -0,0 +1,28 @@
+"""skills.version: player state version and optimistic lock
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 14:05:47.902113
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from app.schema import adopted_has
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if adopted_has('skills', column='version'):
+        return
+    op.add_column('skills', sa.Column('version', sa.BigInteger(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('skills') as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,33 @@
+"""inventory_bags: compact per-user inventory storage
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 14:09:20.563871
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from app.schema import adopted_has
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if adopted_has('inventory_bags'):
+        return
+    op.create_table('inventory_bags',
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('counts', postgresql.ARRAY(sa.BigInteger()).with_variant(sa.JSON(), 'sqlite'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.telegram_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('inventory_bags')
@@ -0,0 +1,27 @@
+"""Index on skills (skill_type, xp) for per-shard leaderboard scans
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 14:12:38.207714
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from app.schema import adopted_has
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if adopted_has('skills', index='ix_skills_type_xp'):
+        return
+    op.create_index('ix_skills_type_xp', 'skills', ['skill_type', 'xp'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_skills_type_xp', table_name='skills')
@@ -0,0 +1,38 @@
+"""xp_rollups: hourly XP/ore analytics
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 14:15:02.734190
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from app.database import UTCDateTime
+from app.schema import adopted_has
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if adopted_has('xp_rollups'):
+        return
+    op.create_table('xp_rollups',
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('skill_type', sa.String(length=50), nullable=False),
+    sa.Column('hour', UTCDateTime(), nullable=False),
+    sa.Column('xp', sa.BigInteger(), nullable=False),
+    sa.Column('actions', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.telegram_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'skill_type', 'hour')
+    )
+    op.create_index('ix_xp_rollups_hour', 'xp_rollups', ['hour'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_xp_rollups_hour', table_name='xp_rollups')
+    op.drop_table('xp_rollups')
@@ -0,0 +1,45 @@
+"""action_events and skills.event_watermark: event-sourced skill progress
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 14:18:55.019476
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from app.database import UTCDateTime
+from app.schema import adopted_has
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if not adopted_has('action_events'):
+        op.create_table('action_events',
+        sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('skill_type', sa.String(length=50), nullable=False),
+        sa.Column('kind', sa.String(length=10), nullable=False),
+        sa.Column('action', sa.String(length=50), nullable=True),
+        sa.Column('amount', sa.Integer(), nullable=False),
+        sa.Column('xp', sa.BigInteger(), nullable=False),
+        sa.Column('settled_until', UTCDateTime(), nullable=True),
+        sa.Column('created_at', UTCDateTime(), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.telegram_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_action_events_user_id_id', 'action_events', ['user_id', 'id'], unique=False)
+    if not adopted_has('skills', column='event_watermark'):
+        op.add_column('skills', sa.Column('event_watermark', sa.BigInteger(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('skills') as batch_op:
+        batch_op.drop_column('event_watermark')
+    op.drop_index('ix_action_events_user_id_id', table_name='action_events')
+    op.drop_table('action_events')
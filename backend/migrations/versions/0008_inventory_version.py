@@ -0,0 +1,28 @@
+"""inventory.version: optimistic lock on inventory rows
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 14:22:13.648321
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from app.schema import adopted_has
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if adopted_has('inventory', column='version'):
+        return
+    op.add_column('inventory', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('inventory') as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,43 @@
+"""notifications: persistent bot notification queue
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 14:25:40.381957
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from app.database import UTCDateTime
+from app.schema import adopted_has
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if adopted_has('notifications'):
+        return
+    op.create_table('notifications',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('subject', sa.String(length=50), nullable=False),
+    sa.Column('value', sa.BigInteger(), nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('available_at', UTCDateTime(), server_default=sa.func.now(), nullable=False),
+    sa.Column('created_at', UTCDateTime(), server_default=sa.func.now(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.telegram_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_notifications_available_at', 'notifications', ['available_at'], unique=False)
+    op.create_index('ix_notifications_user_id', 'notifications', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notifications_user_id', table_name='notifications')
+    op.drop_index('ix_notifications_available_at', table_name='notifications')
+    op.drop_table('notifications')
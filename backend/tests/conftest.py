@@ -0,0 +1,20 @@
+"""
+Tests run against scratch SQLite databases (python -m pytest, from
+backend/). Settings are read once at import, so the environment is
+pointed at a throwaway database before anything from app is imported.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ["DATABASE_SHARD_URLS"] = ""
+os.environ["EVENT_LOG_ENABLED"] = "false"
+os.environ["NOTIFY_ENABLED"] = "false"
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
@@ -0,0 +1,67 @@
+"""Optimistic write retries of ActionSkill (resettle_on_conflict)."""
+
+import pytest
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.database import Base
+from app.game.analytics import rollups
+from app.game.clock import VirtualClock
+from app.game.data.ores import get_ore
+from app.game.skills.mining import MiningSkill
+from app.metrics import skill_write_conflicts
+from app.models import Skill, User
+
+USER_ID = 1
+
+
+@pytest.fixture
+async def sessions(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/game.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [{"telegram_id": USER_ID}])
+        await conn.execute(insert(Skill), [{
+            "user_id": USER_ID, "skill_type": MiningSkill.SKILL_TYPE, "xp": 0, "level": 1,
+            "version": 0, "event_watermark": 0,
+        }])
+    rollups.drain()
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    rollups.drain()
+    await engine.dispose()
+
+
+def race_first_flush(db: AsyncSession):
+    """Make the session's first flush lose its version check to another writer."""
+    flush = db.flush
+
+    async def racing_flush(*args, **kwargs):
+        db.flush = flush
+        conn = await db.connection()
+        await conn.execute(text("UPDATE skills SET version = version + 1"))
+        await flush(*args, **kwargs)
+
+    db.flush = racing_flush
+
+
+@pytest.mark.anyio
+async def test_conflict_retry_records_the_award_once(sessions):
+    clock = VirtualClock()
+    copper = get_ore("copper")
+    async with sessions() as db:
+        await MiningSkill(db, clock=clock).start_mining(USER_ID, "copper")
+        await db.commit()
+
+    clock.advance(copper.mining_time)
+    conflicts = skill_write_conflicts.value
+    async with sessions() as db:
+        race_first_flush(db)
+        result = await MiningSkill(db, clock=clock).process_mining_tick(USER_ID)
+        await db.commit()
+
+    assert result.completed
+    assert skill_write_conflicts.value == conflicts + 1
+    async with sessions() as db:
+        xp = (await db.execute(select(Skill.xp).where(Skill.user_id == USER_ID))).scalar()
+    assert xp == copper.xp
+    assert list(rollups.drain().values()) == [[copper.xp, 1]]
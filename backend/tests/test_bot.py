@@ -0,0 +1,31 @@
+"""Telegram webhook authentication (app.bot)."""
+
+import pytest
+
+from app import bot
+from app.config import settings
+
+
+@pytest.fixture(autouse=True)
+def fresh_secret():
+    bot.webhook_secret.cache_clear()
+    yield
+    bot.webhook_secret.cache_clear()
+
+
+def test_webhook_requires_the_derived_secret_by_default(monkeypatch):
+    monkeypatch.setattr(settings, "BOT_WEBHOOK_SECRET", "")
+    secret = bot.webhook_secret()
+
+    assert secret and settings.BOT_TOKEN not in secret
+    assert bot.webhook_secret_ok(secret)
+    assert not bot.webhook_secret_ok(None)
+    assert not bot.webhook_secret_ok("")
+    assert not bot.webhook_secret_ok(secret[:-1])
+
+
+def test_configured_secret_wins(monkeypatch):
+    monkeypatch.setattr(settings, "BOT_WEBHOOK_SECRET", "configured")
+
+    assert bot.webhook_secret_ok("configured")
+    assert not bot.webhook_secret_ok("other")
@@ -0,0 +1,45 @@
+"""Statement budgets (track_queries, assert_query_budget, benchmarks.query_budgets)."""
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.database import assert_query_budget, track_queries
+from benchmarks import query_budgets
+
+
+@pytest.fixture
+async def engine():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    yield engine
+    await engine.dispose()
+
+
+@pytest.mark.anyio
+async def test_nested_scopes_add_to_the_enclosing_one(engine):
+    async with engine.connect() as conn:
+        with track_queries("outer") as outer:
+            await conn.execute(text("SELECT 1"))
+            with track_queries("inner") as inner:
+                await conn.execute(text("SELECT 2"))
+                await conn.execute(text("SELECT 3"))
+    assert inner.statements == 2
+    assert outer.statements == 3
+
+
+@pytest.mark.anyio
+async def test_assert_query_budget_fails_over_budget(engine):
+    async with engine.connect() as conn:
+        with assert_query_budget(2, "two"):
+            await conn.execute(text("SELECT 1"))
+            await conn.execute(text("SELECT 2"))
+        with pytest.raises(AssertionError, match="one: 2 statements, budget is 1"):
+            with assert_query_budget(1, "one"):
+                await conn.execute(text("SELECT 1"))
+                await conn.execute(text("SELECT 2"))
+
+
+@pytest.mark.anyio
+async def test_hot_paths_stay_within_budget(capsys):
+    failed = await query_budgets.main()
+    assert failed == 0, capsys.readouterr().out
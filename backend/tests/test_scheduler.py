@@ -0,0 +1,51 @@
+"""Live action ticking (app.game.scheduler)."""
+
+import pytest
+
+from app.config import settings
+from app.game import scheduler
+from app.game.clock import VirtualClock
+from app.game.data.ores import get_ore
+from app.game.scheduler import ActionScheduler
+from app.metrics import live_settle_failures
+
+
+class Listener:
+    def __init__(self):
+        self.failed = []
+
+    async def action_progress(self, live, progress):
+        pass
+
+    async def action_completed(self, live, result):
+        pass
+
+    async def action_failed(self, live, error):
+        self.failed.append((live.user_id, error))
+
+
+@pytest.mark.anyio
+async def test_failing_settlement_retries_before_dropping(monkeypatch):
+    error = ConnectionError("database unavailable")
+
+    async def unavailable(*args, **kwargs):
+        raise error
+
+    monkeypatch.setattr(scheduler, "settle", unavailable)
+    monkeypatch.setattr(settings, "TICK_MAX_FAILURES", 3)
+    listener = Listener()
+    clock = VirtualClock()
+    ticker = ActionScheduler(listener, clock=clock)
+    ticker.track(1, "mining", "copper", clock(), generation=1)
+    clock.advance(get_ore("copper").mining_time)
+    failures = live_settle_failures.value
+
+    for _ in range(2):
+        await ticker.tick()
+        assert ticker.users() == {1}
+        assert listener.failed == []
+
+    await ticker.tick()
+    assert ticker.users() == set()
+    assert listener.failed == [(1, error)]
+    assert live_settle_failures.value == failures + 3
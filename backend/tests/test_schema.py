@@ -0,0 +1,103 @@
+"""Adopting databases built by the create_all boot (app.schema)."""
+
+import pytest
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.game.skills.mining import MiningSkill
+from app.schema import BASELINE, head_revision, migrate_shard
+
+# What the original create_all boot built, before alembic_version existed
+BASELINE_DDL = """
+CREATE TABLE users (
+    telegram_id BIGINT NOT NULL,
+    username VARCHAR(255),
+    first_name VARCHAR(255),
+    created_at DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL,
+    last_active DATETIME DEFAULT (CURRENT_TIMESTAMP) NOT NULL,
+    PRIMARY KEY (telegram_id)
+);
+CREATE TABLE skills (
+    id INTEGER NOT NULL,
+    user_id BIGINT NOT NULL,
+    skill_type VARCHAR(50) NOT NULL,
+    xp BIGINT NOT NULL,
+    level INTEGER NOT NULL,
+    current_action VARCHAR(50),
+    action_started DATETIME,
+    PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (telegram_id) ON DELETE CASCADE
+);
+CREATE INDEX ix_skills_skill_type ON skills (skill_type);
+CREATE INDEX ix_skills_user_id ON skills (user_id);
+CREATE TABLE inventory (
+    id INTEGER NOT NULL,
+    user_id BIGINT NOT NULL,
+    item_type VARCHAR(50) NOT NULL,
+    quantity INTEGER NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(user_id) REFERENCES users (telegram_id) ON DELETE CASCADE
+);
+CREATE INDEX ix_inventory_item_type ON inventory (item_type);
+CREATE INDEX ix_inventory_user_id ON inventory (user_id);
+INSERT INTO users (telegram_id, username) VALUES (1, 'old');
+INSERT INTO skills (user_id, skill_type, xp, level) VALUES (1, 'mining', 120, 2);
+INSERT INTO inventory (user_id, item_type, quantity) VALUES (1, 'copper_ore', 12);
+"""
+
+
+@pytest.fixture
+async def baseline_engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/baseline.db")
+    async with engine.begin() as conn:
+        for statement in filter(str.strip, BASELINE_DDL.split(";")):
+            await conn.execute(text(statement))
+    yield engine
+    await engine.dispose()
+
+
+def _columns(conn, table: str) -> set[str]:
+    return {column["name"] for column in inspect(conn).get_columns(table)}
+
+
+@pytest.mark.anyio
+async def test_baseline_database_is_adopted_and_upgraded(baseline_engine):
+    assert await migrate_shard(baseline_engine) is None
+
+    async with baseline_engine.connect() as conn:
+        revision = (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalar()
+        skills = await conn.run_sync(_columns, "skills")
+        inventory = await conn.run_sync(_columns, "inventory")
+        tables = set(await conn.run_sync(lambda sync: inspect(sync).get_table_names()))
+    assert revision == head_revision() != BASELINE
+    assert {"version", "event_watermark"} <= skills
+    assert "version" in inventory
+    assert {"action_events", "inventory_bags", "notifications", "xp_rollups"} <= tables
+
+
+@pytest.mark.anyio
+async def test_adopted_players_keep_playing(baseline_engine):
+    await migrate_shard(baseline_engine)
+    sessions = async_sessionmaker(baseline_engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with sessions() as db:
+        mining = MiningSkill(db)
+        status = await mining.get_status(1)
+        assert status["xp"] == 120
+        assert status["version"] == 0
+        assert (await mining.start_mining(1, "copper")).success
+        await db.commit()
+        assert await mining.get_state_version(1) == 1
+
+
+@pytest.mark.anyio
+async def test_migrations_skip_objects_a_later_create_all_made(baseline_engine):
+    async with baseline_engine.begin() as conn:
+        await conn.execute(text("ALTER TABLE skills ADD COLUMN version BIGINT DEFAULT 0 NOT NULL"))
+        await conn.execute(text("CREATE TABLE inventory_bags (user_id BIGINT PRIMARY KEY, counts JSON NOT NULL)"))
+
+    await migrate_shard(baseline_engine)
+
+    async with baseline_engine.connect() as conn:
+        revision = (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalar()
+    assert revision == head_revision()
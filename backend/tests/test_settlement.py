@@ -0,0 +1,67 @@
+"""Batch settlement on the portable (non-PostgreSQL) path."""
+
+import pytest
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import settings
+from app.database import Base
+from app.game.analytics import rollups
+from app.game.clock import VirtualClock
+from app.game.data.ores import get_ore
+from app.game.settlement import SettlementUnsupported, settle
+from app.models import Skill, User
+
+USERS = (1, 2)
+
+
+@pytest.fixture
+async def engine(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/game.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [{"telegram_id": user_id} for user_id in USERS])
+        await conn.execute(insert(Skill), [{
+            "user_id": user_id, "skill_type": "mining", "xp": 0, "level": 1,
+            "version": 0, "event_watermark": 0,
+            "current_action": "copper", "action_started": VirtualClock().now,
+        } for user_id in USERS])
+    rollups.drain()
+    yield engine
+    rollups.drain()
+    await engine.dispose()
+
+
+def _due() -> VirtualClock:
+    clock = VirtualClock()
+    clock.advance(get_ore("copper").mining_time)
+    return clock
+
+
+@pytest.mark.anyio
+async def test_event_log_mode_is_unsupported(engine, monkeypatch):
+    monkeypatch.setattr(settings, "EVENT_LOG_ENABLED", True)
+    with pytest.raises(SettlementUnsupported):
+        await settle(engine, now=_due()(), notify=False)
+
+
+@pytest.mark.anyio
+async def test_a_player_changed_mid_batch_is_left_for_next_time(engine):
+    # Another writer moves player 2 on between the read and the write
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "CREATE TRIGGER race BEFORE UPDATE OF xp ON skills WHEN OLD.user_id = 1 "
+            "BEGIN UPDATE skills SET version = version + 1 WHERE user_id = 2; END"
+        ))
+
+    settled = await settle(engine, now=_due()(), notify=False)
+
+    assert [done.user_id for done in settled] == [1]
+    async with engine.connect() as conn:
+        xp = dict((await conn.execute(select(Skill.user_id, Skill.xp))).all())
+    assert xp == {1: get_ore("copper").xp, 2: 0}
+    assert [key[0] for key in rollups.drain()] == [1]
+
+    async with engine.begin() as conn:
+        await conn.execute(text("DROP TRIGGER race"))
+    assert [done.user_id for done in await settle(engine, now=_due()(), notify=False)] == [2]
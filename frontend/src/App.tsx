@@ -1,4 +1,4 @@
-import { useEffect, useState } from 'react'
+import { useEffect, useRef, useState } from 'react'
 import { MiningView } from './components/MiningView'
 import { useWebSocket } from './hooks/useWebSocket'
 import { useTelegram } from './hooks/useTelegram'
@@ -8,6 +8,7 @@ const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000'
 const WS_URL = import.meta.env.VITE_WS_URL || 'ws://localhost:8000'
 
 export interface GameState {
+  version: number
   skill_type: string
   level: number
   xp: number
@@ -32,22 +33,57 @@ export interface OreData {
   unlocked: boolean
 }
 
+// Changes relative to a previously acknowledged status (see status_delta)
+type StatusChanges = Partial<Omit<GameState, 'available_ores' | 'inventory'>> & {
+  inventory?: Record<string, number>
+  ores?: Record<string, Partial<OreData>>
+}
+
+function applyStatusDelta(prev: GameState, changes: StatusChanges): GameState {
+  const { inventory, ores, ...fields } = changes
+  return {
+    ...prev,
+    ...fields,
+    inventory: inventory ? { ...prev.inventory, ...inventory } : prev.inventory,
+    available_ores: ores
+      ? prev.available_ores.map(ore => ores[ore.id] ? { ...ore, ...ores[ore.id] } : ore)
+      : prev.available_ores,
+  }
+}
+
 function App() {
   const { user, webApp } = useTelegram()
   const [gameState, setGameState] = useState<GameState | null>(null)
   const [miningProgress, setMiningProgress] = useState(0)
   const [notification, setNotification] = useState<string | null>(null)
   const [levelUpAnimation, setLevelUpAnimation] = useState(false)
+  // Version of the last status we applied; the server sends deltas against it
+  const statusVersion = useRef<number | null>(null)
 
   // Get user ID (use Telegram ID or fallback for testing)
   const userId = user?.id || 12345
 
   const { sendMessage, isConnected } = useWebSocket({
     url: `${WS_URL}/ws/${userId}`,
+    getVersion: () => statusVersion.current,
     onMessage: (data) => {
       switch (data.type) {
         case 'status':
           setGameState(data.data)
+          statusVersion.current = data.version
+          sendMessage({ action: 'ack', version: data.version })
+          break
+        case 'status_delta':
+          if (statusVersion.current !== data.base_version) {
+            // We don't hold the base this delta was built on; ask for everything
+            sendMessage({ action: 'get_status', version: null })
+            break
+          }
+          setGameState(prev => prev ? applyStatusDelta(prev, data.changes) : null)
+          statusVersion.current = data.version
+          sendMessage({ action: 'ack', version: data.version })
+          break
+        case 'status_unchanged':
           break
         case 'mining_tick':
           setMiningProgress(data.progress)
@@ -70,6 +106,8 @@ function App() {
           setTimeout(() => setNotification(null), 2000)
           break
         case 'level_up':
+          // New ores may have unlocked; fetch the (delta) status
+          sendMessage({ action: 'get_status', version: statusVersion.current })
           setLevelUpAnimation(true)
           setNotification(`LEVEL UP! Mining Level ${data.new_level}!`)
           setTimeout(() => {
@@ -90,6 +128,15 @@ function App() {
             current_action: null
           } : null)
           break
+        case 'rate_limited':
+          // A dropped status request would leave us stale; ask again later
+          if (data.action === 'get_status') {
+            setTimeout(
+              () => sendMessage({ action: 'get_status', version: statusVersion.current }),
+              data.retry_after * 1000
+            )
+          }
+          break
         case 'error':
           setNotification(data.message)
           setTimeout(() => setNotification(null), 3000)
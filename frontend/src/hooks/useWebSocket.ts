@@ -1,19 +1,45 @@
 import { useCallback, useEffect, useRef, useState } from 'react'
+import { BINARY_PROTOCOL, ItemTable, JSON_PROTOCOL, decodeFrame, itemTable } from '../wire'
 
 interface UseWebSocketOptions {
   url: string
   onMessage: (data: any) => void
+  // Status version the app holds, sent on reconnect so the server can
+  // answer with a delta (or nothing) instead of the full status
+  getVersion?: () => number | null
   reconnectInterval?: number
 }
 
-export function useWebSocket({ url, onMessage, reconnectInterval = 3000 }: UseWebSocketOptions) {
+export function useWebSocket({ url, onMessage, getVersion, reconnectInterval = 3000 }: UseWebSocketOptions) {
   const [isConnected, setIsConnected] = useState(false)
   const wsRef = useRef<WebSocket | null>(null)
   const reconnectTimeoutRef = useRef<NodeJS.Timeout | null>(null)
+  // Delay the server asked for (server_draining, server_busy)
+  const drainDelayRef = useRef<number | null>(null)
+  // Resume token of the last session, presented on reconnect
+  const resumeTokenRef = useRef<string | null>(null)
+  // Names binary frames refer to by item id (session frame)
+  const itemsRef = useRef<ItemTable>(new Map())
+  // Latest handlers, so a re-render does not recreate (and reconnect) the socket
+  const onMessageRef = useRef(onMessage)
+  onMessageRef.current = onMessage
+  const getVersionRef = useRef(getVersion)
+  getVersionRef.current = getVersion
 
   const connect = useCallback(() => {
     try {
-      const ws = new WebSocket(url)
+      const params = new URLSearchParams()
+      const version = getVersionRef.current?.() ?? null
+      if (resumeTokenRef.current) {
+        params.set('resume', resumeTokenRef.current)
+      }
+      if (version !== null) {
+        params.set('version', String(version))
+      }
+      const query = params.toString()
+      // Prefer compact binary frames; servers without them pick JSON
+      const ws = new WebSocket(query ? `${url}?${query}` : url, [BINARY_PROTOCOL, JSON_PROTOCOL])
+      ws.binaryType = 'arraybuffer'
 
       ws.onopen = () => {
         console.log('WebSocket connected')
@@ -22,8 +48,29 @@ export function useWebSocket({ url, onMessage, reconnectInterval = 3000 }: UseWe
 
       ws.onmessage = (event) => {
         try {
-          const data = JSON.parse(event.data)
-          onMessage(data)
+          const data = typeof event.data === 'string'
+            ? JSON.parse(event.data)
+            : decodeFrame(event.data, itemsRef.current)
+          // Keepalive: answer server pings without bothering the app
+          if (data.type === 'ping') {
+            ws.send(JSON.stringify({ action: 'pong' }))
+            return
+          }
+          if (data.type === 'session') {
+            resumeTokenRef.current = data.resume_token
+            if (data.items) {
+              itemsRef.current = itemTable(data.items)
+            }
+            return
+          }
+          // The server is restarting or shedding a reconnect storm: come
+          // back after its randomized delay so clients do not all
+          // reconnect at the same moment
+          if (data.type === 'server_draining' || data.type === 'server_busy') {
+            drainDelayRef.current = data.reconnect_in * 1000
+            return
+          }
+          onMessageRef.current(data)
         } catch (e) {
           console.error('Failed to parse WebSocket message:', e)
         }
@@ -39,10 +86,12 @@ export function useWebSocket({ url, onMessage, reconnectInterval = 3000 }: UseWe
         wsRef.current = null
 
         // Reconnect after delay
+        const delay = drainDelayRef.current ?? reconnectInterval
+        drainDelayRef.current = null
         reconnectTimeoutRef.current = setTimeout(() => {
           console.log('Attempting to reconnect...')
           connect()
-        }, reconnectInterval)
+        }, delay)
       }
 
       wsRef.current = ws
@@ -50,7 +99,7 @@ export function useWebSocket({ url, onMessage, reconnectInterval = 3000 }: UseWe
       console.error('Failed to connect WebSocket:', error)
       reconnectTimeoutRef.current = setTimeout(connect, reconnectInterval)
     }
-  }, [url, onMessage, reconnectInterval])
+  }, [url, reconnectInterval])
 
   useEffect(() => {
     connect()
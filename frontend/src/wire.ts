@@ -0,0 +1,82 @@
+// Binary websocket frames (subprotocol idle.bin.1); mirrors backend/app/wire.py.
+// Ticks and completions arrive as fixed-schema binary frames, everything
+// else as JSON text.
+
+export const BINARY_PROTOCOL = 'idle.bin.1'
+export const JSON_PROTOCOL = 'idle.json'
+
+// item_id -> [item_id, skill_type, action_id, name], from the session frame
+export type ItemTable = Map<number, [number, string, string, string]>
+
+type Field = [name: string, kind: 'f32' | 'u16' | 'u32']
+
+interface Schema {
+  type: string
+  fields: Field[]
+  idField: string
+  nameField: string
+  hasSkill: boolean
+  hasMessage: boolean
+}
+
+const XP_FIELDS: Field[] = [
+  ['xp_gained', 'u32'],
+  ['total_xp', 'u32'],
+  ['level', 'u16'],
+  ['xp_in_level', 'u32'],
+  ['xp_needed', 'u32'],
+]
+
+const SCHEMAS: Record<number, Schema> = {
+  1: { type: 'mining_tick', fields: [['progress', 'f32']], idField: 'ore_id', nameField: 'ore_name', hasSkill: false, hasMessage: false },
+  2: { type: 'action_tick', fields: [['progress', 'f32']], idField: 'action_id', nameField: 'action_name', hasSkill: true, hasMessage: false },
+  3: { type: 'ore_mined', fields: [['ore_quantity', 'u32'], ...XP_FIELDS], idField: 'ore_id', nameField: 'ore_name', hasSkill: false, hasMessage: true },
+  4: {
+    type: 'action_completed',
+    fields: [['amount', 'u16'], ['quantity', 'u32'], ...XP_FIELDS],
+    idField: 'action_id',
+    nameField: 'action_name',
+    hasSkill: true,
+    hasMessage: true,
+  },
+}
+
+const SIZES = { f32: 4, u16: 2, u32: 4 }
+const textDecoder = new TextDecoder()
+
+export function itemTable(rows: [number, string, string, string][]): ItemTable {
+  return new Map(rows.map(row => [row[0], row]))
+}
+
+// Rebuild the JSON-shaped message of a binary frame
+export function decodeFrame(buffer: ArrayBuffer, items: ItemTable): any {
+  const view = new DataView(buffer)
+  const schema = SCHEMAS[view.getUint8(0)]
+  const item = items.get(view.getUint16(1))
+  if (!schema || !item) {
+    throw new Error('Unknown binary frame')
+  }
+  const message: Record<string, any> = { type: schema.type }
+  if (schema.hasSkill) {
+    message.skill = item[1]
+  }
+  message[schema.idField] = item[2]
+  message[schema.nameField] = item[3]
+
+  let offset = 3
+  for (const [name, kind] of schema.fields) {
+    if (kind === 'f32') {
+      message[name] = Math.round(view.getFloat32(offset) * 1e4) / 1e4
+    } else if (kind === 'u16') {
+      message[name] = view.getUint16(offset)
+    } else {
+      message[name] = view.getUint32(offset)
+    }
+    offset += SIZES[kind]
+  }
+  if (schema.hasMessage) {
+    const length = view.getUint16(offset)
+    message.message = textDecoder.decode(new Uint8Array(buffer, offset + 2, length))
+  }
+  return message
+}